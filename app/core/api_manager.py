@@ -1,12 +1,129 @@
 # app/core/api_manager.py
 import json
 import os
+import time
+import threading
+
+
+class _KeyState:
+    __slots__ = ('key', 'remaining', 'in_flight', 'limit', 'cooldown_until', 'strikes', 'exhausted', 'used')
+
+    def __init__(self, key, limit):
+        self.key = key
+        self.remaining = None # невідомо, поки не отримано usage
+        self.in_flight = 0
+        self.limit = limit
+        self.cooldown_until = 0.0
+        self.strikes = 0
+        self.exhausted = False
+        self.used = 0
+
+
+class KeyScheduler:
+    """Розподіляє запити між кількома ключами одного сервісу.
+
+    Кожен ключ має власний ліміт одночасних запитів і локальний облік залишку символів;
+    вичерпаний ключ вимикається, а ключ, що отримав 429, на деякий час відпочиває.
+    """
+    DEFAULT_PER_KEY_CONCURRENCY = 2
+    COOLDOWN_BASE = 1.0
+    COOLDOWN_MAX = 60.0
+
+    def __init__(self, keys, per_key_concurrency=DEFAULT_PER_KEY_CONCURRENCY):
+        self._states = {key: _KeyState(key, max(1, per_key_concurrency)) for key in keys if key}
+        self._cond = threading.Condition()
+
+    @property
+    def keys(self):
+        return list(self._states)
+
+    @property
+    def concurrency(self):
+        return sum(state.limit for state in self._states.values())
+
+    def set_remaining(self, key, remaining):
+        with self._cond:
+            state = self._states[key]
+            state.remaining = remaining
+            if remaining is not None and remaining <= 0:
+                state.exhausted = True
+            self._cond.notify_all()
+
+    def acquire(self, chars=0):
+        """Блокує, доки не звільниться придатний ключ; None — якщо всі ключі вичерпано."""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                candidates = []
+                next_wakeup = None
+                for state in self._states.values():
+                    if state.exhausted or (state.remaining is not None and state.remaining < chars):
+                        continue
+                    if state.cooldown_until > now:
+                        next_wakeup = min(next_wakeup or state.cooldown_until, state.cooldown_until)
+                        continue
+                    if state.in_flight >= state.limit:
+                        next_wakeup = next_wakeup or now + self.COOLDOWN_MAX
+                        continue
+                    candidates.append(state)
+                if candidates:
+                    # Найменш завантажений ключ, з них — з найбільшим залишком (невідомий залишок — у кінці)
+                    state = min(candidates, key=lambda s: (s.in_flight / s.limit,
+                                                           -(s.remaining if s.remaining is not None else -1)))
+                    state.in_flight += 1
+                    return state.key
+                if next_wakeup is None:
+                    return None
+                self._cond.wait(max(0.0, next_wakeup - now))
+
+    def release(self, key, chars=0, outcome="ok"):
+        """outcome: 'ok', 'rate_limited' (429 — відпочинок), 'exhausted' (ключ більше не використовується), 'error'."""
+        with self._cond:
+            state = self._states[key]
+            state.in_flight -= 1
+            if outcome == "ok":
+                state.strikes = 0
+                state.used += chars
+                if state.remaining is not None:
+                    state.remaining = max(0, state.remaining - chars)
+                    state.exhausted = state.remaining == 0
+            elif outcome == "rate_limited":
+                delay = min(self.COOLDOWN_MAX, self.COOLDOWN_BASE * (2 ** state.strikes))
+                state.strikes += 1
+                state.cooldown_until = time.monotonic() + delay
+            elif outcome == "exhausted":
+                state.exhausted = True
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                key: {'remaining': s.remaining, 'used': s.used, 'in_flight': s.in_flight, 'exhausted': s.exhausted}
+                for key, s in self._states.items()
+            }
+
 
 class ApiKeyManager:
     def __init__(self, filename="api_keys.json"):
         self.filepath = filename
+        self._mtime = self._file_mtime()
         self.data = self._load()
 
+    def _file_mtime(self):
+        try:
+            return os.stat(self.filepath).st_mtime_ns
+        except OSError:
+            return None
+
+    def reload_if_changed(self):
+        """Перечитує файл, лише якщо його змінили (напр. інший екземпляр у діалозі налаштувань)."""
+        mtime = self._file_mtime()
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        self.data = self._load()
+        return True
+
     def _load(self):
         if not os.path.exists(self.filepath):
             return {
@@ -24,6 +141,7 @@ class ApiKeyManager:
     def save(self):
         with open(self.filepath, 'w', encoding='utf-8') as f:
             json.dump(self.data, f, indent=4, ensure_ascii=False)
+        self._mtime = self._file_mtime()
 
     def get_keys_for_service(self, service_name):
         return self.data["services"].get(service_name, [])
@@ -59,3 +177,12 @@ class ApiKeyManager:
     def set_active_key(self, service_name, key_value):
         self.data["active_keys"][service_name] = key_value
         self.save()
+
+    def create_scheduler(self, service_name, per_key_concurrency=KeyScheduler.DEFAULT_PER_KEY_CONCURRENCY):
+        """Планувальник, що розподіляє запити між усіма ключами сервісу (активний ключ — першим)."""
+        keys = list(self.get_keys_for_service(service_name))
+        active_key = self.get_active_key(service_name)
+        if active_key in keys:
+            keys.remove(active_key)
+            keys.insert(0, active_key)
+        return KeyScheduler(keys, per_key_concurrency)
@@ -0,0 +1,280 @@
+# app/core/batch.py
+# Пакетний режим без вікна: OCR → групування → переклад → відтворення для цілої папки.
+# Запуск: python main.py batch <dir> --src ko --dest en --service deepl --out <dir>
+
+import os
+import re
+import sys
+import time
+import argparse
+
+from .api_manager import ApiKeyManager
+from .translation_memory import TranslationMemory, DEFAULT_DB_PATH, DEFAULT_FUZZY_THRESHOLD
+from .ocr_tiling import DEFAULT_TILE_HEIGHT, DEFAULT_TILE_OVERLAP
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+def _natural_key(name):
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r'(\d+)', name)]
+
+
+def find_pages(input_dir):
+    """Повертає шляхи до зображень папки у природному порядку (2.png перед 10.png)."""
+    names = [n for n in os.listdir(input_dir) if n.lower().endswith(IMAGE_EXTENSIONS)]
+    return [os.path.join(input_dir, n) for n in sorted(names, key=_natural_key)]
+
+
+def output_path_for(image_path, output_dir):
+    name, _ = os.path.splitext(os.path.basename(image_path))
+    return os.path.join(output_dir, f"{name}_translated.png")
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        prog="main.py batch",
+        description="Пакетний переклад усіх сторінок розділу без графічного інтерфейсу."
+    )
+    parser.add_argument("input_dir", help="Папка зі сторінками (.png, .jpg, .jpeg)")
+    parser.add_argument("--out", dest="output_dir", required=True, help="Папка для перекладених сторінок")
+    parser.add_argument("--src", default="auto", help="Мова оригіналу (за замовчуванням: auto)")
+    parser.add_argument("--dest", default="uk",
+                        help="Мова перекладу або кілька через кому, напр. en,uk,pl — тоді OCR виконується один раз, "
+                             "а кожна мова зберігається в окрему підпапку (за замовчуванням: uk)")
+    parser.add_argument("--service", default="google", choices=["google", "deepl", "gpt", "gemini"],
+                        help="Сервіс перекладу")
+    parser.add_argument("--api-key", default=None, help="API ключ (за замовчуванням: активний ключ з api_keys.json)")
+    parser.add_argument("--hedge", default=None, choices=["google", "deepl", "gpt", "gemini"],
+                        help="Резервний сервіс: отримує той самий пакет, якщо основний не відповів вчасно")
+    parser.add_argument("--hedge-key", default=None,
+                        help="API ключ резервного сервісу (за замовчуванням: активний ключ з api_keys.json)")
+    parser.add_argument("--hedge-percentile", type=float, default=95,
+                        help="Резервний запит — якщо основний сервіс відповідає довше за цей перцентиль "
+                             "своїх затримок (за замовчуванням: 95)")
+    parser.add_argument("--hedge-delay", type=float, default=None,
+                        help="Фіксована затримка перед резервним запитом у секундах замість перцентиля")
+    parser.add_argument("--ocr-mode", default="standard", choices=["standard", "opencv"], help="Режим розпізнавання")
+    parser.add_argument("--ocr-langs", default="ko,en", help="Мови OCR через кому (за замовчуванням: ko,en)")
+    parser.add_argument("--font", default=None, help="Шрифт (за замовчуванням: перший шрифт з папки fonts)")
+    parser.add_argument("--font-size", type=int, default=14, help="Розмір шрифту")
+    parser.add_argument("--ocr-batch", type=int, default=1,
+                        help="Скільки сторінок/тайлів схожого розміру розпізнавати одним пакетом (1 — без пакетів)")
+    parser.add_argument("--ocr-batch-wait", type=float, default=50,
+                        help="Максимальне очікування на заповнення пакета OCR, мс")
+    parser.add_argument("--tile-height", type=int, default=DEFAULT_TILE_HEIGHT,
+                        help=f"Висота смуги для OCR довгих стрічок, 0 — без поділу (за замовчуванням: {DEFAULT_TILE_HEIGHT})")
+    parser.add_argument("--tile-overlap", type=int, default=DEFAULT_TILE_OVERLAP,
+                        help=f"Перекриття сусідніх смуг у пікселях (за замовчуванням: {DEFAULT_TILE_OVERLAP})")
+    parser.add_argument("--ocr-cache-dir", default=None, help="Папка кешу OCR (за замовчуванням: cache/ocr)")
+    parser.add_argument("--no-ocr-cache", action="store_true", help="Не використовувати кеш результатів OCR")
+    parser.add_argument("--translate-concurrency", type=int, default=None,
+                        help="Скільки запитів до сервісу перекладу виконувати одночасно")
+    parser.add_argument("--all-keys", action="store_true",
+                        help="Розподіляти запити між усіма ключами сервісу з api_keys.json")
+    parser.add_argument("--per-key-concurrency", type=int, default=2,
+                        help="Скільки запитів одночасно на один ключ при --all-keys (за замовчуванням: 2)")
+    parser.add_argument("--deepl-server-url", default=os.environ.get("DEEPL_SERVER_URL"),
+                        help="Альтернативна адреса DeepL API, напр. локальна заглушка (або змінна DEEPL_SERVER_URL)")
+    parser.add_argument("--llm-base-url", default=None,
+                        help="Адреса API для gpt/gemini, напр. локальний сервер-заглушка "
+                             "(або змінні OPENAI_BASE_URL / GEMINI_BASE_URL)")
+    parser.add_argument("--llm-model", default=None, help="Модель для gpt/gemini")
+    parser.add_argument("--llm-stream", action="store_true", help="Отримувати відповідь gpt/gemini потоком")
+    parser.add_argument("--tm-path", default=None, help="Файл пам'яті перекладів (за замовчуванням: cache/translation_memory.sqlite3)")
+    parser.add_argument("--no-tm", action="store_true", help="Не використовувати пам'ять перекладів")
+    parser.add_argument("--tm-fuzzy", type=float, default=DEFAULT_FUZZY_THRESHOLD,
+                        help=f"Мінімальна схожість для нечіткого збігу в пам'яті перекладів, 0 — лише точні збіги (за замовчуванням: {DEFAULT_FUZZY_THRESHOLD})")
+    parser.add_argument("--jobs", type=int, default=2,
+                        help="Скільки сторінок може чекати між етапами; 1 — суто послідовна обробка "
+                             "(інакше OCR однієї сторінки перекривається з перекладом інших)")
+    parser.add_argument("--coalesce-wait", type=float, default=300,
+                        help="Скільки мс збирати речення кількох сторінок в один запит перекладу "
+                             "(однакові рядки надсилаються один раз); 0 — кожна сторінка окремо")
+    parser.add_argument("--ocr-workers", type=int, default=0,
+                        help="Кількість процесів OCR, кожен зі своїм easyocr.Reader (0 — один reader у цьому процесі)")
+    parser.add_argument("--torch-threads", type=int, default=1,
+                        help="Потоки torch у кожному процесі OCR (для --ocr-workers)")
+    parser.add_argument("--skip-existing", action="store_true", help="Пропускати сторінки, для яких вже є результат")
+    return parser
+
+
+def run_batch(pages, output_dir, reader, translator, src_lang, dest_lang,
+              ocr_mode="standard", font="Arial", font_size=14, skip_existing=False, jobs=1,
+              ocr_cache=None, reader_settings=None, tile_height=None, tile_overlap=DEFAULT_TILE_OVERLAP, log=print):
+    """Проганяє сторінки через конвеєр з одним OCR reader і одним перекладачем на весь запуск.
+
+    dest_lang може бути списком мов: OCR і групування виконуються один раз, а результат кожної
+    мови зберігається в підпапку output_dir/<мова>. Повертає список шляхів до сторінок, які не вдалося обробити.
+    """
+    from .pipeline import PageJob, build_default_pipeline
+
+    dest_langs = None if isinstance(dest_lang, str) else list(dest_lang)
+    lang_dirs = {lang: os.path.join(output_dir, lang) for lang in dest_langs or []}
+    for directory in list(lang_dirs.values()) or [output_dir]:
+        os.makedirs(directory, exist_ok=True)
+    page_jobs = []
+    for image_path in pages:
+        out_path = output_path_for(image_path, output_dir)
+        output_paths = {lang: output_path_for(image_path, directory) for lang, directory in lang_dirs.items()}
+        if skip_existing and all(os.path.exists(path) for path in (list(output_paths.values()) or [out_path])):
+            log(f"{os.path.basename(image_path)}: пропущено (результат вже існує)")
+            continue
+        page_jobs.append(PageJob(image_path, ocr_mode=ocr_mode, output_path=None if dest_langs else out_path,
+                                 output_paths=output_paths))
+
+    done_count = 0
+
+    def report(page):
+        nonlocal done_count
+        done_count += 1
+        prefix = f"[{done_count}/{len(page_jobs)}] {os.path.basename(page.image_path)}"
+        if page.failed:
+            log(f"{prefix}: ПОМИЛКА ({page.failed_stage}): {page.error}")
+        else:
+            log(f"{prefix}: {len(page.regions)} блоків, {len(page.groups)} речень, {sum(page.timings.values()):.1f} с")
+        # Зображення вже збережене — звільняємо пам'ять
+        page.image_bytes = page.image = page.rendered = None
+        page.rendered_by_lang.clear()
+
+    # Конвеєр закривається разом із потоками етапу перекладу
+    with build_default_pipeline(reader, translator, src_lang, dest_lang, font, font_size,
+                                ocr_cache=ocr_cache, reader_settings=reader_settings,
+                                tile_height=tile_height, tile_overlap=tile_overlap) as pipeline:
+        if jobs > 1:
+            pipeline.run_pipelined(page_jobs, queue_size=jobs, on_page_done=report)
+        else:
+            pipeline.run_many(page_jobs, on_page_done=report)
+    return [page.image_path for page in page_jobs if page.failed]
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+
+    if not os.path.isdir(args.input_dir):
+        print(f"Папку не знайдено: {args.input_dir}", file=sys.stderr)
+        return 2
+    pages = find_pages(args.input_dir)
+    if not pages:
+        print(f"У папці {args.input_dir} немає зображень.", file=sys.stderr)
+        return 2
+
+    api_key = args.api_key
+    key_scheduler = None
+    if args.service != 'google' and args.all_keys:
+        key_scheduler = ApiKeyManager().create_scheduler(args.service, args.per_key_concurrency)
+        api_key = api_key or next(iter(key_scheduler.keys), None)
+    if args.service != 'google' and not api_key:
+        api_key = ApiKeyManager().get_active_key(args.service)
+        if not api_key:
+            print(f"Для сервісу '{args.service.capitalize()}' не обрано активний API ключ.", file=sys.stderr)
+            return 2
+
+    # Резерв тим самим сервісом нічого не дає
+    hedge_service = args.hedge if args.hedge != args.service else None
+    hedge_key = args.hedge_key
+    if hedge_service and hedge_service != 'google' and not hedge_key:
+        hedge_key = ApiKeyManager().get_active_key(hedge_service)
+        if not hedge_key:
+            print(f"Для резервного сервісу '{hedge_service.capitalize()}' не обрано активний API ключ.", file=sys.stderr)
+            return 2
+
+    # QGuiApplication потрібен для шрифтів і QPainter, але вікно не створюється
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtGui import QGuiApplication
+    from .ocr import create_reader
+    from .renderer import load_fonts
+    from .ocr_cache import OcrCache, DEFAULT_CACHE_DIR
+    from .translators import (create_translator, convert_lang_code, BaseTranslator, LLMTranslator,
+                              HedgedTranslator, MemoryTranslator)
+
+    # Посилання тримається до кінця main: без живого QGuiApplication рендер не працює
+    _qt_app = QGuiApplication.instance() or QGuiApplication(sys.argv[:1])
+    base_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    loaded_fonts = load_fonts(os.path.join(base_path, 'fonts'))
+    font = args.font or (loaded_fonts[0] if loaded_fonts else "Arial")
+
+    requested_langs = [lang.strip() for lang in args.ocr_langs.split(",") if lang.strip()]
+    if args.ocr_workers > 0:
+        from .ocr_pool import OcrProcessPool
+        # Моделі завантажуються в кожному процесі при першому завданні
+        reader = OcrProcessPool(requested_langs, workers=args.ocr_workers, torch_threads=args.torch_threads)
+        device, ocr_langs = f"CPU, процесів: {reader.workers}", reader.ocr_langs
+    else:
+        print("Завантаження OCR-моделей...")
+        reader, device, ocr_langs = create_reader(requested_langs)
+        if args.ocr_batch > 1:
+            from .ocr_batching import BatchingReader
+            reader = BatchingReader(reader, max_batch=args.ocr_batch, max_wait=args.ocr_batch_wait / 1000)
+    print(f"OCR завантажено для {ocr_langs} ({device}). Сторінок: {len(pages)}")
+    memory = None if args.no_tm else TranslationMemory(args.tm_path or DEFAULT_DB_PATH, fuzzy_threshold=args.tm_fuzzy or None)
+    translator = create_translator(args.service, api_key, memory=None if hedge_service else memory,
+                                   concurrency=args.translate_concurrency,
+                                   server_url=args.deepl_server_url if args.service == 'deepl' else args.llm_base_url,
+                                   key_scheduler=key_scheduler, model=args.llm_model, stream=args.llm_stream)
+    hedged = None
+    if hedge_service:
+        # --llm-model / --llm-base-url стосуються основного сервісу; резерв gpt/gemini бере свої значення за замовчуванням
+        secondary = create_translator(hedge_service, hedge_key,
+                                      server_url=args.deepl_server_url if hedge_service == 'deepl' else None,
+                                      stream=args.llm_stream)
+        # Як і в GUI: резерв обгортає самі сервіси, пам'ять перекладів — зовні
+        translator = hedged = HedgedTranslator(translator, secondary, percentile=args.hedge_percentile / 100,
+                                               fixed_delay=args.hedge_delay)
+        if memory is not None:
+            translator = MemoryTranslator(hedged, memory)
+    coalescer = None
+    if args.coalesce_wait > 0 and args.jobs > 1:
+        from .translation_batching import CoalescingTranslator
+        translator = coalescer = CoalescingTranslator(translator, max_wait=args.coalesce_wait / 1000)
+    ocr_cache = None if args.no_ocr_cache else OcrCache(args.ocr_cache_dir or DEFAULT_CACHE_DIR)
+
+    started = time.perf_counter()
+    dest_langs = [lang.strip() for lang in args.dest.split(",") if lang.strip()]
+    src_lang = args.src
+    if args.service in ('google', 'deepl'):
+        # Коди приймаються в будь-яких позначеннях: DeepL, напр., не знає цільової EN, лише EN-US / EN-GB
+        src_lang = convert_lang_code(src_lang, args.service)
+        dest_langs = [convert_lang_code(lang, args.service, target=True) for lang in dest_langs]
+    failed = run_batch(pages, args.output_dir, reader, translator, src_lang,
+                       dest_langs if len(dest_langs) > 1 else dest_langs[0],
+                       ocr_mode=args.ocr_mode, font=font, font_size=args.font_size,
+                       skip_existing=args.skip_existing, jobs=args.jobs,
+                       ocr_cache=ocr_cache, reader_settings={'langs': ocr_langs},
+                       tile_height=args.tile_height or None, tile_overlap=args.tile_overlap)
+    if ocr_cache is not None:
+        stats = ocr_cache.stats()
+        print(f"Кеш OCR: влучань {stats['hits']}, промахів {stats['misses']}")
+    if memory is not None:
+        stats = memory.stats()
+        print(f"Пам'ять перекладів: влучань {stats['hits']}, нечітких {stats['fuzzy_hits']}, промахів {stats['misses']}, записів {stats['entries']}")
+    if coalescer is not None:
+        coalescer.close()
+        if coalescer.batches_run:
+            print(f"Об'єднаних запитів перекладу: {coalescer.batches_run}, речень {coalescer.items_requested}, "
+                  f"надіслано унікальних {coalescer.items_sent}")
+    if hedged is not None:
+        hedged.close()
+        wins = ", ".join(f"{service}: {count}" for service, count in hedged.wins.items())
+        print(f"Резервних запитів: {hedged.hedges}, виграші: {wins}")
+    from .rate_limiter import limiter_states
+    for service, state in limiter_states().items():
+        print(f"Обмежувач {service}: ліміт {state['limit']}, {state['rate']} запит/с, "
+              f"429: {state['throttled']}, помилок: {state['errors']}, успішних: {state['successes']}")
+    # Обгортки (пам'ять, об'єднання запитів) тримають базовий перекладач у .translator
+    base_translator = translator
+    while isinstance(getattr(base_translator, 'translator', None), BaseTranslator):
+        base_translator = base_translator.translator
+    if isinstance(base_translator, LLMTranslator):
+        print(f"Запитів до {args.service}: {base_translator.requests_sent}, "
+              f"повторно запитаних сегментів: {base_translator.segments_retried}")
+    if key_scheduler is not None:
+        for key, stats in key_scheduler.stats().items():
+            remaining = "невідомо" if stats['remaining'] is None else stats['remaining']
+            print(f"Ключ {key[:4]}...: використано символів {stats['used']}, залишок {remaining}"
+                  f"{' (вичерпано)' if stats['exhausted'] else ''}")
+    if hasattr(reader, 'close'):
+        reader.close()
+    if hasattr(reader, 'batches_run') and reader.batches_run:
+        print(f"OCR пакетів: {reader.batches_run}, у середньому {reader.images_processed / reader.batches_run:.1f} зображень на пакет")
+    print(f"Готово за {time.perf_counter() - started:.1f} с. Успішно: {len(pages) - len(failed)}, з помилками: {len(failed)}")
+    return 1 if failed else 0
@@ -0,0 +1,171 @@
+# app/core/fuzzy_index.py
+# Нечіткий пошук рядків за n-грамами з перевіркою відстанню Левенштейна.
+# Схожість: 1 - distance / max(len(a), len(b)).
+#
+# Кандидати відбираються prefix-фільтром: якщо схожість >= t, то відстань
+# d <= (1 - t) * len(query) / t, і кожна правка знищує не більше q n-грам,
+# тож кандидат мусить містити хоча б одну з (q * d + 1) найрідкісніших n-грам запиту,
+# а серед (q * d + 1 + k) найрідкісніших — щонайменше k + 1. Списки id зберігаються
+# як array('i'), тож входження рахуються одним np.bincount, а до перевірки відстанню
+# доходять лише одиниці кандидатів.
+#
+# Довжина n-грами залежить від письма: склад хангиль чи ієрогліф несе багато інформації,
+# тож для CJK вистачає біграм, а біграми й навіть триграми латиниці/кирилиці ("th", "the")
+# трапляються майже в кожному записі — для них беруться 4-грами. Рядки різного письма
+# мають n-грами різної довжини й не перетинаються.
+
+from array import array
+
+import numpy as np
+
+CJK_NGRAM = 2
+DEFAULT_NGRAM = 4
+# Скільки списків понад prefix-фільтр рахувати (k вище)
+EXTRA_PROBES = 8
+_PAD = "\x00"
+
+
+def _is_cjk(char):
+    code = ord(char)
+    return (0xAC00 <= code <= 0xD7A3      # склади хангиль
+            or 0x1100 <= code <= 0x11FF   # джамо хангиль
+            or 0x3130 <= code <= 0x318F   # сумісні джамо
+            or 0x3040 <= code <= 0x30FF   # хірагана, катакана
+            or 0x4E00 <= code <= 0x9FFF   # ієрогліфи CJK
+            or 0x3400 <= code <= 0x4DBF)
+
+
+def ngram_size(text):
+    """Біграми для тексту з CJK-символами, 4-грами для решти."""
+    return CJK_NGRAM if any(_is_cjk(char) for char in text) else DEFAULT_NGRAM
+
+
+def _padded(text, n):
+    return _PAD * (n - 1) + text + _PAD * (n - 1)
+
+
+def ngrams(text, n=DEFAULT_NGRAM):
+    padded = _padded(text, n)
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+def bounded_levenshtein(a, b, max_distance):
+    """Відстань Левенштейна або max_distance + 1, якщо вона більша.
+
+    Бітово-паралельний алгоритм Маєрса: стовпчик матриці — біти одного цілого числа,
+    тож на символ припадає кілька операцій над int замість циклу по рядку.
+    """
+    too_far = max_distance + 1
+    if abs(len(a) - len(b)) > max_distance:
+        return too_far
+    if not a or not b:
+        return max(len(a), len(b))
+    if len(a) < len(b):
+        a, b = b, a
+    mask = (1 << len(a)) - 1
+    high = 1 << (len(a) - 1)
+    peq = {}
+    for i, char in enumerate(a):
+        peq[char] = peq.get(char, 0) | (1 << i)
+    pv, mv, score = mask, 0, len(a)
+    remaining = len(b)
+    for char in b:
+        eq = peq.get(char, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        remaining -= 1
+        # Кожен символ, що лишився, зменшує відстань щонайбільше на 1
+        if score - remaining > max_distance:
+            return too_far
+        ph = ((ph << 1) | 1) & mask
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+    return score if score <= max_distance else too_far
+
+
+class FuzzyIndex:
+    def __init__(self, n=None):
+        """n — фіксована довжина n-грами; None — вибір за письмом кожного рядка (ngram_size)."""
+        self.n = n
+        self._keys = []        # id -> рядок
+        self._values = []      # id -> значення
+        self._lengths = array('i')  # id -> довжина рядка
+        self._ids = {}         # рядок -> id
+        self._postings = {}    # n-грама -> array('i') з id
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, key, value):
+        entry_id = self._ids.get(key)
+        if entry_id is not None:
+            self._values[entry_id] = value
+            return
+        entry_id = len(self._keys)
+        self._ids[key] = entry_id
+        self._keys.append(key)
+        self._values.append(value)
+        self._lengths.append(len(key))
+        postings = self._postings
+        for gram in ngrams(key, self.n or ngram_size(key)):
+            posting = postings.get(gram)
+            if posting is None:
+                postings[gram] = array('i', (entry_id,))
+            else:
+                posting.append(entry_id)
+
+    def search(self, query, threshold):
+        """Повертає (key, value, score) найкращого збігу зі score >= threshold або None."""
+        if not query or threshold <= 0:
+            return None
+        exact_id = self._ids.get(query)
+        if exact_id is not None:
+            return query, self._values[exact_id], 1.0
+
+        query_len = len(query)
+        max_distance = int((1 - threshold) * query_len / threshold + 1e-9)
+        if max_distance == 0:
+            return None
+        n = self.n or ngram_size(query)
+        query_grams = ngrams(query, n)
+        min_overlap = len(query_grams) - n * max_distance
+        if min_overlap <= 0:
+            # Запит надто короткий для n-грамного фільтра — нечіткий збіг ненадійний
+            return None
+
+        postings = [self._postings.get(gram) for gram in query_grams]
+        postings = sorted((posting for posting in postings if posting), key=len)
+        # Відсутні в індексі n-грами — найрідкісніші, їх теж враховує probe_count
+        missing = len(query_grams) - len(postings)
+        probe_count = min(len(query_grams), n * max_distance + 1 + EXTRA_PROBES)
+        # Скільки з перших probe_count списків мусить містити справжній збіг
+        required = min_overlap - (len(query_grams) - probe_count)
+        probed = postings[:max(0, probe_count - missing)]
+        if not probed:
+            return None
+        counts = np.bincount(np.concatenate([np.frombuffer(posting, dtype=np.intc) for posting in probed]))
+        candidates = np.flatnonzero(counts >= required)
+        min_len, max_len = query_len * threshold, query_len / threshold
+        lengths = np.frombuffer(self._lengths, dtype=np.intc)[candidates]
+        candidates = candidates[(lengths >= min_len) & (lengths <= max_len)]
+
+        best = None
+        for entry_id in candidates.tolist():
+            key = self._keys[entry_id]
+            padded_key = _padded(key, n)
+            if sum(gram in padded_key for gram in query_grams) < min_overlap:
+                continue
+            distance = bounded_levenshtein(query, key, max_distance)
+            if distance > max_distance:
+                continue
+            score = 1 - distance / max(query_len, len(key))
+            if score >= threshold and (best is None or score > best[2]):
+                best = (key, self._values[entry_id], score)
+        return best
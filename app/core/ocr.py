@@ -0,0 +1,40 @@
+# app/core/ocr.py
+
+import cv2
+import numpy as np
+
+DEFAULT_OCR_LANGS = ['ko', 'en']
+
+
+def create_reader(ocr_langs=None):
+    """Створює easyocr.Reader, намагаючись спершу використати GPU."""
+    import easyocr # важкий імпорт (torch), тому лише тут
+    ocr_langs = list(ocr_langs or DEFAULT_OCR_LANGS)
+    try:
+        reader = easyocr.Reader(ocr_langs, gpu=True)
+        device = "GPU"
+    except Exception:
+        reader = easyocr.Reader(ocr_langs, gpu=False)
+        device = "CPU"
+    return reader, device, ocr_langs
+
+
+def read_image_bytes(image_path):
+    with open(image_path, "rb") as f:
+        return f.read()
+
+
+def decode_image(image_bytes):
+    """Декодує байти зображення у BGR-масив (працює і з не-ASCII шляхами, на відміну від cv2.imread)."""
+    return cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+
+
+def prepare_ocr_input(img, mode="standard"):
+    """Готує BGR-масив до easyocr: адаптивна бінаризація для 'opencv', RGB для стандартного режиму."""
+    if mode == "opencv":
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                     cv2.THRESH_BINARY, 11, 2)
+    # easyocr, читаючи файл сам, отримує RGB; масив BGR він сприйняв би як RGB
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
@@ -0,0 +1,140 @@
+# app/core/ocr_batching.py
+# Пакетний OCR: запити readtext() з різних потоків (сторінки, тайли) накопичуються
+# і проганяються через reader.readtext_batched разом, що на CPU амортизує накладні
+# витрати моделі. Пакет відправляється, щойно набирається max_batch зображень
+# схожого розміру або найстаріший запит чекає довше за max_wait.
+
+import time
+import threading
+
+DEFAULT_MAX_BATCH = 8
+DEFAULT_MAX_WAIT = 0.05
+# Зображення, розміри яких збігаються з точністю до стількох пікселів, потрапляють в один пакет
+DEFAULT_SIZE_QUANTUM = 32
+
+
+class _Request:
+    __slots__ = ('image', 'created', 'event', 'result', 'error')
+
+    def __init__(self, image):
+        self.image = image
+        self.created = time.monotonic()
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _scale_results(results, scale_x, scale_y):
+    if scale_x == 1 and scale_y == 1:
+        return results
+    return [
+        ([[float(x) * scale_x, float(y) * scale_y] for x, y in bbox], text, prob)
+        for bbox, text, prob in results
+    ]
+
+
+class BatchingReader:
+    """Обгортка над easyocr.Reader з тим самим readtext(), безпечна для виклику з багатьох потоків.
+
+    Сам reader викликається лише з одного фонового потоку.
+    """
+
+    def __init__(self, reader, max_batch=DEFAULT_MAX_BATCH, max_wait=DEFAULT_MAX_WAIT,
+                 size_quantum=DEFAULT_SIZE_QUANTUM, recognition_batch_size=8, readtext_kwargs=None):
+        self.reader = reader
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.size_quantum = size_quantum
+        self.recognition_batch_size = recognition_batch_size
+        self.readtext_kwargs = readtext_kwargs or {}
+        # Стільки сторінок/тайлів DetectStage може подавати одночасно, щоб пакет встиг наповнитися
+        self.concurrency = max_batch
+        self.batches_run = 0
+        self.images_processed = 0
+        self._buckets = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._loop, name="ocr-batcher", daemon=True)
+        self._thread.start()
+
+    def _bucket_key(self, image):
+        height, width = image.shape[:2]
+        channels = image.shape[2] if image.ndim == 3 else 1
+        return channels, round(height / self.size_quantum), round(width / self.size_quantum)
+
+    def readtext(self, image):
+        request = _Request(image)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("BatchingReader вже закрито")
+            self._buckets.setdefault(self._bucket_key(image), []).append(request)
+            self._cond.notify()
+        request.event.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _take_ready_batch(self):
+        now = time.monotonic()
+        next_deadline = None
+        for key, requests in self._buckets.items():
+            if len(requests) >= self.max_batch or now - requests[0].created >= self.max_wait or self._closed:
+                batch = requests[:self.max_batch]
+                del requests[:self.max_batch]
+                if not requests:
+                    del self._buckets[key]
+                return batch, None
+            deadline = requests[0].created + self.max_wait
+            if next_deadline is None or deadline < next_deadline:
+                next_deadline = deadline
+        return None, next_deadline
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while True:
+                    batch, deadline = self._take_ready_batch()
+                    if batch:
+                        break
+                    if self._closed:
+                        return
+                    self._cond.wait(None if deadline is None else max(0.0, deadline - time.monotonic()))
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        try:
+            if len(batch) == 1:
+                results = [self.reader.readtext(batch[0].image, batch_size=self.recognition_batch_size,
+                                                **self.readtext_kwargs)]
+            else:
+                # readtext_batched приводить усі зображення до n_width x n_height — масштабуємо бокси назад
+                height, width = batch[0].image.shape[:2]
+                results = self.reader.readtext_batched([r.image for r in batch], n_width=width, n_height=height,
+                                                       batch_size=self.recognition_batch_size, **self.readtext_kwargs)
+                results = [
+                    _scale_results(result, r.image.shape[1] / width, r.image.shape[0] / height)
+                    for r, result in zip(batch, results)
+                ]
+        except Exception as e:
+            for request in batch:
+                request.error = e
+                request.event.set()
+            return
+        self.batches_run += 1
+        self.images_processed += len(batch)
+        for request, result in zip(batch, results):
+            request.result = result
+            request.event.set()
+
+    def close(self):
+        """Дочікується обробки вже поданих запитів і зупиняє фоновий потік."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,110 @@
+# app/core/ocr_cache.py
+# Дисковий кеш результатів OCR, адресований вмістом зображення.
+# Ключ: sha256 байтів зображення + режим OCR + мови + налаштування reader'а.
+# Кожен запис — окремий JSON-файл; при перевищенні ліміту розміру видаляються
+# найдавніше використані записи (LRU за часом модифікації файлу).
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Збільшити, якщо змінюється формат запису або логіка розпізнавання
+CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                 'cache', 'ocr')
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+
+class OcrCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> розмір файлу; порядок від найдавніше до найнещодавніше використаного
+        self._index = OrderedDict()
+        self._total_bytes = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith('.json'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name[:-5], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total_bytes += size
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    @staticmethod
+    def make_key(image_bytes, mode, settings=None):
+        """settings — усе, що впливає на результат reader'а (мови, параметри readtext тощо)."""
+        meta = json.dumps({'v': CACHE_VERSION, 'mode': mode, 'settings': settings or {}}, sort_keys=True)
+        digest = hashlib.sha256(image_bytes)
+        digest.update(meta.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+            try:
+                with open(self._path(key), 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                os.utime(self._path(key))
+            except (OSError, json.JSONDecodeError):
+                self._forget(key)
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+            self.hits += 1
+        return [(bbox, text, prob) for bbox, text, prob in data]
+
+    def put(self, key, ocr_results):
+        # numpy-типи з easyocr перетворюються на звичайні числа
+        data = [
+            [[[float(x), float(y)] for x, y in bbox], text, float(prob)]
+            for bbox, text, prob in ocr_results
+        ]
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with self._lock:
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_path, path)
+                size = os.path.getsize(path)
+            except OSError as e:
+                print(f"Не вдалося записати кеш OCR: {e}")
+                return
+            self._total_bytes += size - self._index.pop(key, 0)
+            self._index[key] = size
+            self._evict()
+
+    def _forget(self, key):
+        self._total_bytes -= self._index.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and len(self._index) > 1:
+            oldest_key = next(iter(self._index))
+            self._forget(oldest_key)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._index):
+                self._forget(key)
+
+    def stats(self):
+        return {'entries': len(self._index), 'bytes': self._total_bytes, 'hits': self.hits, 'misses': self.misses}
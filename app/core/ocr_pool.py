@@ -0,0 +1,94 @@
+# app/core/ocr_pool.py
+# Пул процесів для OCR: кожен процес один раз завантажує easyocr.Reader,
+# а зображення передаються через shared memory замість pickle масивів.
+# Об'єкт пулу має той самий метод readtext(), що й easyocr.Reader,
+# тому його можна передати в DetectStage замість звичайного reader'а.
+
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .ocr import DEFAULT_OCR_LANGS
+
+# Reader поточного процесу-обробника
+_worker_reader = None
+
+
+def _attach_shared_memory(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False) # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        # Інакше resource_tracker обробника видалить блок, яким володіє головний процес
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def _init_worker(ocr_langs, torch_threads, gpu):
+    global _worker_reader
+    if torch_threads:
+        import torch
+        torch.set_num_threads(torch_threads)
+    import easyocr
+    _worker_reader = easyocr.Reader(ocr_langs, gpu=gpu, verbose=False)
+
+
+def _readtext_in_worker(shm_name, shape, dtype, readtext_kwargs):
+    shm = _attach_shared_memory(shm_name)
+    try:
+        image = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        results = _worker_reader.readtext(image, **readtext_kwargs)
+        del image # буфер має бути звільнений до shm.close()
+    finally:
+        shm.close()
+    return [
+        ([[float(x), float(y)] for x, y in bbox], text, float(prob))
+        for bbox, text, prob in results
+    ]
+
+
+class OcrProcessPool:
+    def __init__(self, ocr_langs=None, workers=None, torch_threads=1, gpu=False, readtext_kwargs=None):
+        """workers — кількість процесів (за замовчуванням: ядра / torch_threads);
+        torch_threads — потоки torch у кожному процесі."""
+        self.ocr_langs = list(ocr_langs or DEFAULT_OCR_LANGS)
+        cpu_count = os.cpu_count() or 1
+        self.workers = workers or max(1, cpu_count // max(1, torch_threads or 1))
+        self.torch_threads = torch_threads
+        self.readtext_kwargs = readtext_kwargs or {}
+        # Скільки сторінок DetectStage може віддавати пулу одночасно
+        self.concurrency = self.workers
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.ocr_langs, torch_threads, gpu),
+        )
+
+    def readtext(self, image):
+        """Блокуючий аналог easyocr.Reader.readtext для масиву numpy."""
+        if not isinstance(image, np.ndarray):
+            raise TypeError("OcrProcessPool.readtext очікує масив numpy (результат PreprocessStage)")
+        image = np.ascontiguousarray(image)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, image.nbytes))
+        try:
+            np.ndarray(image.shape, dtype=image.dtype, buffer=shm.buf)[...] = image
+            future = self._executor.submit(_readtext_in_worker, shm.name, image.shape,
+                                           image.dtype.str, self.readtext_kwargs)
+            return future.result()
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
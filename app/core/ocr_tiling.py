@@ -0,0 +1,107 @@
+# app/core/ocr_tiling.py
+# OCR довгих вебтун-стрічок по горизонтальних смугах (тайлах), що перекриваються.
+# easyocr зменшує зображення до canvas_size, тож на стрічці 800x15000 дрібний текст губиться,
+# а проміжні буфери моделі ростуть разом із висотою. Тайли обмежують і те, й інше.
+
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_TILE_HEIGHT = 2048
+# Перекриття має бути більшим за найвищий рядок тексту, інакше рядок на шві розріжеться в обох тайлах
+DEFAULT_TILE_OVERLAP = 256
+# Бокс ближче за стільки пікселів до внутрішнього краю тайла вважається обрізаним
+EDGE_MARGIN = 3
+# Частка меншого боксу, що має перетинатися з іншим, щоб вважати їх дублікатами
+DUPLICATE_OVERLAP = 0.5
+
+
+def split_into_tiles(height, tile_height=DEFAULT_TILE_HEIGHT, overlap=DEFAULT_TILE_OVERLAP):
+    """Повертає [(y0, y1), ...]; якщо зображення ненабагато вище за тайл — один тайл на все."""
+    if height <= tile_height * 1.25:
+        return [(0, height)]
+    step = max(1, tile_height - overlap)
+    tiles = []
+    y0 = 0
+    while True:
+        y1 = min(height, y0 + tile_height)
+        tiles.append((y0, y1))
+        if y1 >= height:
+            return tiles
+        y0 += step
+
+
+def _bounds(bbox):
+    xs = [p[0] for p in bbox]
+    ys = [p[1] for p in bbox]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _overlap_ratio(a, b):
+    ix = min(a[2], b[2]) - max(a[0], b[0])
+    iy = min(a[3], b[3]) - max(a[1], b[1])
+    if ix <= 0 or iy <= 0:
+        return 0.0
+    smaller = min((a[2] - a[0]) * (a[3] - a[1]), (b[2] - b[0]) * (b[3] - b[1]))
+    return ix * iy / smaller if smaller > 0 else 0.0
+
+
+def merge_tile_results(tiles, tile_results):
+    """Переводить бокси в координати сторінки та прибирає дублікати з зон перекриття.
+
+    З двох дублікатів залишається необрізаний краєм тайла, потім — з вищою впевненістю.
+    """
+    entries = []
+    for tile_index, ((y0, y1), results) in enumerate(zip(tiles, tile_results)):
+        is_first, is_last = tile_index == 0, tile_index == len(tiles) - 1
+        for bbox, text, prob in results:
+            page_bbox = [[float(x), float(y) + y0] for x, y in bbox]
+            bounds = _bounds(page_bbox)
+            truncated = (not is_first and bounds[1] <= y0 + EDGE_MARGIN) or \
+                        (not is_last and bounds[3] >= y1 - EDGE_MARGIN)
+            entries.append((tile_index, bounds, truncated, (page_bbox, text, float(prob))))
+
+    seam_zones = [(tiles[i + 1][0], tiles[i][1]) for i in range(len(tiles) - 1)]
+
+    def in_seam(bounds):
+        return any(bounds[1] < zone_end and bounds[3] > zone_start for zone_start, zone_end in seam_zones)
+
+    kept = []
+    seam_kept = []
+    for entry in entries:
+        tile_index, bounds, truncated, result = entry
+        if not in_seam(bounds):
+            kept.append(entry)
+            continue
+        duplicate_of = None
+        for i, other in enumerate(seam_kept):
+            if other[0] != tile_index and _overlap_ratio(bounds, other[1]) >= DUPLICATE_OVERLAP:
+                duplicate_of = i
+                break
+        if duplicate_of is None:
+            seam_kept.append(entry)
+            continue
+        other = seam_kept[duplicate_of]
+        # (не обрізаний, впевненість) — більше краще
+        if (not truncated, result[2]) > (not other[2], other[3][2]):
+            seam_kept[duplicate_of] = entry
+
+    merged = kept + seam_kept
+    merged.sort(key=lambda e: (e[1][1], e[1][0]))
+    return [entry[3] for entry in merged]
+
+
+def readtext_tiled(reader, image, tile_height=DEFAULT_TILE_HEIGHT, overlap=DEFAULT_TILE_OVERLAP):
+    """reader.readtext для високого масиву numpy, тайл за тайлом.
+
+    Тайли — це зрізи (view) без копіювання. Якщо reader підтримує паралельність
+    (OcrProcessPool), тайли відправляються одночасно.
+    """
+    tiles = split_into_tiles(image.shape[0], tile_height, overlap)
+    if len(tiles) == 1:
+        return reader.readtext(image)
+    parallel = getattr(reader, 'concurrency', 1)
+    if parallel > 1:
+        with ThreadPoolExecutor(max_workers=min(parallel, len(tiles))) as executor:
+            tile_results = list(executor.map(lambda t: reader.readtext(image[t[0]:t[1]]), tiles))
+    else:
+        tile_results = [reader.readtext(image[y0:y1]) for y0, y1 in tiles]
+    return merge_tile_results(tiles, tile_results)
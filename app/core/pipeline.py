@@ -0,0 +1,395 @@
+# app/core/pipeline.py
+# Конвеєр обробки сторінки, що не залежить від віджетів Qt.
+# Етапи: load → [ocr_cache] → preprocess → detect → group → translate → distribute → render.
+# Переклад кількома мовами використовує той самий OCR і групування, рендер — одне декодоване зображення.
+# Один і той самий Pipeline можна запускати синхронно, з пулу потоків або з asyncio,
+# тому GUI, пакетний режим та будь-який серверний режим працюють поверх нього.
+
+import time
+import queue
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from .ocr import read_image_bytes, decode_image, prepare_ocr_input
+from .ocr_tiling import readtext_tiled, DEFAULT_TILE_OVERLAP
+from .text_layout import build_regions, group_text_bubbles, combine_group_texts, distribute_text_to_group
+from .translators import is_error_translation
+
+
+# ======================================================================
+# ДАНІ СТОРІНКИ
+# ======================================================================
+@dataclass
+class PageJob:
+    image_path: str
+    ocr_mode: str = "standard"
+    output_path: str = None
+    image_bytes: bytes = None
+    image: object = None        # BGR масив numpy
+    ocr_input: object = None    # те, що передається в reader.readtext
+    ocr_results: list = None    # [(bbox, text, prob), ...]
+    ocr_cache_key: str = None
+    regions: list = field(default_factory=list)
+    groups: list = field(default_factory=list)
+    sentences: list = field(default_factory=list)
+    translations: list = field(default_factory=list)
+    rendered: object = None     # QImage
+    # Режим кількох мов перекладу: мова -> переклади / блоки з перекладом / QImage / шлях збереження
+    translations_by_lang: dict = field(default_factory=dict)
+    regions_by_lang: dict = field(default_factory=dict)
+    rendered_by_lang: dict = field(default_factory=dict)
+    output_paths: dict = field(default_factory=dict)
+    timings: dict = field(default_factory=dict)
+    error: Exception = None
+    failed_stage: str = None
+
+    @property
+    def failed(self):
+        return self.error is not None
+
+
+# ======================================================================
+# ІНТЕРФЕЙС ЕТАПУ
+# ======================================================================
+class PipelineStage(ABC):
+    name = "stage"
+    # Скільки сторінок може одночасно перебувати в етапі (None — без обмежень)
+    concurrency = None
+
+    @abstractmethod
+    def process(self, page: PageJob) -> None:
+        """Змінює page на місці. Виняток зупиняє обробку лише цієї сторінки."""
+        pass
+
+    def close(self):
+        """Звільняє ресурси етапу (потоки тощо); викликається з Pipeline.close()."""
+        pass
+
+
+class LoadStage(PipelineStage):
+    name = "load"
+
+    def process(self, page):
+        if page.image_bytes is None:
+            page.image_bytes = read_image_bytes(page.image_path)
+
+
+class OcrCacheLookupStage(PipelineStage):
+    """Бере результати OCR з OcrCache; при влученні preprocess і detect пропускаються."""
+    name = "ocr_cache"
+
+    def __init__(self, cache, reader_settings=None):
+        self.cache = cache
+        self.reader_settings = reader_settings or {}
+
+    def process(self, page):
+        page.ocr_cache_key = self.cache.make_key(page.image_bytes, page.ocr_mode, self.reader_settings)
+        page.ocr_results = self.cache.get(page.ocr_cache_key)
+
+
+class PreprocessStage(PipelineStage):
+    name = "preprocess"
+
+    def process(self, page):
+        if page.ocr_results is not None:
+            return
+        page.image = decode_image(page.image_bytes)
+        if page.image is None:
+            raise IOError(f"не вдалося декодувати зображення {page.image_path}")
+        page.ocr_input = prepare_ocr_input(page.image, page.ocr_mode)
+
+
+class DetectStage(PipelineStage):
+    name = "detect"
+    # Один easyocr.Reader не можна безпечно викликати з кількох потоків
+    concurrency = 1
+
+    def __init__(self, reader, cache=None, tile_height=None, tile_overlap=DEFAULT_TILE_OVERLAP):
+        """tile_height — висота смуги для OCR довгих стрічок (None — розпізнавати зображення цілим)."""
+        self.reader = reader
+        self.cache = cache
+        self.tile_height = tile_height
+        self.tile_overlap = tile_overlap
+        # Пул процесів (OcrProcessPool) може обробляти кілька сторінок одночасно
+        self.concurrency = getattr(reader, 'concurrency', 1)
+
+    def process(self, page):
+        if page.ocr_results is not None:
+            return
+        if self.tile_height:
+            page.ocr_results = readtext_tiled(self.reader, page.ocr_input, self.tile_height, self.tile_overlap)
+        else:
+            page.ocr_results = self.reader.readtext(page.ocr_input)
+        # Декодований масив далі не потрібен (рендер працює з image_bytes) — не тримаємо його до кінця запуску
+        page.ocr_input = page.image = None
+        if self.cache is not None and page.ocr_cache_key:
+            self.cache.put(page.ocr_cache_key, page.ocr_results)
+
+
+class GroupStage(PipelineStage):
+    name = "group"
+
+    def __init__(self, font="Arial", font_size=14, max_distance=None):
+        self.font = font
+        self.font_size = font_size
+        self.max_distance = max_distance
+
+    def process(self, page):
+        page.regions = build_regions(page.ocr_results, self.font, self.font_size)
+        page.groups = group_text_bubbles(page.ocr_results, self.max_distance)
+        page.sentences = combine_group_texts(page.regions, page.groups)
+
+
+class TranslateStage(PipelineStage):
+    name = "translate"
+
+    def __init__(self, translator, src_lang, dest_lang, concurrency=None):
+        """dest_lang — код мови або список кодів: тоді сторінка перекладається всіма мовами одночасно
+        (результати в page.translations_by_lang, а page.translations — переклад першою мовою)."""
+        self.translator = translator
+        self.src_lang = src_lang
+        self.dest_langs = [dest_lang] if isinstance(dest_lang, str) else list(dest_lang)
+        self.multi_lang = not isinstance(dest_lang, str)
+        self.dest_lang = self.dest_langs[0]
+        # CoalescingTranslator об'єднує кілька сторінок в один запит, тому просить більше сторінок одночасно
+        self.concurrency = concurrency or getattr(translator, 'pages_in_flight', 4)
+        self._executor = None
+        if len(self.dest_langs) > 1:
+            # Мови кожної зі сторінок, що одночасно перебувають в етапі, перекладаються паралельно
+            self._executor = ThreadPoolExecutor(max_workers=len(self.dest_langs) * self.concurrency,
+                                                thread_name_prefix="translate-lang")
+
+    def _translate(self, sentences, dest_lang):
+        items = self.translator.translate_batch([{'text': s} for s in sentences], self.src_lang, dest_lang)
+        return [item.get('translated', 'ПОМИЛКА') for item in items]
+
+    def process(self, page):
+        if not page.sentences:
+            page.translations = []
+            page.translations_by_lang = {lang: [] for lang in self.dest_langs} if self.multi_lang else {}
+            return
+        if self._executor is None:
+            translations = [self._translate(page.sentences, self.dest_lang)]
+        else:
+            translations = list(self._executor.map(lambda lang: self._translate(page.sentences, lang), self.dest_langs))
+        # Перекладачі позначають невдалі речення текстом "ПОМИЛКА ..." — такий переклад не малюємо і не зберігаємо
+        for lang, lang_translations in zip(self.dest_langs, translations):
+            error = next((text for text in lang_translations if is_error_translation(text)), None)
+            if error is not None:
+                raise RuntimeError(f"переклад ({lang}) не вдався: {error}")
+        page.translations = translations[0]
+        if self.multi_lang:
+            page.translations_by_lang = dict(zip(self.dest_langs, translations))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+class DistributeStage(PipelineStage):
+    name = "distribute"
+
+    def process(self, page):
+        for group_indices, translated in zip(page.groups, page.translations):
+            distribute_text_to_group(page.regions, group_indices, translated)
+        # Кожна мова отримує власні копії блоків — розмітка та шрифти спільні
+        for lang, translations in page.translations_by_lang.items():
+            regions = [dict(region) for region in page.regions]
+            for group_indices, translated in zip(page.groups, translations):
+                distribute_text_to_group(regions, group_indices, translated)
+            page.regions_by_lang[lang] = regions
+
+
+class RenderStage(PipelineStage):
+    name = "render"
+
+    def __init__(self, save=True):
+        self.save = save
+
+    def process(self, page):
+        # QtGui імпортується лише тут, щоб решта конвеєра працювала без Qt
+        from PyQt6.QtGui import QImage
+        from .renderer import render_translated_image
+        # Зображення декодується один раз для всіх мов
+        base_image = QImage.fromData(page.image_bytes)
+        if base_image.isNull():
+            raise IOError(f"не вдалося завантажити зображення {page.image_path}")
+        if page.regions_by_lang:
+            for lang, regions in page.regions_by_lang.items():
+                rendered = page.rendered_by_lang[lang] = render_translated_image(base_image, regions)
+                output_path = page.output_paths.get(lang)
+                if self.save and output_path and not rendered.save(output_path):
+                    raise IOError(f"не вдалося зберегти {output_path}")
+            page.rendered = page.rendered_by_lang[next(iter(page.regions_by_lang))]
+            return
+        page.rendered = render_translated_image(base_image, page.regions)
+        if self.save and page.output_path and not page.rendered.save(page.output_path):
+            raise IOError(f"не вдалося зберегти {page.output_path}")
+
+
+# ======================================================================
+# КОНВЕЄР
+# ======================================================================
+class Pipeline:
+    def __init__(self, stages):
+        self.stages = list(stages)
+        self._stage_limits = {
+            id(stage): threading.BoundedSemaphore(stage.concurrency)
+            for stage in self.stages if stage.concurrency
+        }
+
+    def close(self):
+        """Закриває всі етапи. Після цього конвеєр не можна запускати знову."""
+        for stage in self.stages:
+            stage.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run_stage(self, stage, page):
+        started = time.perf_counter()
+        try:
+            stage.process(page)
+        except Exception as e:
+            page.error = e
+            page.failed_stage = stage.name
+        finally:
+            page.timings[stage.name] = time.perf_counter() - started
+
+    def run(self, page: PageJob) -> PageJob:
+        """Синхронно проганяє одну сторінку через усі етапи, дотримуючись лімітів паралельності етапів."""
+        for stage in self.stages:
+            if page.failed:
+                break
+            limit = self._stage_limits.get(id(stage))
+            if limit is None:
+                self._run_stage(stage, page)
+            else:
+                with limit:
+                    self._run_stage(stage, page)
+        return page
+
+    def run_many(self, pages, on_page_done=None):
+        results = []
+        for page in pages:
+            self.run(page)
+            if on_page_done: on_page_done(page)
+            results.append(page)
+        return results
+
+    def run_threaded(self, pages, max_workers=4, on_page_done=None):
+        """Обробляє сторінки в пулі потоків; поки одна сторінка в OCR, інші перекладаються чи відтворюються.
+
+        on_page_done викликається в міру завершення сторінок; повертає сторінки у вхідному порядку.
+        """
+        pages = list(pages)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self.run, page) for page in pages]
+            for future in as_completed(futures):
+                page = future.result()
+                if on_page_done: on_page_done(page)
+        return pages
+
+    def run_pipelined(self, pages, queue_size=2, on_page_done=None):
+        """Конвеєр між сторінками: кожен етап має власні потоки (stage.concurrency або 1)
+        і обмежену чергу на вході, тож OCR сторінки N+1 іде одночасно з перекладом N
+        та відтворенням N-1, а в пам'яті одночасно лише кілька сторінок.
+
+        on_page_done викликається в потоці, що викликав метод, у порядку завершення.
+        """
+        pages = list(pages)
+        if not pages:
+            return pages
+        stop_marker = object()
+        worker_counts = [stage.concurrency or 1 for stage in self.stages]
+        queues = [queue.Queue(maxsize=queue_size) for _ in self.stages] + [queue.Queue()]
+        remaining_workers = list(worker_counts)
+        lock = threading.Lock()
+
+        def feed():
+            for page in pages:
+                queues[0].put(page)
+            for _ in range(worker_counts[0]):
+                queues[0].put(stop_marker)
+
+        def work(index, stage):
+            inbox, outbox = queues[index], queues[index + 1]
+            while True:
+                page = inbox.get()
+                if page is stop_marker:
+                    break
+                if not page.failed:
+                    self._run_stage(stage, page)
+                outbox.put(page)
+            with lock:
+                remaining_workers[index] -= 1
+                last_worker = remaining_workers[index] == 0
+            if last_worker:
+                next_count = worker_counts[index + 1] if index + 1 < len(self.stages) else 1
+                for _ in range(next_count):
+                    outbox.put(stop_marker)
+
+        threads = [threading.Thread(target=feed, daemon=True)]
+        for index, stage in enumerate(self.stages):
+            threads += [threading.Thread(target=work, args=(index, stage), daemon=True)
+                        for _ in range(worker_counts[index])]
+        for thread in threads:
+            thread.start()
+        while True:
+            page = queues[-1].get()
+            if page is stop_marker:
+                break
+            if on_page_done: on_page_done(page)
+        for thread in threads:
+            thread.join()
+        return pages
+
+    async def run_async(self, pages, on_page_done=None):
+        """Варіант для asyncio: етапи виконуються в потоках, ліміти паралельності — через asyncio.Semaphore."""
+        limits = {id(stage): asyncio.Semaphore(stage.concurrency) for stage in self.stages if stage.concurrency}
+
+        async def run_page(page):
+            for stage in self.stages:
+                if page.failed:
+                    break
+                limit = limits.get(id(stage))
+                if limit is None:
+                    await asyncio.to_thread(self._run_stage, stage, page)
+                else:
+                    async with limit:
+                        await asyncio.to_thread(self._run_stage, stage, page)
+            if on_page_done: on_page_done(page)
+            return page
+
+        return list(await asyncio.gather(*(run_page(page) for page in pages)))
+
+
+def build_ocr_stages(reader, ocr_cache=None, reader_settings=None, tile_height=None, tile_overlap=DEFAULT_TILE_OVERLAP):
+    stages = [LoadStage()]
+    if ocr_cache is not None:
+        cache_settings = dict(reader_settings or {})
+        if tile_height:
+            # Тайлінг змінює результат, тому входить у ключ кешу
+            cache_settings['tiling'] = [tile_height, tile_overlap]
+        stages.append(OcrCacheLookupStage(ocr_cache, cache_settings))
+    stages += [PreprocessStage(), DetectStage(reader, ocr_cache, tile_height, tile_overlap)]
+    return stages
+
+
+def build_default_pipeline(reader, translator=None, src_lang="auto", dest_lang="uk",
+                           font="Arial", font_size=14, render=True, save=True,
+                           ocr_cache=None, reader_settings=None, tile_height=None, tile_overlap=DEFAULT_TILE_OVERLAP):
+    """Збирає стандартний конвеєр. Без перекладача — лише розпізнавання та групування."""
+    stages = build_ocr_stages(reader, ocr_cache, reader_settings, tile_height, tile_overlap) + [GroupStage(font, font_size)]
+    if translator is not None:
+        stages += [TranslateStage(translator, src_lang, dest_lang), DistributeStage()]
+        if render:
+            stages.append(RenderStage(save=save))
+    return Pipeline(stages)
@@ -0,0 +1,158 @@
+# app/core/rate_limiter.py
+# Адаптивне обмеження запитів до сервісів перекладу на боці клієнта.
+# Token bucket обмежує частоту запитів, а ліміт одночасних запитів змінюється за AIMD:
+# поки затримка й частка помилок у нормі — ліміт і частота повільно ростуть,
+# на 429 — різко падають удвічі. Один обмежувач на сервіс і API ключ (напр. "deepl:1a2b3c4d"),
+# спільний для всіх перекладачів з цим ключем.
+
+import time
+import threading
+
+# Відповідь вважається повільною, якщо згладжена затримка в стільки разів більша за базову
+LATENCY_TOLERANCE = 2.0
+# Поріг згладженої частки помилок, вище якого ліміт зменшується
+ERROR_RATE_THRESHOLD = 0.2
+_EWMA_ALPHA = 0.1
+
+
+def is_throttle_error(error):
+    """True для відповіді 429 від будь-якого клієнта (deepl, httpx)."""
+    status = getattr(error, 'http_status_code', None)
+    if status is None:
+        response = getattr(error, 'response', None)
+        status = getattr(response, 'status_code', None)
+    return status == 429 or type(error).__name__ == 'TooManyRequestsException'
+
+
+class AdaptiveLimiter:
+    def __init__(self, name, initial_limit=4, min_limit=1, max_limit=64,
+                 initial_rate=10.0, min_rate=0.5, max_rate=200.0, rate_increase=0.1):
+        """Ліміти — кількість одночасних запитів; rate — запитів на секунду (місткість відра — 1 секунда, але не менше одного запиту);
+        rate_increase — на скільки запит/с зростає частота після кожного успішного запиту."""
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(initial_limit)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate = float(initial_rate)
+        self.rate_increase = rate_increase
+        self.tokens = self.rate
+        self.in_flight = 0
+        self.latency = None
+        self.base_latency = None
+        self.error_rate = 0.0
+        self.successes = 0
+        self.errors = 0
+        self.throttled = 0
+        self._last_refill = time.monotonic()
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def _capacity(self):
+        # Відро завжди вміщає хоча б один токен, інакше при rate < 1 acquire() чекав би вічно
+        return max(1.0, self.rate)
+
+    def _refill(self, now):
+        self.tokens = min(self._capacity(), self.tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def acquire(self):
+        """Чекає на вільне місце й токен; повертає час початку запиту для release()."""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self.in_flight < int(self.limit) and self.tokens >= 1:
+                    self.tokens -= 1
+                    self.in_flight += 1
+                    return now
+                if self.in_flight >= int(self.limit):
+                    self._cond.wait()
+                else:
+                    self._cond.wait((1 - self.tokens) / self.rate)
+
+    def _decrease(self, factor, now):
+        # Одне зменшення на "вікно" — інакше пачка одночасних 429 обнулила б ліміт
+        if self.latency is not None and now - self._last_decrease < self.latency:
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit * factor)
+        self.rate = max(self.min_rate, self.rate * factor)
+        self.tokens = min(self.tokens, self._capacity())
+
+    def release(self, started, outcome="ok"):
+        """outcome: 'ok', 'throttled' (429) або 'error'."""
+        with self._cond:
+            now = time.monotonic()
+            self.in_flight -= 1
+            latency = now - started
+            self.error_rate += _EWMA_ALPHA * ((outcome != "ok") - self.error_rate)
+            if outcome == "throttled":
+                self.throttled += 1
+                self._decrease(0.5, now)
+            elif outcome == "error":
+                self.errors += 1
+                if self.error_rate > ERROR_RATE_THRESHOLD:
+                    self._decrease(0.9, now)
+            else:
+                self.successes += 1
+                self.latency = latency if self.latency is None else self.latency + _EWMA_ALPHA * (latency - self.latency)
+                # Базова затримка — повільно "забуваючий" мінімум
+                if self.base_latency is None or latency < self.base_latency:
+                    self.base_latency = latency
+                else:
+                    self.base_latency += 0.01 * (latency - self.base_latency)
+                # Поки сервіс відповідає повільно, ліміт не росте (але й не падає — це робить лише 429/помилки)
+                healthy = self.latency <= self.base_latency * LATENCY_TOLERANCE
+                if healthy and self.error_rate <= ERROR_RATE_THRESHOLD:
+                    # +1 до ліміту за "вікно" з limit успішних запитів
+                    self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                    self.rate = min(self.max_rate, self.rate + self.rate_increase)
+            self._cond.notify_all()
+
+    def call(self, fn, *args, **kwargs):
+        """Виконує fn(*args, **kwargs) як один запит до сервісу; виняток передається далі."""
+        started = self.acquire()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self.release(started, "throttled" if is_throttle_error(e) else "error")
+            raise
+        self.release(started)
+        return result
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                'service': self.name,
+                'limit': int(self.limit),
+                'in_flight': self.in_flight,
+                'rate': round(self.rate, 2),
+                'latency': None if self.latency is None else round(self.latency, 3),
+                'error_rate': round(self.error_rate, 3),
+                'successes': self.successes,
+                'errors': self.errors,
+                'throttled': self.throttled,
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name, **kwargs):
+    """Спільний обмежувач з цим ім'ям (сервіс або "сервіс:відбиток ключа");
+    kwargs для AdaptiveLimiter враховуються лише при першому зверненні."""
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            limiter = _limiters[name] = AdaptiveLimiter(name, **kwargs)
+        return limiter
+
+
+def limiter_states():
+    """Стан усіх обмежувачів для моніторингу: {ім'я: snapshot()}."""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.snapshot() for limiter in limiters}
@@ -0,0 +1,120 @@
+# app/core/region_store.py
+# Компактне сховище текстових блоків сторінки (found_rects).
+# Координати всіх блоків лежать в одному масиві numpy int32 (n x 4: x, y, width, height),
+# а текст, переклад і шрифт — у записах зі __slots__. Масштабування і пошук блоку під курсором
+# рахуються векторно, без створення QRect на кожен блок і кадр.
+# Записи підтримують доступ як до словника (item['text'], item.get('translated')),
+# тому renderer, text_layout і перекладачі працюють зі сховищем так само, як зі списком словників.
+
+import numpy as np
+
+_FIELDS = ('text', 'translated', 'font', 'font_size')
+
+
+def _rect_tuple(rect):
+    """QRect або (x, y, w, h) -> (x, y, w, h); QtCore тут не імпортується."""
+    if hasattr(rect, 'width') and callable(rect.width):
+        return rect.x(), rect.y(), rect.width(), rect.height()
+    x, y, w, h = rect
+    return int(x), int(y), int(w), int(h)
+
+
+class Region:
+    """Один блок сховища; 'rect' читається й записується в спільний масив координат."""
+    __slots__ = ('_store', '_index', 'text', 'translated', 'font', 'font_size')
+
+    def __init__(self, store, index, text='', translated='', font='Arial', font_size=14):
+        self._store = store
+        self._index = index
+        self.text = text
+        self.translated = translated
+        self.font = font
+        self.font_size = font_size
+
+    @property
+    def rect(self):
+        x, y, w, h = self._store._coords[self._index]
+        return int(x), int(y), int(w), int(h)
+
+    @rect.setter
+    def rect(self, value):
+        self._store._coords[self._index] = _rect_tuple(value)
+
+    def __getitem__(self, key):
+        if key != 'rect' and key not in _FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key != 'rect' and key not in _FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key == 'rect' or key in _FIELDS
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+
+class RegionStore:
+    def __init__(self, capacity=16):
+        self._coords = np.zeros((max(1, capacity), 4), dtype=np.int32)
+        self._records = []
+
+    @classmethod
+    def from_dicts(cls, items):
+        """Зі списку словників у форматі build_regions (rect — QRect або кортеж)."""
+        store = cls(len(items))
+        for item in items:
+            store.append(item['rect'], item.get('text', ''), item.get('translated', ''),
+                         item.get('font', 'Arial'), item.get('font_size', 14))
+        return store
+
+    @classmethod
+    def from_ocr_results(cls, ocr_results, font, font_size=14):
+        from .text_layout import build_regions
+        return cls.from_dicts(build_regions(ocr_results, font, font_size))
+
+    def __len__(self):
+        return len(self._records)
+
+    def __iter__(self):
+        return iter(self._records)
+
+    def __getitem__(self, index):
+        return self._records[index]
+
+    def append(self, rect, text='', translated='', font='Arial', font_size=14):
+        index = len(self._records)
+        if index == len(self._coords):
+            # Подвоєння місткості — амортизовано O(1) на блок
+            grown = np.zeros((len(self._coords) * 2, 4), dtype=np.int32)
+            grown[:index] = self._coords[:index]
+            self._coords = grown
+        self._coords[index] = _rect_tuple(rect)
+        record = Region(self, index, text, translated, font, font_size)
+        self._records.append(record)
+        return record
+
+    @property
+    def rects(self):
+        """Масив n x 4 (x, y, width, height) — представлення без копіювання."""
+        return self._coords[:len(self._records)]
+
+    def scaled(self, scale, offset_x=0, offset_y=0):
+        """Прямокутники у координатах відображення: int(v * scale) + зсув, як у ImageLabel."""
+        scaled = (self.rects * scale).astype(np.int32)
+        scaled[:, 0] += offset_x
+        scaled[:, 1] += offset_y
+        return scaled
+
+    def hit_test(self, x, y):
+        """Індекси блоків, що містять точку (координати зображення), від найменшого блоку."""
+        rects = self.rects
+        mask = ((rects[:, 0] <= x) & (x < rects[:, 0] + rects[:, 2]) &
+                (rects[:, 1] <= y) & (y < rects[:, 1] + rects[:, 3]))
+        hits = np.flatnonzero(mask)
+        areas = rects[hits, 2].astype(np.int64) * rects[hits, 3]
+        return hits[np.argsort(areas, kind='stable')]
+
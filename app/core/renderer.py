@@ -0,0 +1,46 @@
+# app/core/renderer.py
+# Відтворення перекладу поверх зображення. Використовує лише QtGui,
+# тому працює і без вікон (наприклад, з QT_QPA_PLATFORM=offscreen).
+
+import os
+from PyQt6.QtGui import QImage, QPainter, QFont, QFontDatabase
+from PyQt6.QtCore import Qt, QRect
+
+COMIC_FONTS_WITH_SPACING = ["Badaboom", "CCShoutOut", "Anime Ace"]
+
+
+def load_fonts(fonts_dir):
+    loaded_font_families = []
+    if not os.path.isdir(fonts_dir):
+        print(f"Папку зі шрифтами не знайдено: {fonts_dir}")
+        return []
+    for font_file in os.listdir(fonts_dir):
+        if font_file.lower().endswith(('.ttf', '.otf')):
+            font_path = os.path.join(fonts_dir, font_file)
+            font_id = QFontDatabase.addApplicationFont(font_path)
+            if font_id != -1:
+                family = QFontDatabase.applicationFontFamilies(font_id)[0]
+                loaded_font_families.append(family)
+    return loaded_font_families
+
+
+def render_translated_image(image: QImage, regions) -> QImage:
+    """Малює перекладений текст поверх копії зображення. 'rect' може бути QRect або (x, y, w, h)."""
+    result = image.copy()
+    painter = QPainter(result)
+    for item in regions:
+        if not item.get('translated', ''): continue
+        rect, text = item['rect'], item['translated']
+        if not isinstance(rect, QRect):
+            rect = QRect(*rect)
+        font_name = item['font']
+        font_size = item['font_size']
+        font = QFont(font_name, font_size)
+        if any(comic_font in font_name for comic_font in COMIC_FONTS_WITH_SPACING):
+            font.setLetterSpacing(QFont.SpacingType.AbsoluteSpacing, 2)
+        painter.setFont(font)
+        painter.fillRect(rect, Qt.GlobalColor.white)
+        painter.setPen(Qt.GlobalColor.black)
+        painter.drawText(rect, int(Qt.AlignmentFlag.AlignCenter | Qt.TextFlag.TextWordWrap), text)
+    painter.end()
+    return result
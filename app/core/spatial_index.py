@@ -0,0 +1,62 @@
+# app/core/spatial_index.py
+# Просторовий індекс прямокутників на рівномірній сітці.
+# Кожен прямокутник записується в усі клітинки, які він перекриває; запит переглядає лише
+# клітинки навколо області пошуку, тож на сторінці з сотнями блоків (чи на стрічці цілого
+# розділу) пошук сусідів коштує O(кандидатів), а не O(n). Сітка розріджена — словник клітинок.
+# Прямокутники — кортежі (x, y, width, height), як у text_layout.
+
+
+class SpatialGrid:
+    def __init__(self, cell_size=64):
+        self.cell_size = max(1, int(cell_size))
+        self._cells = {}    # (col, row) -> [id, ...]
+        self._rects = {}    # id -> прямокутник
+
+    def __len__(self):
+        return len(self._rects)
+
+    def _cell_range(self, rect):
+        x, y, w, h = rect
+        size = self.cell_size
+        # Прямокутник нульової ширини/висоти все одно займає одну клітинку
+        return (int(x // size), int((x + max(w, 1) - 1) // size),
+                int(y // size), int((y + max(h, 1) - 1) // size))
+
+    def insert(self, item_id, rect):
+        if item_id in self._rects:
+            self.remove(item_id)
+        self._rects[item_id] = rect
+        col0, col1, row0, row1 = self._cell_range(rect)
+        for col in range(col0, col1 + 1):
+            for row in range(row0, row1 + 1):
+                self._cells.setdefault((col, row), []).append(item_id)
+
+    def remove(self, item_id):
+        rect = self._rects.pop(item_id, None)
+        if rect is None:
+            return
+        col0, col1, row0, row1 = self._cell_range(rect)
+        for col in range(col0, col1 + 1):
+            for row in range(row0, row1 + 1):
+                cell = self._cells.get((col, row))
+                if cell is None:
+                    continue
+                cell.remove(item_id)
+                if not cell:
+                    del self._cells[(col, row)]
+
+    def clear(self):
+        self._cells.clear()
+        self._rects.clear()
+
+    def candidates(self, rect):
+        """Id усіх прямокутників із клітинок, що перекриває rect (без точної перевірки перетину)."""
+        col0, col1, row0, row1 = self._cell_range(rect)
+        found = set()
+        for col in range(col0, col1 + 1):
+            for row in range(row0, row1 + 1):
+                cell = self._cells.get((col, row))
+                if cell:
+                    found.update(cell)
+        return found
+
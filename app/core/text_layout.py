@@ -0,0 +1,142 @@
+# app/core/text_layout.py
+# Логіка роботи з текстовими блоками, що не залежить від Qt.
+# Прямокутники зберігаються як кортежі (x, y, width, height).
+
+from .spatial_index import SpatialGrid
+
+
+def bbox_to_rect(bbox):
+    """Перетворює bbox easyocr (4 точки) у кортеж (x, y, width, height)."""
+    top_left, _, bottom_right, _ = bbox
+    x, y = int(top_left[0]), int(top_left[1])
+    return x, y, int(bottom_right[0]) - x, int(bottom_right[1]) - y
+
+
+def build_regions(ocr_results, font, font_size=14):
+    """Створює список блоків у тому ж форматі, що й found_rects головного вікна."""
+    return [
+        {'rect': bbox_to_rect(bbox), 'text': text, 'translated': '', 'font': font, 'font_size': font_size}
+        for (bbox, text, prob) in ocr_results
+    ]
+
+
+# Кластеризація блоків у "бульбашки". Два блоки пов'язані, якщо вони перекриваються, стоять
+# один під одним (з перекриттям по горизонталі) ближче за max_distance або є частинами одного
+# рядка. Кандидати шукаються через SpatialGrid, групи — компоненти зв'язності (union-find).
+# Відстань за замовчуванням масштабується за медіанною висотою рядка, тобто за роздільністю сторінки.
+DEFAULT_MAX_DISTANCE_LINES = 2.5     # 70 px при типовому рядку ~28 px
+# Мінімальне перекриття по горизонталі (частка вужчого блоку) для рядків однієї бульбашки
+STACK_OVERLAP = 0.2
+# Мінімальне перекриття по вертикалі (частка нижчого блоку) і найбільший проміжок
+# (у висотах рядка) між частинами одного рядка
+LINE_OVERLAP = 0.5
+LINE_GAP = 1.0
+
+
+def _median(values):
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    return ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+
+def default_max_distance(rects):
+    """Відстань групування, пропорційна медіанній висоті рядка (не менше 1 px)."""
+    return max(1.0, DEFAULT_MAX_DISTANCE_LINES * _median([max(1, h) for _, _, _, h in rects]))
+
+
+def _should_link(a, b, max_distance):
+    overlap_x = min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0])
+    overlap_y = min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1])
+    if overlap_x > 0 and overlap_y > 0:
+        return True
+    min_width = max(1, min(a[2], b[2]))
+    min_height = max(1, min(a[3], b[3]))
+    # Рядки однієї бульбашки: один під одним, з помітним спільним відрізком по горизонталі
+    if overlap_x >= STACK_OVERLAP * min_width and -overlap_y < max_distance:
+        return True
+    # Слова одного рядка, які OCR повернув окремими блоками
+    return overlap_y >= LINE_OVERLAP * min_height and -overlap_x < LINE_GAP * min_height
+
+
+def _reading_order(indices, rects):
+    """Зверху вниз по рядках, у межах рядка — зліва направо."""
+    by_center = sorted(indices, key=lambda i: rects[i][1] + rects[i][3] / 2)
+    ordered, line, line_bottom = [], [], None
+    for i in by_center:
+        x, y, w, h = rects[i]
+        if line and y + h / 2 >= line_bottom:
+            ordered.extend(sorted(line, key=lambda j: rects[j][0]))
+            line = []
+        if not line:
+            line_bottom = y + h
+        line.append(i)
+    ordered.extend(sorted(line, key=lambda j: rects[j][0]))
+    return ordered
+
+
+def cluster_rects(rects, max_distance=None):
+    """Групує прямокутники (x, y, w, h) у бульбашки; повертає списки індексів у порядку читання.
+
+    Майже лінійно за кількістю блоків: кожен блок порівнюється лише з сусідами з сітки.
+    """
+    if not rects: return []
+    if max_distance is None:
+        max_distance = default_max_distance(rects)
+    grid = SpatialGrid(cell_size=max_distance)
+    for i, rect in enumerate(rects):
+        grid.insert(i, rect)
+
+    parent = list(range(len(rects)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, (x, y, w, h) in enumerate(rects):
+        reach = max(max_distance, LINE_GAP * h)
+        for j in grid.candidates((x - reach, y - reach, w + 2 * reach, h + 2 * reach)):
+            if j <= i: continue
+            root_i, root_j = find(i), find(j)
+            if root_i != root_j and _should_link(rects[i], rects[j], max_distance):
+                parent[root_j] = root_i
+
+    clusters = {}
+    for i in range(len(rects)):
+        clusters.setdefault(find(i), []).append(i)
+    groups = [_reading_order(members, rects) for members in clusters.values()]
+    groups.sort(key=lambda g: (rects[g[0]][1] + rects[g[0]][3] / 2, rects[g[0]][0]))
+    return groups
+
+
+def group_text_bubbles(ocr_results, max_distance=None):
+    """Групи індексів блоків ocr_results, що належать одній бульбашці (одне речення на групу).
+
+    max_distance — найбільший проміжок між рядками в пікселях; None — за висотою рядка на сторінці.
+    """
+    return cluster_rects([bbox_to_rect(bbox) for bbox, text, prob in ocr_results], max_distance)
+
+
+def combine_group_texts(regions, groups):
+    """Повертає по одному реченню на кожну групу блоків."""
+    return [" ".join(regions[i]['text'] for i in group) for group in groups]
+
+
+def distribute_text_to_group(regions, group_indices, new_text):
+    """Розподіляє перекладений текст між блоками групи пропорційно кількості слів оригіналу."""
+    original_words_in_group = [regions[idx]['text'].split() for idx in group_indices]
+    total_original_words = sum(len(words) for words in original_words_in_group)
+    translated_words = new_text.split()
+    total_translated_words = len(translated_words)
+    start_index = 0
+    for j, idx in enumerate(group_indices):
+        num_original_words = len(original_words_in_group[j])
+        share = num_original_words / total_original_words if total_original_words > 0 else 0
+        num_translated_words = round(share * total_translated_words)
+        if j == len(group_indices) - 1:
+            chunk = translated_words[start_index:]
+        else:
+            chunk = translated_words[start_index : start_index + num_translated_words]
+        regions[idx]['translated'] = " ".join(chunk)
+        start_index += num_translated_words
@@ -0,0 +1,104 @@
+# app/core/thumbnails.py
+# Фонове створення мініатюр сторінок з дисковим кешем.
+# QImageReader.setScaledSize декодує зображення одразу в зменшеному розмірі
+# (для JPEG — значно швидше і з меншою пам'яттю, ніж QPixmap(path).scaled()).
+
+import os
+import hashlib
+from PyQt6.QtGui import QImage, QImageReader
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, QSize, pyqtSignal
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                 'cache', 'thumbnails')
+
+
+def load_scaled_image(path, size: QSize) -> QImage:
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    original_size = reader.size()
+    if original_size.isValid():
+        reader.setScaledSize(original_size.scaled(size, Qt.AspectRatioMode.KeepAspectRatio))
+    image = reader.read()
+    if image.isNull():
+        return image
+    # Декодер може повернути трохи більший розмір (напр. кратний 8 для JPEG)
+    if image.width() > size.width() or image.height() > size.height():
+        image = image.scaled(size, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+    return image
+
+
+class ThumbnailCache:
+    """Кеш мініатюр на диску; ключ — шлях, час зміни, розмір файлу і розмір мініатюри."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _cache_path(self, path, size: QSize):
+        stat = os.stat(path)
+        key = f"{os.path.abspath(path)}|{stat.st_mtime_ns}|{stat.st_size}|{size.width()}x{size.height()}"
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + ".png")
+
+    def get(self, path, size: QSize):
+        try:
+            cache_path = self._cache_path(path, size)
+        except OSError:
+            return None
+        if not os.path.exists(cache_path):
+            return None
+        image = QImage(cache_path)
+        return None if image.isNull() else image
+
+    def put(self, path, size: QSize, image: QImage):
+        try:
+            cache_path = self._cache_path(path, size)
+            tmp_path = f"{cache_path}.{id(image)}.tmp"
+            if image.save(tmp_path, "PNG"):
+                os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"Не вдалося записати мініатюру в кеш: {e}")
+
+
+class _ThumbnailTask(QRunnable):
+    def __init__(self, loader, path, generation):
+        super().__init__()
+        self.loader = loader
+        self.path = path
+        self.generation = generation
+
+    def run(self):
+        loader = self.loader
+        if self.generation != loader.generation:
+            return # запит вже скасовано
+        image = loader.cache.get(self.path, loader.size) if loader.cache else None
+        if image is None:
+            image = load_scaled_image(self.path, loader.size)
+            if not image.isNull() and loader.cache:
+                loader.cache.put(self.path, loader.size, image)
+        if not image.isNull():
+            # Сигнал з потоку пулу доставляється в GUI-потік через чергу подій
+            loader.thumbnail_ready.emit(self.path, image)
+
+
+class ThumbnailLoader(QObject):
+    """Генерує мініатюри в пулі потоків і видає їх сигналом thumbnail_ready у міру готовності.
+
+    QImage можна створювати в будь-якому потоці; QPixmap з нього робиться вже в GUI-потоці.
+    """
+    thumbnail_ready = pyqtSignal(str, QImage)
+
+    def __init__(self, size: QSize, cache: ThumbnailCache = None, max_threads=None, parent=None):
+        super().__init__(parent)
+        self.size = size
+        self.cache = cache
+        self.generation = 0
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads or max(2, QThreadPool.globalInstance().maxThreadCount() // 2))
+
+    def request(self, paths):
+        for path in paths:
+            self.pool.start(_ThumbnailTask(self, path, self.generation))
+
+    def cancel_pending(self):
+        self.generation += 1
+        self.pool.clear()
@@ -0,0 +1,164 @@
+# app/core/translation_batching.py
+# Об'єднання перекладу кількох сторінок в один запит: translate_batch() з різних потоків
+# (сторінки в TranslateStage) накопичуються, однакові рядки надсилаються один раз,
+# а результати розносяться назад до своїх сторінок і груп. Пакет відправляється, щойно
+# набирається max_items рядків / max_chars символів або найстаріший запит чекає довше за max_wait.
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .translators import BaseTranslator, _skip_empty_items
+from .translation_memory import normalize_text
+
+DEFAULT_MAX_ITEMS = 200
+DEFAULT_MAX_CHARS = 20000
+DEFAULT_MAX_WAIT = 0.3
+# Скільки об'єднаних пакетів може виконуватися одночасно, поки збирається наступний
+DEFAULT_PARALLEL_BATCHES = 2
+
+
+class _Request:
+    __slots__ = ('items', 'indices', 'on_item', 'chars', 'created', 'event', 'error')
+
+    def __init__(self, items, indices, on_item):
+        self.items = items
+        # Індекси елементів у списку, переданому в translate_batch (для on_item)
+        self.indices = indices
+        self.on_item = on_item
+        self.chars = sum(len(item['text']) for item in items)
+        self.created = time.monotonic()
+        self.event = threading.Event()
+        self.error = None
+
+
+class CoalescingTranslator(BaseTranslator):
+    """Обгортка над перекладачем з тим самим translate_batch(), що об'єднує виклики з багатьох потоків.
+
+    pages_in_flight — скільки сторінок TranslateStage варто тримати одночасно, щоб пакет встиг наповнитися.
+    """
+
+    def __init__(self, translator: BaseTranslator, max_items=DEFAULT_MAX_ITEMS, max_chars=DEFAULT_MAX_CHARS,
+                 max_wait=DEFAULT_MAX_WAIT, parallel_batches=DEFAULT_PARALLEL_BATCHES, pages_in_flight=8):
+        self.translator = translator
+        self.service_name = translator.service_name
+        self.max_items = max_items
+        self.max_chars = max_chars
+        self.max_wait = max_wait
+        self.pages_in_flight = pages_in_flight
+        self.batches_run = 0
+        self.items_requested = 0
+        self.items_sent = 0
+        # (src, dest) -> [_Request]
+        self._queues = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=max(1, parallel_batches), thread_name_prefix="translate-batch")
+        self._thread = threading.Thread(target=self._loop, name="translate-coalescer", daemon=True)
+        self._thread.start()
+
+    def translate_batch(self, items: list[dict], src_lang: str, dest_lang: str, on_item=None) -> list[dict]:
+        pending = _skip_empty_items(items, on_item)
+        if not pending:
+            return items
+        request = _Request([items[index] for index in pending], pending, on_item)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("CoalescingTranslator вже закрито")
+            self._queues.setdefault((src_lang, dest_lang), []).append(request)
+            self._cond.notify()
+        request.event.wait()
+        if request.error is not None:
+            raise request.error
+        return items
+
+    def _take_ready_batch(self):
+        now = time.monotonic()
+        next_deadline = None
+        for key, requests in self._queues.items():
+            total_items = sum(len(r.items) for r in requests)
+            total_chars = sum(r.chars for r in requests)
+            if (total_items >= self.max_items or total_chars >= self.max_chars
+                    or now - requests[0].created >= self.max_wait or self._closed):
+                # Запити сторінок не діляться: беремо цілі, поки вміщаються (але хоча б один)
+                batch, items_count, chars = [], 0, 0
+                while requests and (not batch or (items_count + len(requests[0].items) <= self.max_items
+                                                  and chars + requests[0].chars <= self.max_chars)):
+                    request = requests.pop(0)
+                    batch.append(request)
+                    items_count += len(request.items)
+                    chars += request.chars
+                if not requests:
+                    del self._queues[key]
+                return key, batch, None
+            deadline = requests[0].created + self.max_wait
+            if next_deadline is None or deadline < next_deadline:
+                next_deadline = deadline
+        return None, None, next_deadline
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while True:
+                    key, batch, deadline = self._take_ready_batch()
+                    if batch:
+                        break
+                    if self._closed:
+                        return
+                    self._cond.wait(None if deadline is None else max(0.0, deadline - time.monotonic()))
+            self._executor.submit(self._run_batch, key, batch)
+
+    def _run_batch(self, key, batch):
+        src_lang, dest_lang = key
+        # Нормалізований текст -> елементи всіх сторінок, яким потрібен цей переклад
+        targets = {}
+        for request in batch:
+            for item, index in zip(request.items, request.indices):
+                targets.setdefault(normalize_text(item['text']), []).append((request, item, index))
+        target_lists = list(targets.values())
+        unique = [{'text': entries[0][1]['text']} for entries in target_lists]
+
+        def fan_out(unique_index):
+            fields = {k: v for k, v in unique[unique_index].items() if k != 'text'}
+            fields.setdefault('translated', 'ПОМИЛКА ПЕРЕКЛАДУ')
+            for request, item, index in target_lists[unique_index]:
+                item.update(fields)
+                if request.on_item: request.on_item(index)
+
+        delivered = set()
+
+        def on_unique_item(unique_index):
+            delivered.add(unique_index)
+            fan_out(unique_index)
+
+        try:
+            self.translator.translate_batch(unique, src_lang, dest_lang, on_unique_item)
+        except Exception as e:
+            for request in batch:
+                request.error = e
+                request.event.set()
+            return
+        # Перекладачі без поелементних сповіщень — розносимо все наприкінці
+        for unique_index in range(len(unique)):
+            if unique_index not in delivered:
+                fan_out(unique_index)
+        with self._cond:
+            self.batches_run += 1
+            self.items_requested += sum(len(entries) for entries in target_lists)
+            self.items_sent += len(unique)
+        for request in batch:
+            request.event.set()
+
+    def close(self):
+        """Дочікується перекладу вже поданих запитів і зупиняє фонові потоки."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,188 @@
+# app/core/translation_memory.py
+# Пам'ять перекладів (translation memory) у SQLite.
+# Ключ: (сервіс, мова оригіналу, мова перекладу, нормалізований текст).
+# За потреби промахи шукаються нечітко (FuzzyIndex), щоб шум OCR не заважав повторному використанню.
+# Індекс розділу будується у фоновому потоці: рядки читаються порціями (блокування тримається лише
+# на час читання порції), а доки індекс не готовий, пошук у цьому розділі — лише точний.
+
+import os
+import re
+import time
+import sqlite3
+import threading
+import unicodedata
+
+from .fuzzy_index import FuzzyIndex
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                               'cache', 'translation_memory.sqlite3')
+
+# SQLite за замовчуванням обмежує кількість параметрів у запиті
+_QUERY_CHUNK = 500
+# Скільки рядків читати з бази за одне захоплення lock під час побудови нечіткого індексу
+_INDEX_CHUNK = 5000
+_WHITESPACE_RE = re.compile(r"\s+")
+DEFAULT_FUZZY_THRESHOLD = 0.9
+
+
+def normalize_text(text):
+    """NFC, без зайвих пробілів — щоб однаковий текст з різних сторінок давав один ключ."""
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+class TranslationMemory:
+    def __init__(self, db_path=DEFAULT_DB_PATH, fuzzy_threshold=None):
+        """fuzzy_threshold — мінімальна схожість (0..1) для нечіткого збігу; None вимикає нечіткий пошук."""
+        self.db_path = db_path
+        self.fuzzy_threshold = fuzzy_threshold
+        self.hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # (service, src, dest) -> FuzzyIndex; будується при першому нечіткому пошуку
+        self._fuzzy_indexes = {}
+        # (service, src, dest) -> рядки, збережені, поки індекс будується (дописуються після побудови)
+        self._fuzzy_pending = {}
+        self._fuzzy_ready = {}
+        self._closed = False
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        # Одне з'єднання на всі потоки, доступ серіалізується через self._lock
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS translations (
+                    service TEXT NOT NULL,
+                    src_lang TEXT NOT NULL,
+                    dest_lang TEXT NOT NULL,
+                    source_norm TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    translated TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    use_count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (service, src_lang, dest_lang, source_norm)
+                )
+            """)
+
+    def _fuzzy_index(self, partition):
+        """Готовий індекс розділу або None; викликається під self._lock і за потреби запускає побудову."""
+        index = self._fuzzy_indexes.get(partition)
+        if index is None and partition not in self._fuzzy_pending:
+            self._fuzzy_pending[partition] = []
+            self._fuzzy_ready[partition] = threading.Event()
+            threading.Thread(target=self._build_fuzzy_index, args=(partition,),
+                             name="tm-fuzzy-index", daemon=True).start()
+        return index
+
+    def _build_fuzzy_index(self, partition):
+        try:
+            index = FuzzyIndex()
+            last_key = ""
+            while True:
+                with self._lock:
+                    if self._closed:
+                        return
+                    rows = self._conn.execute(
+                        "SELECT source_norm, translated FROM translations "
+                        "WHERE service=? AND src_lang=? AND dest_lang=? AND source_norm > ? "
+                        "ORDER BY source_norm LIMIT ?",
+                        (*partition, last_key, _INDEX_CHUNK)
+                    ).fetchall()
+                for source_norm, translated in rows:
+                    index.add(source_norm, translated)
+                if len(rows) < _INDEX_CHUNK:
+                    break
+                last_key = rows[-1][0]
+            with self._lock:
+                # Збережене під час побудови могло розминутися з порціями — дописуємо наостанок
+                for source_norm, translated in self._fuzzy_pending.pop(partition, ()):
+                    index.add(source_norm, translated)
+                self._fuzzy_indexes[partition] = index
+        finally:
+            self._fuzzy_ready[partition].set()
+
+    def wait_fuzzy_index(self, service, src_lang, dest_lang, timeout=None):
+        """Запускає побудову нечіткого індексу розділу й чекає на неї; True, якщо індекс готовий."""
+        partition = (service, src_lang.lower(), dest_lang.lower())
+        with self._lock:
+            self._fuzzy_index(partition)
+            ready = self._fuzzy_ready[partition]
+        ready.wait(timeout)
+        with self._lock:
+            return partition in self._fuzzy_indexes
+
+    def lookup_many(self, service, src_lang, dest_lang, texts):
+        """Повертає {нормалізований текст: (переклад, схожість)} і оновлює лічильники.
+
+        Точний збіг має схожість 1.0; нечіткі збіги шукаються лише якщо задано fuzzy_threshold.
+        """
+        partition = (service, src_lang.lower(), dest_lang.lower())
+        keys = list(dict.fromkeys(normalize_text(t) for t in texts))
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), _QUERY_CHUNK):
+                chunk = keys[start:start + _QUERY_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT source_norm, translated FROM translations "
+                    f"WHERE service=? AND src_lang=? AND dest_lang=? AND source_norm IN ({placeholders})",
+                    (*partition, *chunk)
+                ).fetchall()
+                found.update((key, (translated, 1.0)) for key, translated in rows)
+            used_keys = list(found)
+            exact_count = len(found)
+            index = self._fuzzy_index(partition) if self.fuzzy_threshold else None
+            if index is not None:
+                for key in keys:
+                    if key in found:
+                        continue
+                    match = index.search(key, self.fuzzy_threshold)
+                    if match is not None:
+                        matched_key, translated, score = match
+                        found[key] = (translated, score)
+                        used_keys.append(matched_key)
+            if used_keys:
+                with self._conn:
+                    self._conn.executemany(
+                        "UPDATE translations SET use_count = use_count + 1 "
+                        "WHERE service=? AND src_lang=? AND dest_lang=? AND source_norm=?",
+                        [(*partition, key) for key in used_keys]
+                    )
+            self.hits += exact_count
+            self.fuzzy_hits += len(found) - exact_count
+            self.misses += len(keys) - len(found)
+        return found
+
+    def store_many(self, service, src_lang, dest_lang, pairs):
+        """pairs — ітерація (оригінал, переклад)."""
+        now = time.time()
+        rows = [
+            (service, src_lang.lower(), dest_lang.lower(), normalize_text(source), source, translated, now)
+            for source, translated in pairs
+        ]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO translations "
+                "(service, src_lang, dest_lang, source_norm, source, translated, created) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            partition = (service, src_lang.lower(), dest_lang.lower())
+            index = self._fuzzy_indexes.get(partition)
+            if index is not None:
+                for row in rows:
+                    index.add(row[3], row[5])
+            elif partition in self._fuzzy_pending:
+                self._fuzzy_pending[partition].extend((row[3], row[5]) for row in rows)
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        return {'entries': entries, 'hits': self.hits, 'fuzzy_hits': self.fuzzy_hits, 'misses': self.misses}
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._conn.close()
@@ -1,42 +1,119 @@
 # app/core/translators.py
 
 import deepl
+import requests
 from googletrans import Translator
 from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
 import traceback
+import threading
+import hashlib
+import json
+import os
+import re
+import random
+import time
+
+from .rate_limiter import get_limiter
+
+# Налаштування глобальне для модуля deepl. Повтори на 429/5xx робить DeepLTranslator._translate_chunk
+# через обмежувач; власні повтори бібліотеки (до 5 з затримками) множили б спроби і ховали б 429 від AdaptiveLimiter
+deepl.http_client.max_network_retries = 0
 
 # ======================================================================
 # АБСТРАКТНИЙ БАЗОВИЙ КЛАС
 # ======================================================================
 class BaseTranslator(ABC):
+    # Ідентифікатор сервісу, як у translator_service_combo / ApiKeyManager
+    service_name = ""
+
+    @property
+    def limiter_name(self):
+        """Ліміти сервісів рахуються на API ключ, тож і обмежувач — окремий для кожного ключа."""
+        api_key = getattr(self, 'api_key', None)
+        return f"{self.service_name}:{key_fingerprint(api_key)}" if api_key else self.service_name
+
+    @property
+    def limiter(self):
+        """Адаптивний обмежувач запитів (спільний для всіх перекладачів з тим самим limiter_name);
+        через нього йде кожен мережевий запит."""
+        return get_limiter(self.limiter_name, initial_limit=getattr(self, 'concurrency', 4))
+
     @abstractmethod
-    def translate_batch(self, items: list[dict], src_lang: str, dest_lang: str) -> list[dict]:
+    def translate_batch(self, items: list[dict], src_lang: str, dest_lang: str, on_item=None) -> list[dict]:
+        """Заповнює item['translated'] для кожного елемента; on_item(index) викликається (з будь-якого потоку),
+        щойно items[index] отримав переклад — так інтерфейс може показувати результати поступово."""
         pass
 
+
+def key_fingerprint(api_key: str) -> str:
+    """Короткий відбиток ключа для імен обмежувачів і журналів — сам ключ нікуди не потрапляє."""
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:8]
+
+
+def _skip_empty_items(items, on_item=None):
+    """Позначає порожні елементи порожнім перекладом; повертає індекси елементів, які треба перекласти."""
+    pending = []
+    for index, item in enumerate(items):
+        if item['text'].strip():
+            pending.append(index)
+        else:
+            item['translated'] = ''
+            if on_item: on_item(index)
+    return pending
+
 # ======================================================================
 # РЕАЛІЗАЦІЯ ДЛЯ GOOGLE TRANSLATE
 # ======================================================================
 class GoogleTranslator(BaseTranslator):
-    def __init__(self):
+    service_name = "google"
+    DEFAULT_CONCURRENCY = 8
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY):
+        # Один googletrans.Translator = один httpx.Client, тож з'єднання перевикористовуються
+        # між усіма запитами; httpx.Client можна безпечно використовувати з кількох потоків.
         self.translator = Translator()
+        self.concurrency = max(1, concurrency or 1)
+        self._executor = None
 
-    def translate_batch(self, items: list[dict], src_lang: str, dest_lang: str) -> list[dict]:
-        for item in items:
-            if item['text'].strip():
-                try:
-                    translated_obj = self.translator.translate(item['text'], src=src_lang, dest=dest_lang)
-                    item['translated'] = translated_obj.text
-                except Exception as e:
-                    print(f"Error translating with Google '{item['text']}': {e}")
-                    item['translated'] = "ПОМИЛКА ПЕРЕКЛАДУ"
-            else:
-                item['translated'] = ''
+    def _translate_item(self, item, src_lang, dest_lang):
+        if not item['text'].strip():
+            item['translated'] = ''
+            return
+        try:
+            translated_obj = self.limiter.call(self.translator.translate, item['text'], src=src_lang, dest=dest_lang)
+            item['translated'] = translated_obj.text
+        except Exception as e:
+            print(f"Error translating with Google '{item['text']}': {e}")
+            item['translated'] = "ПОМИЛКА ПЕРЕКЛАДУ"
+
+    def translate_batch(self, items: list[dict], src_lang: str, dest_lang: str, on_item=None) -> list[dict]:
+        def run(index):
+            self._translate_item(items[index], src_lang, dest_lang)
+            if on_item: on_item(index)
+
+        if self.concurrency == 1 or len(items) < 2:
+            for index in range(len(items)):
+                run(index)
+            return items
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="google-translate")
+        # Кожен елемент змінюється на місці, тому порядок items зберігається
+        list(self._executor.map(run, range(len(items))))
         return items
 
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
 # ======================================================================
 # РЕАЛІЗАЦІЯ ДЛЯ DEEPL API
 # ======================================================================
 class DeepLTranslator(BaseTranslator):
+    service_name = "deepl"
+
     SUPPORTED_SOURCE_LANGS = {
         "Arabic": "AR", "Bulgarian": "BG", "Czech": "CS", "Danish": "DA",
         "German": "DE", "Greek": "EL", "English": "EN", "Spanish": "ES",
@@ -63,57 +140,828 @@ class DeepLTranslator(BaseTranslator):
         "Chinese (Simplified)": "ZH-HANS", "Chinese (Traditional)": "ZH-HANT"
     }
 
-    def __init__(self, api_key: str):
+    # Ліміти одного запиту DeepL: до 50 текстів і до 128 KiB (запас — на решту полів запиту)
+    MAX_TEXTS_PER_REQUEST = 50
+    MAX_REQUEST_BYTES = 120 * 1024
+    DEFAULT_CONCURRENCY = 4
+    MAX_RETRIES = 5
+    BACKOFF_BASE = 0.5
+    BACKOFF_MAX = 30.0
+    # Скільки секунд вважати актуальними дані get_usage()
+    USAGE_TTL = 300.0
+
+    def __init__(self, api_key: str, server_url: str = None, concurrency: int = DEFAULT_CONCURRENCY):
+        """server_url дозволяє спрямувати клієнт на інший сервер (напр. локальну заглушку DeepL для тестів)."""
         if not api_key:
             raise ValueError("API ключ для DeepL не може бути порожнім.")
         self.api_key = api_key
+        self.concurrency = max(1, concurrency or 1)
+        self._executor = None
+        self._usage = None
+        self._usage_time = 0.0
+        self._usage_lock = threading.Lock()
         try:
-            self.translator = deepl.Translator(api_key)
-            self.translator.get_usage()
+            self.translator = deepl.Translator(api_key, server_url=server_url)
+            self.get_usage(max_age=0)
         except Exception as e:
             raise ConnectionError(f"Не вдалося ініціалізувати DeepL. Перевірте API ключ та з'єднання. Помилка: {e}")
 
-    def translate_batch(self, items: list[dict], src_lang: str, dest_lang: str) -> list[dict]:
+    def get_usage(self, max_age: float = USAGE_TTL):
+        """deepl.Usage, закешований на max_age секунд, щоб не робити запит перед кожною сторінкою."""
+        with self._usage_lock:
+            if self._usage is None or time.monotonic() - self._usage_time >= max_age:
+                self._usage = self.translator.get_usage()
+                self._usage_time = time.monotonic()
+            return self._usage
+
+    @classmethod
+    def _split_into_chunks(cls, texts):
+        """Ділить тексти на шматки в межах лімітів одного запиту; повертає списки індексів."""
+        chunks, current, current_bytes = [], [], 0
+        for index, text in enumerate(texts):
+            size = len(text.encode('utf-8'))
+            if current and (len(current) >= cls.MAX_TEXTS_PER_REQUEST or current_bytes + size > cls.MAX_REQUEST_BYTES):
+                chunks.append(current)
+                current, current_bytes = [], 0
+            current.append(index)
+            current_bytes += size
+        if current:
+            chunks.append(current)
+        return chunks
+
+    @staticmethod
+    def _is_retryable(error):
+        if isinstance(error, (deepl.TooManyRequestsException, deepl.ConnectionException)):
+            return True
+        status = getattr(error, 'http_status_code', None)
+        return status is not None and (status == 429 or status >= 500)
+
+    def remaining_characters(self):
+        """Залишок символів ключа за закешованим usage; None — якщо ліміт невідомий."""
+        character = self.get_usage().character
+        if character is None or not character.valid:
+            return None
+        return max(0, character.limit - character.count)
+
+    @classmethod
+    def classify_error(cls, error):
+        """'exhausted' — ключ непридатний (ліміт вичерпано або ключ недійсний), 'rate_limited' — 429,
+        'retryable' — мережа/5xx, інакше 'fatal'."""
+        if isinstance(error, (deepl.QuotaExceededException, deepl.AuthorizationException)):
+            return "exhausted"
+        if isinstance(error, deepl.TooManyRequestsException) or getattr(error, 'http_status_code', None) == 429:
+            return "rate_limited"
+        return "retryable" if cls._is_retryable(error) else "fatal"
+
+    def translate_texts(self, texts, src_lang, dest_lang, retries=None):
+        """Перекладає рядки одним запитом; на відміну від translate_batch, помилки викидаються."""
+        return self._translate_chunk(texts, src_lang.upper() if src_lang != 'auto' else None, dest_lang.upper(), retries)
+
+    def _translate_chunk(self, texts, source_language, target_language, retries=None):
+        """Один запит з повторами: експоненційна затримка з jitter на 429/5xx, лише для цього шматка."""
+        max_retries = self.MAX_RETRIES if retries is None else retries
+        for attempt in range(max_retries + 1):
+            try:
+                results = self.limiter.call(
+                    self.translator.translate_text,
+                    texts,
+                    source_lang=source_language,
+                    target_lang=target_language
+                )
+                return [result.text for result in results]
+            except deepl.DeepLException as e:
+                if attempt == max_retries or not self._is_retryable(e):
+                    raise
+                delay = min(self.BACKOFF_MAX, self.BACKOFF_BASE * (2 ** attempt))
+                delay = delay / 2 + random.uniform(0, delay / 2)
+                print(f"DeepL: {e}. Повтор через {delay:.1f} с (спроба {attempt + 2}/{max_retries + 1})")
+                time.sleep(delay)
+
+    @staticmethod
+    def _error_message(error):
+        if isinstance(error, deepl.DeepLException):
+            print(f"Помилка API DeepL: {error}")
+            if "source_lang" in str(error) or "target_lang" in str(error):
+                return "ПОМИЛКА: Мова не підтримується вашим API."
+            return f"ПОМИЛКА DEEPL: {error}"
+        print(f"Загальна помилка під час перекладу: {error}")
+        return "ПОМИЛКА ПЕРЕКЛАДУ"
+
+    def translate_batch(self, items: list[dict], src_lang: str, dest_lang: str, on_item=None) -> list[dict]:
         source_language = src_lang.upper() if src_lang != 'auto' else None
         target_language = dest_lang.upper()
 
-        texts_to_translate = [item['text'] for item in items if item['text'].strip()]
-
-        if not texts_to_translate:
-            for item in items:
-                if not item['text'].strip():
-                    item['translated'] = ''
+        pending = _skip_empty_items(items, on_item)
+        if not pending:
             return items
 
+        chunks = self._split_into_chunks([items[index]['text'] for index in pending])
+
+        def run_chunk(chunk):
+            chunk_indices = [pending[i] for i in chunk]
+            try:
+                translated = self._translate_chunk([items[index]['text'] for index in chunk_indices],
+                                                   source_language, target_language)
+            except Exception as e:
+                # Помилка позначає лише елементи цього шматка
+                translated = [self._error_message(e)] * len(chunk_indices)
+            for index, text in zip(chunk_indices, translated):
+                items[index]['translated'] = text
+                if on_item: on_item(index)
+
+        if len(chunks) == 1 or self.concurrency == 1:
+            for chunk in chunks:
+                run_chunk(chunk)
+        else:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="deepl-translate")
+            list(self._executor.map(run_chunk, chunks))
+        return items
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+# ======================================================================
+# LLM-ПЕРЕКЛАДАЧІ (GPT / GEMINI): БАГАТО РЕПЛІК В ОДНОМУ ЗАПИТІ
+# ======================================================================
+_SEGMENT_RE = re.compile(r"^\s*\[(\d+)\]\s?(.*)$")
+
+LLM_SYSTEM_PROMPT = (
+    "You translate speech bubbles of a comic (manhwa). Translate every numbered segment {source} "
+    "into the language with code '{target}'. Reply with exactly one line per segment in the form "
+    "'[N] translation', keeping the original numbers and order. Do not merge, skip or comment on segments."
+)
+
+
+class LLMError(Exception):
+    """Помилка HTTP від LLM API; http_status_code — як у deepl, щоб обмежувач розпізнав 429."""
+
+    def __init__(self, message, http_status_code=None):
+        super().__init__(message)
+        self.http_status_code = http_status_code
+
+
+def parse_numbered_segments(text: str) -> dict:
+    """'[N] переклад' -> {N: переклад}; рядки без номера дописуються до попереднього сегмента."""
+    segments = {}
+    current = None
+    for line in text.splitlines():
+        match = _SEGMENT_RE.match(line)
+        if match:
+            current = int(match.group(1))
+            segments[current] = match.group(2).strip()
+        elif current is not None and line.strip():
+            segments[current] = f"{segments[current]} {line.strip()}".strip()
+    return segments
+
+
+class LLMTranslator(BaseTranslator):
+    """Спільна логіка GPT і Gemini: пронумеровані сегменти в одному запиті, перевірка кількості
+    та повторний запит лише для сегментів, яких немає у відповіді.
+
+    base_url дозволяє спрямувати клієнт на локальний сервер-заглушку з тим самим API.
+    """
+    DEFAULT_MODEL = ""
+    DEFAULT_BASE_URL = ""
+    BASE_URL_ENV = ""
+    MAX_SEGMENTS_PER_REQUEST = 60
+    MAX_CHARS_PER_REQUEST = 6000
+    DEFAULT_CONCURRENCY = 4
+    # Скільки разів перепитувати сегменти, яких модель не повернула
+    MISSING_RETRIES = 2
+    MAX_RETRIES = 4
+    BACKOFF_BASE = 1.0
+    BACKOFF_MAX = 30.0
+    TIMEOUT = 120
+
+    def __init__(self, api_key: str, base_url: str = None, model: str = None, stream: bool = False,
+                 concurrency: int = DEFAULT_CONCURRENCY):
+        """stream — читати відповідь потоком (SSE), щоб on_item отримував сегменти ще до кінця відповіді."""
+        if not api_key:
+            raise ValueError(f"API ключ для {self.service_name.capitalize()} не може бути порожнім.")
+        self.api_key = api_key
+        self.base_url = (base_url or os.environ.get(self.BASE_URL_ENV) or self.DEFAULT_BASE_URL).rstrip('/')
+        self.model = model or self.DEFAULT_MODEL
+        self.stream = stream
+        self.concurrency = max(1, concurrency or 1)
+        self.requests_sent = 0
+        self.segments_retried = 0
+        # Одна сесія = пул з'єднань на всі запити
+        self.session = requests.Session()
+        self._executor = None
+
+    # --- API конкретного сервісу -------------------------------------
+    @abstractmethod
+    def _request(self, system_prompt, user_prompt, stream):
+        """Повертає (url, headers, json) для запиту."""
+        pass
+
+    @abstractmethod
+    def _extract_text(self, data):
+        """Текст відповіді (або шматка потоку) з розібраного JSON."""
+        pass
+
+    # --- HTTP ---------------------------------------------------------
+    def _iter_sse(self, response):
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            payload = line[5:].strip()
+            if payload == "[DONE]":
+                break
+            yield json.loads(payload)
+
+    def _post(self, system_prompt, user_prompt, on_text=None):
+        url, headers, body = self._request(system_prompt, user_prompt, self.stream)
         try:
-            results = self.translator.translate_text(
-                texts_to_translate,
-                source_lang=source_language,
-                target_lang=target_language
-            )
-            result_iter = iter(results)
-            for item in items:
-                if item['text'].strip():
-                    item['translated'] = next(result_iter).text
-                else:
-                    item['translated'] = ''
-
-        except deepl.DeepLException as e:
-            print(f"Помилка API DeepL: {e}")
-            error_message = f"ПОМИЛКА DEEPL: {e}"
-            if "source_lang" in str(e) or "target_lang" in str(e):
-                 error_message = "ПОМИЛКА: Мова не підтримується вашим API."
-            for item in items:
-                if item['text'].strip():
-                    item['translated'] = error_message
+            response = self.session.post(url, headers=headers, json=body, timeout=self.TIMEOUT, stream=self.stream)
+        except requests.RequestException as e:
+            raise LLMError(f"з'єднання: {e}") from e
+        with response:
+            if response.status_code >= 400:
+                raise LLMError(f"HTTP {response.status_code}: {response.text[:200]}", response.status_code)
+            self.requests_sent += 1
+            if not self.stream:
+                return self._extract_text(response.json())
+            parts = []
+            for chunk in self._iter_sse(response):
+                text = self._extract_text(chunk)
+                if text:
+                    parts.append(text)
+                    if on_text:
+                        on_text("".join(parts))
+            return "".join(parts)
+
+    @staticmethod
+    def _is_retryable(error):
+        status = getattr(error, 'http_status_code', None)
+        return status is None or status == 429 or status >= 500
+
+    @staticmethod
+    def _make_stream_handler(on_segment_done):
+        """Обробник часткової відповіді: повідомляє кожен сегмент один раз, щойно він завершений."""
+        reported = set()
+
+        def on_text(partial):
+            # Сегмент завершений, коли після нього почався наступний
+            parsed = parse_numbered_segments(partial)
+            for number in list(parsed)[:-1]:
+                if number not in reported:
+                    reported.add(number)
+                    on_segment_done(number, parsed[number])
+        return on_text
+
+    def _send(self, segments, src_lang, dest_lang, on_segment_done=None):
+        """Один запит з повторами на 429/5xx/мережу; повертає {номер: переклад}."""
+        source = "from the auto-detected language" if src_lang == 'auto' else f"from the language with code '{src_lang}'"
+        system_prompt = LLM_SYSTEM_PROMPT.format(source=source, target=dest_lang)
+        # Перенос рядка всередині сегмента зламав би нумерацію
+        user_prompt = "\n".join(f"[{number}] {' '.join(text.split())}" for number, text in segments)
+
+        on_text = self._make_stream_handler(on_segment_done) if on_segment_done else None
+        for attempt in range(self.MAX_RETRIES + 1):
+            try:
+                return parse_numbered_segments(self.limiter.call(self._post, system_prompt, user_prompt, on_text))
+            except LLMError as e:
+                if attempt == self.MAX_RETRIES or not self._is_retryable(e):
+                    raise
+                delay = min(self.BACKOFF_MAX, self.BACKOFF_BASE * (2 ** attempt))
+                delay = delay / 2 + random.uniform(0, delay / 2)
+                print(f"{self.service_name}: {e}. Повтор через {delay:.1f} с (спроба {attempt + 2}/{self.MAX_RETRIES + 1})")
+                time.sleep(delay)
+
+    def _split_into_chunks(self, texts):
+        chunks, current, current_chars = [], [], 0
+        for index, text in enumerate(texts):
+            if current and (len(current) >= self.MAX_SEGMENTS_PER_REQUEST
+                            or current_chars + len(text) > self.MAX_CHARS_PER_REQUEST):
+                chunks.append(current)
+                current, current_chars = [], 0
+            current.append(index)
+            current_chars += len(text)
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _translate_chunk(self, items, chunk_indices, src_lang, dest_lang, on_item=None):
+        # Номери сегментів — 1..N у межах шматка; повтори надсилають лише відсутні номери
+        pending = {number: index for number, index in enumerate(chunk_indices, start=1)}
+
+        def finish(number, text):
+            index = pending.pop(number, None)
+            if index is not None:
+                items[index]['translated'] = text
+                if on_item: on_item(index)
+
+        for attempt in range(self.MISSING_RETRIES + 1):
+            segments = [(number, items[index]['text']) for number, index in pending.items()]
+            parsed = self._send(segments, src_lang, dest_lang,
+                                (lambda number, text: text and finish(number, text)) if self.stream else None)
+            if len(parsed) != len(segments):
+                print(f"{self.service_name}: отримано {len(parsed)} сегментів замість {len(segments)}")
+            for number in list(pending):
+                if parsed.get(number):
+                    finish(number, parsed[number])
+            if not pending:
+                return
+            if attempt < self.MISSING_RETRIES:
+                self.segments_retried += len(pending)
+        for number in list(pending):
+            finish(number, "ПОМИЛКА: модель не повернула переклад")
+
+    def translate_batch(self, items: list[dict], src_lang: str, dest_lang: str, on_item=None) -> list[dict]:
+        pending = _skip_empty_items(items, on_item)
+        if not pending:
+            return items
+
+        def run_chunk(chunk):
+            chunk_indices = [pending[i] for i in chunk]
+            try:
+                self._translate_chunk(items, chunk_indices, src_lang, dest_lang, on_item)
+            except Exception as e:
+                print(f"Помилка {self.service_name}: {e}")
+                for index in chunk_indices:
+                    if not items[index].get('translated'):
+                        items[index]['translated'] = f"ПОМИЛКА {self.service_name.upper()}: {e}"
+                        if on_item: on_item(index)
+
+        chunks = self._split_into_chunks([items[index]['text'] for index in pending])
+        if len(chunks) == 1 or self.concurrency == 1:
+            for chunk in chunks:
+                run_chunk(chunk)
+        else:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.concurrency,
+                                                    thread_name_prefix=f"{self.service_name}-translate")
+            list(self._executor.map(run_chunk, chunks))
+        return items
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self.session.close()
+
+
+class GPTTranslator(LLMTranslator):
+    """OpenAI Chat Completions (або сумісний сервер, напр. локальний)."""
+    service_name = "gpt"
+    DEFAULT_MODEL = "gpt-4o-mini"
+    DEFAULT_BASE_URL = "https://api.openai.com/v1"
+    BASE_URL_ENV = "OPENAI_BASE_URL"
+
+    def _request(self, system_prompt, user_prompt, stream):
+        body = {
+            "model": self.model,
+            "temperature": 0,
+            "stream": stream,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+        }
+        return f"{self.base_url}/chat/completions", {"Authorization": f"Bearer {self.api_key}"}, body
+
+    def _extract_text(self, data):
+        choice = (data.get("choices") or [{}])[0]
+        if "delta" in choice:
+            return choice["delta"].get("content") or ""
+        return (choice.get("message") or {}).get("content") or ""
+
+
+class GeminiTranslator(LLMTranslator):
+    """Google Gemini generateContent / streamGenerateContent."""
+    service_name = "gemini"
+    DEFAULT_MODEL = "gemini-1.5-flash"
+    DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+    BASE_URL_ENV = "GEMINI_BASE_URL"
+
+    def _request(self, system_prompt, user_prompt, stream):
+        method = "streamGenerateContent?alt=sse" if stream else "generateContent"
+        body = {
+            "systemInstruction": {"parts": [{"text": system_prompt}]},
+            "contents": [{"role": "user", "parts": [{"text": user_prompt}]}],
+            "generationConfig": {"temperature": 0},
+        }
+        return f"{self.base_url}/models/{self.model}:{method}", {"x-goog-api-key": self.api_key}, body
+
+    def _extract_text(self, data):
+        candidates = data.get("candidates") or [{}]
+        parts = (candidates[0].get("content") or {}).get("parts") or []
+        return "".join(part.get("text", "") for part in parts)
+
+# ======================================================================
+# ПАМ'ЯТЬ ПЕРЕКЛАДІВ ПЕРЕД БУДЬ-ЯКИМ ПЕРЕКЛАДАЧЕМ
+# ======================================================================
+def is_error_translation(text: str) -> bool:
+    # Усі перекладачі позначають невдалі елементи текстом, що починається з "ПОМИЛКА"
+    return text.startswith("ПОМИЛКА")
+
+
+class MemoryTranslator(BaseTranslator):
+    """Спершу шукає переклади в TranslationMemory, до сервісу надсилає лише промахи.
+
+    Знайдені в пам'яті елементи отримують 'from_memory' та 'match_score' (1.0 — точний збіг).
+    """
+
+    def __init__(self, translator: BaseTranslator, memory):
+        self.translator = translator
+        self.memory = memory
+        self.service_name = translator.service_name
+
+    def translate_batch(self, items: list[dict], src_lang: str, dest_lang: str, on_item=None) -> list[dict]:
+        from .translation_memory import normalize_text
+        texts = [item['text'] for item in items if item['text'].strip()]
+        found = self.memory.lookup_many(self.service_name, src_lang, dest_lang, texts) if texts else {}
+
+        miss_indices = []
+        for index, item in enumerate(items):
+            if not item['text'].strip():
+                item['translated'] = ''
+            else:
+                cached = found.get(normalize_text(item['text']))
+                if cached is None:
+                    miss_indices.append(index)
+                    continue
+                item['translated'], item['match_score'] = cached
+                item['from_memory'] = True
+            if on_item: on_item(index)
+
+        misses = [items[index] for index in miss_indices]
+        if misses:
+            upstream_items = [{'text': item['text']} for item in misses]
+
+            def forward(upstream_index):
+                # Переклад з'являється в items ще до завершення всього пакета
+                misses[upstream_index]['translated'] = upstream_items[upstream_index].get('translated', 'ПОМИЛКА ПЕРЕКЛАДУ')
+                on_item(miss_indices[upstream_index])
+
+            upstream = self.translator.translate_batch(upstream_items, src_lang, dest_lang, forward if on_item else None)
+            # Переклад резервного сервісу (HedgedTranslator) зберігається в його розділі пам'яті,
+            # інакше наступні запуски основного сервісу отримували б з пам'яті чужі переклади
+            by_service = {}
+            for item, result in zip(misses, upstream):
+                item['translated'] = result.get('translated', 'ПОМИЛКА ПЕРЕКЛАДУ')
+                if 'translated_by' in result:
+                    item['translated_by'] = result['translated_by']
+                if item['translated'] and not is_error_translation(item['translated']):
+                    service = item.get('translated_by', self.service_name)
+                    by_service.setdefault(service, []).append((item['text'], item['translated']))
+            for service, pairs in by_service.items():
+                if service == self.service_name:
+                    self.memory.store_many(service, src_lang, dest_lang, pairs)
                 else:
-                    item['translated'] = ''
+                    self.memory.store_many(service, convert_lang_code(src_lang, service),
+                                           convert_lang_code(dest_lang, service, target=True), pairs)
+        return items
+
+
+# ======================================================================
+# ПУЛ ДОВГОЖИВУЧИХ ПЕРЕКЛАДАЧІВ
+# ======================================================================
+def _close_translator(translator):
+    close = getattr(translator, 'close', None)
+    if close is not None:
+        close()
+
+
+class TranslatorPool:
+    """Тримає вже ініціалізовані перекладачі за ключем (сервіс, API ключ, адреса сервера).
+
+    Створення DeepLTranslator — це мережевий запит get_usage(), а GoogleTranslator тримає
+    HTTP-сесію; з пулом ці витрати припадають на перший переклад, а не на кожну сторінку.
+    Перекладач створюється поза блокуванням пулу: потоки, що просять той самий ключ, чекають
+    на спільний Future, а інші ключі не чекають зовсім.
+    """
+    # Скільки секунд повертати ту саму помилку ініціалізації (поганий ключ, недоступний сервер)
+    FAILED_INIT_TTL = 30.0
+
+    def __init__(self):
+        self._translators = {}   # ключ -> Future з перекладачем
+        self._failed_at = {}     # ключ -> час невдалої ініціалізації
+        self._lock = threading.Lock()
+
+    def get(self, service: str, api_key: str = None, concurrency: int = None, server_url: str = None,
+            model: str = None, stream: bool = False) -> BaseTranslator:
+        key = (service, api_key if service != 'google' else None, server_url, concurrency, model, stream)
+        with self._lock:
+            future = self._translators.get(key)
+            if future is not None and future.done() and future.exception() is not None \
+                    and time.monotonic() - self._failed_at.get(key, 0) >= self.FAILED_INIT_TTL:
+                future = None
+            owner = future is None
+            if owner:
+                future = self._translators[key] = Future()
+        if not owner:
+            return future.result()
+
+        try:
+            translator = _build_translator(service, api_key, concurrency, server_url, model, stream)
         except Exception as e:
-            print(f"Загальна помилка під час перекладу: {e}")
-            for item in items:
-                if item['text'].strip():
-                    item['translated'] = "ПОМИЛКА ПЕРЕКЛАДУ"
-                else:
-                    item['translated'] = ''
+            # Помилка кешується на FAILED_INIT_TTL, щоб поганий ключ не ініціалізувався на кожній сторінці
+            with self._lock:
+                if self._translators.get(key) is future:
+                    self._failed_at[key] = time.monotonic()
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._failed_at.pop(key, None)
+        future.set_result(translator)
+        return translator
+
+    def usage(self, service: str, api_key: str, max_age: float = None):
+        """Закешоване використання ліміту ключа або None, якщо сервіс його не повідомляє."""
+        translator = self.get(service, api_key)
+        if not hasattr(translator, 'get_usage'):
+            return None
+        return translator.get_usage() if max_age is None else translator.get_usage(max_age=max_age)
+
+    @staticmethod
+    def _close_future(future):
+        # Перекладач, що ще створюється, дістанеться тому, хто його просив, але в пулі вже не буде
+        if future.done() and future.exception() is None:
+            _close_translator(future.result())
+
+    def retain_keys(self, keys_by_service: dict):
+        """Закриває перекладачі, чиїх ключів більше немає (після зміни налаштувань API)."""
+        with self._lock:
+            stale = [key for key in self._translators
+                     if key[1] is not None and key[1] not in keys_by_service.get(key[0], [])]
+            for key in stale:
+                self._failed_at.pop(key, None)
+                self._close_future(self._translators.pop(key))
+
+    def close(self):
+        with self._lock:
+            for future in self._translators.values():
+                self._close_future(future)
+            self._translators.clear()
+            self._failed_at.clear()
+
+
+# ======================================================================
+# РОЗПОДІЛ ЗАПИТІВ МІЖ КІЛЬКОМА КЛЮЧАМИ (DEEPL)
+# ======================================================================
+class MultiKeyTranslator(BaseTranslator):
+    """Ділить пакет на шматки і відправляє їх паралельно через усі ключі KeyScheduler.
+
+    Шматок, що отримав 429 або вичерпав ліміт ключа, одразу повторюється з іншим ключем —
+    але не більше MAX_ATTEMPTS спроб і CHUNK_DEADLINE секунд (напр. при 429 на рівні всього акаунта).
+    """
+    service_name = "deepl"
+    MAX_ATTEMPTS = 12
+    CHUNK_DEADLINE = 300.0
+
+    def __init__(self, scheduler, pool: TranslatorPool, server_url: str = None):
+        self.scheduler = scheduler
+        self.pool = pool
+        self.server_url = server_url
+        self._quota_loaded = set()
+        self._quota_lock = threading.Lock()
+
+    def _client(self, key):
+        return self.pool.get(self.service_name, key, server_url=self.server_url)
+
+    def _load_quotas(self):
+        """Один раз отримує залишок кожного ключа, щоб планувальник не віддав шматок вичерпаному ключу."""
+        with self._quota_lock:
+            for key in self.scheduler.keys:
+                if key in self._quota_loaded:
+                    continue
+                self._quota_loaded.add(key)
+                try:
+                    remaining = self._client(key).remaining_characters()
+                except Exception as e:
+                    print(f"DeepL: ключ {key[:4]}... недоступний: {e}")
+                    remaining = 0
+                self.scheduler.set_remaining(key, remaining)
+
+    def _translate_chunk(self, texts, src_lang, dest_lang):
+        chars = sum(len(text) for text in texts)
+        # Повтори 5xx на тому самому ключі обмежені MAX_RETRIES, а всі спроби разом (з перемиканням ключів
+        # на 429 / вичерпаний ліміт) — MAX_ATTEMPTS і CHUNK_DEADLINE
+        deadline = time.monotonic() + self.CHUNK_DEADLINE
+        retryable_attempts = 0
+        for attempt in range(1, self.MAX_ATTEMPTS + 1):
+            key = self.scheduler.acquire(chars)
+            if key is None:
+                raise deepl.QuotaExceededException("Ліміт усіх ключів DeepL вичерпано")
+            out_of_attempts = attempt == self.MAX_ATTEMPTS or time.monotonic() >= deadline
+            try:
+                result = self._client(key).translate_texts(texts, src_lang, dest_lang, retries=0)
+            except ConnectionError:
+                # Ключ не пройшов ініціалізацію — більше його не використовуємо
+                self.scheduler.release(key, outcome="exhausted")
+                if out_of_attempts:
+                    raise
+                continue
+            except deepl.DeepLException as e:
+                outcome = DeepLTranslator.classify_error(e)
+                self.scheduler.release(key, outcome="error" if outcome in ("retryable", "fatal") else outcome)
+                if outcome == "fatal" or out_of_attempts or (
+                        outcome == "retryable" and retryable_attempts >= DeepLTranslator.MAX_RETRIES):
+                    raise
+                if outcome == "retryable":
+                    retryable_attempts += 1
+                    time.sleep(min(DeepLTranslator.BACKOFF_MAX,
+                                   DeepLTranslator.BACKOFF_BASE * (2 ** retryable_attempts)))
+                continue
+            except Exception:
+                self.scheduler.release(key, outcome="error")
+                raise
+            self.scheduler.release(key, chars)
+            return result
+
+    def translate_batch(self, items: list[dict], src_lang: str, dest_lang: str, on_item=None) -> list[dict]:
+        pending = _skip_empty_items(items, on_item)
+        if not pending:
+            return items
+
+        def run_chunk(chunk):
+            chunk_indices = [pending[i] for i in chunk]
+            try:
+                translated = self._translate_chunk([items[index]['text'] for index in chunk_indices], src_lang, dest_lang)
+            except Exception as e:
+                translated = [DeepLTranslator._error_message(e)] * len(chunk_indices)
+            for index, text in zip(chunk_indices, translated):
+                items[index]['translated'] = text
+                if on_item: on_item(index)
+
+        self._load_quotas()
+        chunks = DeepLTranslator._split_into_chunks([items[index]['text'] for index in pending])
+        # Пул живе лише протягом виклику — перекладач створюється на кожен запуск і не потребує close()
+        with ThreadPoolExecutor(max_workers=max(1, min(self.scheduler.concurrency, len(chunks))),
+                                thread_name_prefix="deepl-multikey") as executor:
+            list(executor.map(run_chunk, chunks))
+        return items
+
+
+# ======================================================================
+# ХЕДЖОВАНІ ЗАПИТИ: РЕЗЕРВНИЙ СЕРВІС, ЯКЩО ОСНОВНИЙ ЗАВИС
+# ======================================================================
+# Коди мов Google, для яких DeepL використовує інші позначення
+_GOOGLE_TO_DEEPL_SOURCE = {"zh-cn": "ZH", "zh-tw": "ZH", "no": "NB", "iw": "HE"}
+_GOOGLE_TO_DEEPL_TARGET = {"en": "EN-US", "pt": "PT-BR", "zh-cn": "ZH-HANS", "zh-tw": "ZH-HANT", "no": "NB", "iw": "HE"}
+_DEEPL_TO_GOOGLE = {"zh": "zh-cn", "zh-hans": "zh-cn", "zh-hant": "zh-tw", "nb": "no"}
+
+
+def convert_lang_code(code: str, service: str, target: bool = False) -> str:
+    """Переводить код мови з позначень одного сервісу в позначення service ('google' або 'deepl')."""
+    if code == 'auto':
+        return code
+    if service == 'deepl':
+        lowered = code.lower()
+        mapping = _GOOGLE_TO_DEEPL_TARGET if target else _GOOGLE_TO_DEEPL_SOURCE
+        return mapping.get(lowered, code.upper())
+    lowered = code.lower()
+    if lowered in _DEEPL_TO_GOOGLE:
+        return _DEEPL_TO_GOOGLE[lowered]
+    # EN-US, PT-BR тощо — Google знає лише базову мову
+    return lowered.split('-')[0]
+
+
+class HedgedTranslator(BaseTranslator):
+    """Надсилає пакет основному сервісу, а якщо той не відповів за p95 своїх затримок — ще й резервному.
+
+    Береться відповідь, що прийшла першою (і не складається з самих помилок); виграші рахуються в wins.
+    Ще не розпочатий запит, що програв, скасовується; вже відправлений запит не перериваємо, лише ігноруємо.
+    Обгортає самі сервіси: пам'ять перекладів має бути зовні, інакше миттєві влучання в пам'ять
+    занижують p95 і майже кожен справжній запит дублюється.
+    """
+    DEFAULT_PERCENTILE = 0.95
+    DEFAULT_DELAY = 3.0
+    MIN_DELAY = 0.5
+    MAX_DELAY = 30.0
+    # Скільки останніх затримок основного сервісу враховувати і скільки потрібно для оцінки p95
+    HISTORY_SIZE = 100
+    MIN_SAMPLES = 10
+
+    def __init__(self, primary: BaseTranslator, secondary: BaseTranslator, percentile: float = DEFAULT_PERCENTILE,
+                 fixed_delay: float = None):
+        """fixed_delay — затримка перед резервним запитом у секундах замість оцінки за percentile."""
+        self.primary = primary
+        self.secondary = secondary
+        self.service_name = primary.service_name
+        self.percentile = percentile
+        self.fixed_delay = fixed_delay
+        self.wins = {primary.service_name: 0, secondary.service_name: 0}
+        self.hedges = 0
+        self._latencies = deque(maxlen=self.HISTORY_SIZE)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hedged-translate")
+
+    def hedge_delay(self):
+        if self.fixed_delay is not None:
+            return self.fixed_delay
+        with self._lock:
+            if len(self._latencies) < self.MIN_SAMPLES:
+                return self.DEFAULT_DELAY
+            ordered = sorted(self._latencies)
+        value = ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile))]
+        return min(self.MAX_DELAY, max(self.MIN_DELAY, value))
+
+    def _record_latency(self, started, future):
+        if not future.cancelled():
+            with self._lock:
+                self._latencies.append(time.monotonic() - started)
+
+    def _submit(self, translator, items, src_lang, dest_lang):
+        if translator.service_name != self.primary.service_name:
+            src_lang = convert_lang_code(src_lang, translator.service_name)
+            dest_lang = convert_lang_code(dest_lang, translator.service_name, target=True)
+        copies = [dict(item) for item in items]
+        future = self._executor.submit(translator.translate_batch, copies, src_lang, dest_lang)
+        future.translator = translator
+        return future
+
+    @staticmethod
+    def _usable(future):
+        if future.exception() is not None:
+            return False
+        return not all(is_error_translation(item.get('translated', 'ПОМИЛКА')) for item in future.result()
+                       if item['text'].strip())
+
+    def translate_batch(self, items: list[dict], src_lang: str, dest_lang: str, on_item=None) -> list[dict]:
+        """on_item тут викликається лише після вибору переможця — відповіді двох сервісів не змішуються."""
+        if not any(item['text'].strip() for item in items):
+            return self.primary.translate_batch(items, src_lang, dest_lang, on_item)
+        started = time.monotonic()
+        primary_future = self._submit(self.primary, items, src_lang, dest_lang)
+        primary_future.add_done_callback(lambda f: self._record_latency(started, f))
+        futures = [primary_future]
+        done, _ = wait(futures, timeout=self.hedge_delay())
+        if not done or not self._usable(primary_future):
+            with self._lock:
+                self.hedges += 1
+            futures.append(self._submit(self.secondary, items, src_lang, dest_lang))
+
+        winner = None
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            usable = [f for f in futures if f in done and self._usable(f)]
+            if usable:
+                winner = usable[0]
+                break
+        for future in pending:
+            future.cancel()
+        if winner is None:
+            # Обидва сервіси не впоралися — віддаємо результат основного (з його повідомленнями про помилки),
+            # а якщо обидва впали з винятком — позначаємо елементи, як це роблять інші перекладачі
+            returned = [f for f in futures if not f.cancelled() and f.exception() is None]
+            if not returned:
+                error = primary_future.exception()
+                print(f"Помилка перекладу ({self.primary.service_name}, {self.secondary.service_name}): {error}")
+                for index, item in enumerate(items):
+                    item['translated'] = f"ПОМИЛКА ПЕРЕКЛАДУ: {error}" if item['text'].strip() else ''
+                    if on_item: on_item(index)
+                return items
+            winner = returned[0]
+
+        with self._lock:
+            self.wins[winner.translator.service_name] += 1
+        for index, (item, result) in enumerate(zip(items, winner.result())):
+            item.update({k: v for k, v in result.items() if k != 'text'})
+            item['translated_by'] = winner.translator.service_name
+            if on_item: on_item(index)
+        return items
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# ======================================================================
+# ФАБРИКА ПЕРЕКЛАДАЧІВ
+# ======================================================================
+LLM_TRANSLATORS = {'gpt': GPTTranslator, 'gemini': GeminiTranslator}
+
+
+def _build_translator(service, api_key, concurrency, server_url, model=None, stream=False):
+    if service == 'deepl':
+        return DeepLTranslator(api_key, server_url=server_url,
+                               concurrency=concurrency or DeepLTranslator.DEFAULT_CONCURRENCY)
+    if service in LLM_TRANSLATORS:
+        translator_class = LLM_TRANSLATORS[service]
+        return translator_class(api_key, base_url=server_url, model=model, stream=stream,
+                                concurrency=concurrency or translator_class.DEFAULT_CONCURRENCY)
+    return GoogleTranslator(concurrency or GoogleTranslator.DEFAULT_CONCURRENCY)
+
 
-        return items
\ No newline at end of file
+def create_translator(service: str, api_key: str = None, memory=None, concurrency: int = None,
+                      server_url: str = None, pool: TranslatorPool = None, key_scheduler=None,
+                      model: str = None, stream: bool = False) -> BaseTranslator:
+    """concurrency — скільки запитів до сервісу може виконуватися одночасно (None — значення сервісу);
+    server_url — альтернативна адреса API (DeepL, GPT, Gemini); pool — брати готовий перекладач з TranslatorPool;
+    key_scheduler — KeyScheduler з кількома ключами DeepL, між якими розподіляються запити;
+    model, stream — модель і потокова відповідь для GPT/Gemini."""
+    if service == 'deepl' and key_scheduler is not None and len(key_scheduler.keys) > 1:
+        translator = MultiKeyTranslator(key_scheduler, pool or TranslatorPool(), server_url)
+    elif pool is not None:
+        translator = pool.get(service, api_key, concurrency, server_url, model, stream)
+    else:
+        translator = _build_translator(service, api_key, concurrency, server_url, model, stream)
+    if memory is not None:
+        translator = MemoryTranslator(translator, memory)
+    return translator
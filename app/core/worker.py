@@ -6,12 +6,16 @@ from PyQt6.QtCore import QObject, pyqtSignal, pyqtSlot
 class Worker(QObject):
     finished = pyqtSignal(object)
     error = pyqtSignal(tuple)
+    progress = pyqtSignal(object)
 
-    def __init__(self, fn, *args, **kwargs):
+    def __init__(self, fn, *args, with_progress=False, **kwargs):
         super().__init__()
         self.fn = fn
         self.args = args
         self.kwargs = kwargs
+        # fn отримає progress_callback, щоб повідомляти про проміжні результати з потоку
+        if with_progress:
+            self.kwargs['progress_callback'] = self.progress.emit
 
     @pyqtSlot()
     def run(self):
@@ -2,18 +2,32 @@
 
 import sys
 import os
+import time
 import traceback
-import easyocr
-import cv2
-import numpy as np
 
 # Оновлені імпорти з нової структури
-from .core.translators import GoogleTranslator, DeepLTranslator
+from .core.translators import (
+    DeepLTranslator, HedgedTranslator, MemoryTranslator, TranslatorPool, create_translator, convert_lang_code
+)
+from .core.ocr import create_reader
+from .core.ocr_cache import OcrCache
+from .core.ocr_tiling import DEFAULT_TILE_HEIGHT
+from .core.ocr_batching import BatchingReader
+from .core.translation_batching import CoalescingTranslator
+from .core.thumbnails import ThumbnailLoader, ThumbnailCache
+from .core.translation_memory import TranslationMemory, DEFAULT_FUZZY_THRESHOLD
+from .core.pipeline import (
+    Pipeline, PageJob, build_ocr_stages, GroupStage, TranslateStage, DistributeStage
+)
+from .core.region_store import RegionStore
+from .core.text_layout import group_text_bubbles, combine_group_texts, distribute_text_to_group
+from .core.renderer import load_fonts, render_translated_image
 from .core.api_manager import ApiKeyManager
 from .core.worker import Worker
 from .ui_components.settings_dialog import SettingsDialog
 from .ui_components.check_dialog import ServiceCheckDialog
 from .ui_components.image_label import ImageLabel
+from .ui_components.tiled_image import TiledImageLabel
 from .ui_components.drop_zone import DropZoneWidget
 from .ui_components.minimap import MinimapWidget
 from .ui_components.page_list import PageListWidget
@@ -21,15 +35,14 @@ from .ui_components.page_list import PageListWidget
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLabel, QScrollArea, QListWidget, QListWidgetItem, QTextEdit,
-    QFileDialog, QGroupBox, QFormLayout, QFontComboBox, QSpinBox,
+    QFileDialog, QGroupBox, QFormLayout, QFontComboBox, QSpinBox, QDoubleSpinBox,
     QStatusBar, QFrame, QComboBox, QGridLayout, QProgressBar, QStackedWidget,
-    QSplitter, QMessageBox
+    QSplitter, QMessageBox, QInputDialog
 )
 from PyQt6.QtGui import (
-    QPixmap, QPainter, QPen, QFont, QFontDatabase,
-    QColor, QFontMetrics, QIcon
+    QPixmap, QColor, QFontMetrics, QIcon
 )
-from PyQt6.QtCore import Qt, QRect, pyqtSlot, QSize, QThread, QEvent
+from PyQt6.QtCore import Qt, pyqtSlot, QSize, QThread, QEvent
 
 class ManhwaTranslatorApp(QMainWindow):
     def __init__(self):
@@ -50,16 +63,28 @@ class ManhwaTranslatorApp(QMainWindow):
 
         self.status_bar = QStatusBar(); self.setStatusBar(self.status_bar)
         self.image_path = None; self.current_pixmap = QPixmap()
-        self.found_rects = []; self.translated_pixmap = QPixmap()
+        self.found_rects = RegionStore(); self.translated_pixmap = QPixmap()
         self.thread = None; self.worker = None
 
         self.translation_groups = []
+        self.region_groups = {}
         self.sentences_to_translate = []
+        # path -> результати обробки сторінки, щоб вони не губилися при перемиканні сторінок
+        self.page_states = {}
 
         self.view_stack.setCurrentWidget(self.drop_zone)
         self.ocr_reader = None
+        self.ocr_pipeline = None
+        self.ocr_cache = None
+        self.ocr_reader_settings = {}
+        self.translation_memory = TranslationMemory(fuzzy_threshold=DEFAULT_FUZZY_THRESHOLD)
+        self.key_manager = ApiKeyManager()
+        self.translator_pool = TranslatorPool()
+        # Хеджовані перекладачі живуть між сторінками, щоб накопичувати статистику затримок
+        self.hedged_translators = {}
 
         self._update_language_combos()
+        self._update_hedge_controls()
         self.start_ocr_initialization()
         self.update_page_control_buttons()
 
@@ -89,9 +114,34 @@ class ManhwaTranslatorApp(QMainWindow):
         self.translator_service_combo = QComboBox()
         self.translator_service_combo.addItem("Google Translate", "google")
         self.translator_service_combo.addItem("DeepL", "deepl")
+        self.translator_service_combo.addItem("GPT", "gpt")
+        self.translator_service_combo.addItem("Gemini", "gemini")
         self.btn_settings = QPushButton("⚙️ API")
         self.btn_check_service = QPushButton("🔬 Перевірка")
+        # Резервний сервіс отримує той самий пакет, якщо основний відповідає довше за свій p95
+        self.hedge_service_combo = QComboBox()
+        self.hedge_service_combo.setToolTip("Резервний сервіс, якщо основний завис")
+        self.hedge_service_combo.addItem("Без резерву", None)
+        self.hedge_service_combo.addItem("Резерв: Google", "google")
+        self.hedge_service_combo.addItem("Резерв: DeepL", "deepl")
+        self.hedge_service_combo.addItem("Резерв: GPT", "gpt")
+        self.hedge_service_combo.addItem("Резерв: Gemini", "gemini")
+        # Коли надсилати резервний запит: за перцентилем затримок основного сервісу або через фіксований час
+        self.hedge_percentile_spin = QSpinBox()
+        self.hedge_percentile_spin.setRange(50, 99)
+        self.hedge_percentile_spin.setValue(round(HedgedTranslator.DEFAULT_PERCENTILE * 100))
+        self.hedge_percentile_spin.setPrefix("p")
+        self.hedge_percentile_spin.setToolTip("Резервний запит — якщо основний сервіс відповідає довше за цей перцентиль своїх затримок")
+        self.hedge_delay_spin = QDoubleSpinBox()
+        self.hedge_delay_spin.setRange(0, HedgedTranslator.MAX_DELAY)
+        self.hedge_delay_spin.setSingleStep(0.5)
+        self.hedge_delay_spin.setSuffix(" с")
+        self.hedge_delay_spin.setSpecialValueText("за перцентилем")
+        self.hedge_delay_spin.setToolTip("Фіксована затримка перед резервним запитом замість перцентиля")
         service_layout.addWidget(self.translator_service_combo)
+        service_layout.addWidget(self.hedge_service_combo)
+        service_layout.addWidget(self.hedge_percentile_spin)
+        service_layout.addWidget(self.hedge_delay_spin)
         service_layout.addWidget(self.btn_settings)
         service_layout.addWidget(self.btn_check_service)
 
@@ -138,7 +188,7 @@ class ManhwaTranslatorApp(QMainWindow):
         translated_layout.addWidget(QLabel("Переклад:"))
         self.translated_scroll_area = QScrollArea(); self.translated_scroll_area.setWidgetResizable(False)
         self.translated_scroll_area.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.translated_image_label = QLabel(); self.translated_image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.translated_image_label = TiledImageLabel()
         self.translated_scroll_area.setWidget(self.translated_image_label)
         translated_layout.addWidget(self.translated_scroll_area)
         self.image_splitter.addWidget(original_frame)
@@ -162,6 +212,9 @@ class ManhwaTranslatorApp(QMainWindow):
         self.page_list_widget.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
         self.page_list_widget.setWordWrap(True)
         pages_layout.addWidget(self.page_list_widget)
+        self.thumbnail_loader = ThumbnailLoader(self.page_list_widget.iconSize(), ThumbnailCache(), parent=self)
+        # Сторінки, мініатюри яких ще не готові
+        self.thumbnails_pending = set()
 
         page_buttons_panel = QWidget()
         page_buttons_layout = QGridLayout(page_buttons_panel)
@@ -222,9 +275,15 @@ class ManhwaTranslatorApp(QMainWindow):
         self.btn_process = QPushButton("Розпізнати та Перекласти")
         self.btn_render = QPushButton("Відтворити")
         self.btn_save = QPushButton("Зберегти")
+        self.btn_process_all = QPushButton("Обробити всі сторінки")
+        self.btn_process_all.setToolTip("Розпізнавання, переклад і відтворення всіх сторінок одночасно, конвеєром")
         action_buttons_layout.addWidget(self.btn_process, 0, 0, 1, 2)
-        action_buttons_layout.addWidget(self.btn_render, 1, 0)
-        action_buttons_layout.addWidget(self.btn_save, 1, 1)
+        self.btn_export_languages = QPushButton("🌐 Кількома мовами...")
+        self.btn_export_languages.setToolTip("Одне розпізнавання, переклад і збереження всіх сторінок кількома мовами")
+        action_buttons_layout.addWidget(self.btn_process_all, 1, 0)
+        action_buttons_layout.addWidget(self.btn_export_languages, 1, 1)
+        action_buttons_layout.addWidget(self.btn_render, 2, 0)
+        action_buttons_layout.addWidget(self.btn_save, 2, 1)
         right_layout.addLayout(action_buttons_layout)
         self.progress_bar = QProgressBar(); self.progress_bar.setTextVisible(True)
         self.progress_bar.setAlignment(Qt.AlignmentFlag.AlignCenter)
@@ -260,14 +319,20 @@ class ManhwaTranslatorApp(QMainWindow):
 
     def _connect_signals(self):
         self.translator_service_combo.currentIndexChanged.connect(self._update_language_combos)
+        self.hedge_service_combo.currentIndexChanged.connect(self._update_hedge_controls)
+        self.hedge_delay_spin.valueChanged.connect(self._update_hedge_controls)
         self.btn_settings.clicked.connect(self.open_settings_dialog)
         self.btn_check_service.clicked.connect(self.open_service_checker)
         self.drop_zone.btn_browse.clicked.connect(self.open_image_dialog)
         self.drop_zone.files_dropped.connect(self.add_pages)
         self.btn_process.clicked.connect(self.start_full_process)
+        self.btn_process_all.clicked.connect(self.start_process_all_pages)
+        self.btn_export_languages.clicked.connect(self.start_multi_language_export)
         self.btn_render.clicked.connect(self.render_translated_image)
         self.btn_save.clicked.connect(self.save_translated_image)
         self.text_list.currentRowChanged.connect(self.update_edit_panel)
+        self.original_image_label.region_clicked.connect(self.on_region_clicked)
+        self.original_image_label.region_hovered.connect(self.on_region_hovered)
         self.translated_text.textChanged.connect(self.update_data_from_panel)
         self.font_combo.currentTextChanged.connect(self.update_data_from_panel)
         self.font_size_spin.valueChanged.connect(self.update_data_from_panel)
@@ -280,6 +345,7 @@ class ManhwaTranslatorApp(QMainWindow):
         # Сигнал splitterMoved тепер не потрібен для балансування, але корисний для оновлення розміру зображення
         self.main_splitter.splitterMoved.connect(self.update_image_display_sizes)
         self.page_list_widget.currentItemChanged.connect(self.on_page_selected)
+        self.thumbnail_loader.thumbnail_ready.connect(self.on_thumbnail_ready)
         self.page_list_widget.model().rowsMoved.connect(self.renumber_pages)
         self.btn_add_page.clicked.connect(self.open_image_dialog)
         self.btn_delete_page.clicked.connect(self.delete_page)
@@ -310,28 +376,16 @@ class ManhwaTranslatorApp(QMainWindow):
     def open_settings_dialog(self):
         dialog = SettingsDialog(self)
         dialog.exec()
+        # Клієнти видалених ключів більше не потрібні
+        if self.key_manager.reload_if_changed():
+            self.translator_pool.retain_keys(self.key_manager.data["services"])
 
     def open_service_checker(self):
-        dialog = ServiceCheckDialog(self)
+        dialog = ServiceCheckDialog(self, translator_pool=self.translator_pool)
         dialog.exec()
 
     def _distribute_text_to_group(self, group_index, new_text):
-        group_indices = self.translation_groups[group_index]
-        original_words_in_group = [self.found_rects[idx]['text'].split() for idx in group_indices]
-        total_original_words = sum(len(words) for words in original_words_in_group)
-        translated_words = new_text.split()
-        total_translated_words = len(translated_words)
-        start_index = 0
-        for j, idx in enumerate(group_indices):
-            num_original_words = len(original_words_in_group[j])
-            share = num_original_words / total_original_words if total_original_words > 0 else 0
-            num_translated_words = round(share * total_translated_words)
-            if j == len(group_indices) - 1:
-                chunk = translated_words[start_index:]
-            else:
-                chunk = translated_words[start_index : start_index + num_translated_words]
-            self.found_rects[idx]['translated'] = " ".join(chunk)
-            start_index += num_translated_words
+        distribute_text_to_group(self.found_rects, self.translation_groups[group_index], new_text)
 
     def open_image_dialog(self):
         paths, _ = QFileDialog.getOpenFileNames(self, "Обрати зображення", "", "Images (*.png *.jpg *.jpeg)")
@@ -340,20 +394,31 @@ class ManhwaTranslatorApp(QMainWindow):
 
     def add_pages(self, paths: list):
         self.status_bar.showMessage(f"Додавання {len(paths)} сторінок...")
+        # Мініатюри створюються у фоні та підставляються в міру готовності
+        placeholder = QPixmap(self.page_list_widget.iconSize())
+        placeholder.fill(QColor("#23272a"))
+        placeholder_icon = QIcon(placeholder)
         for path in paths:
             item = QListWidgetItem()
             item.setData(Qt.ItemDataRole.UserRole, path)
             item.setText(os.path.basename(path))
-            thumb = QPixmap(path).scaled(self.page_list_widget.iconSize(),
-                                           Qt.AspectRatioMode.KeepAspectRatio,
-                                           Qt.TransformationMode.SmoothTransformation)
-            item.setIcon(QIcon(thumb))
+            item.setIcon(placeholder_icon)
             self.page_list_widget.addItem(item)
+        self.thumbnails_pending.update(paths)
+        self.thumbnail_loader.request(paths)
         self.renumber_pages()
         if self.page_list_widget.count() > 0 and self.image_path is None:
             self.page_list_widget.setCurrentRow(0)
         self.status_bar.showMessage(f"Готово. Всього сторінок: {self.page_list_widget.count()}", 5000)
 
+    def on_thumbnail_ready(self, path, image):
+        self.thumbnails_pending.discard(path)
+        icon = QIcon(QPixmap.fromImage(image))
+        for i in range(self.page_list_widget.count()):
+            item = self.page_list_widget.item(i)
+            if item.data(Qt.ItemDataRole.UserRole) == path:
+                item.setIcon(icon)
+
     def delete_page(self):
         selected_item = self.page_list_widget.currentItem()
         if not selected_item: return
@@ -364,6 +429,15 @@ class ManhwaTranslatorApp(QMainWindow):
         if reply == QMessageBox.StandardButton.Yes:
             row = self.page_list_widget.currentRow()
             self.page_list_widget.takeItem(row)
+            deleted_path = selected_item.data(Qt.ItemDataRole.UserRole)
+            self.page_states.pop(deleted_path, None)
+            if deleted_path in self.thumbnails_pending:
+                # Мініатюра видаленої сторінки більше не потрібна: скасовуємо чергу і ставимо решту заново
+                self.thumbnails_pending.discard(deleted_path)
+                self.thumbnail_loader.cancel_pending()
+                remaining = [self.page_list_widget.item(i).data(Qt.ItemDataRole.UserRole)
+                             for i in range(self.page_list_widget.count())]
+                self.thumbnail_loader.request([path for path in remaining if path in self.thumbnails_pending])
             self.renumber_pages()
             if self.page_list_widget.count() == 0:
                 self.display_page(None)
@@ -425,12 +499,12 @@ class ManhwaTranslatorApp(QMainWindow):
             self.image_path = None
             self.current_pixmap = QPixmap()
             self.original_image_label.set_pixmap(self.current_pixmap)
-            self.translated_image_label.setPixmap(QPixmap())
+            self.translated_image_label.set_pixmap(QPixmap())
             self.minimap.set_pixmap(QPixmap())
             self.text_list.clear()
             self.clear_edit_panel()
             self.original_image_label.set_selected_indices([])
-            self.found_rects = []
+            self.found_rects = RegionStore()
             self.view_stack.setCurrentWidget(self.drop_zone)
             self.update_button_states()
             return
@@ -445,15 +519,17 @@ class ManhwaTranslatorApp(QMainWindow):
         self.original_image_label.set_pixmap(self.current_pixmap)
         self.minimap.set_pixmap(self.current_pixmap)
         self.translated_pixmap = QPixmap()
-        self.translated_image_label.setPixmap(QPixmap())
+        self.translated_image_label.set_pixmap(QPixmap())
         self.translated_image_label.setFixedSize(0,0)
         self.status_bar.showMessage(f"Відкрито: {path}")
         self.text_list.clear()
         self.clear_edit_panel()
         self.original_image_label.set_rects([])
         self.original_image_label.set_selected_indices([])
-        self.found_rects = []
+        self.found_rects = RegionStore()
         self.view_stack.setCurrentWidget(self.original_scroll_area)
+        if path in self.page_states:
+            self._restore_page_state(path)
         QApplication.processEvents()
         self.balance_image_splitter()
         self.update_image_display_sizes()
@@ -488,17 +564,14 @@ class ManhwaTranslatorApp(QMainWindow):
         self.thread.start()
 
     def _initialize_ocr_task(self):
-        ocr_langs = ['ko', 'en']
-        try:
-            reader = easyocr.Reader(ocr_langs, gpu=True)
-            device = "GPU"
-        except Exception:
-            reader = easyocr.Reader(ocr_langs, gpu=False)
-            device = "CPU"
-        return reader, device, ocr_langs
+        return create_reader()
 
     def on_ocr_initialized(self, result):
         self.ocr_reader, device, ocr_langs = result
+        # Повторний запуск тієї ж сторінки (напр. з іншою мовою перекладу) бере OCR з кешу
+        self.ocr_cache = OcrCache()
+        self.ocr_reader_settings = {'langs': ocr_langs}
+        self.ocr_pipeline = Pipeline(build_ocr_stages(self.ocr_reader, self.ocr_cache, self.ocr_reader_settings, DEFAULT_TILE_HEIGHT))
         self.progress_bar.hide()
         self.status_bar.showMessage(f"OCR завантажено для {ocr_langs} ({device}). Готово до роботи!")
         self.set_buttons_enabled(True)
@@ -521,7 +594,7 @@ class ManhwaTranslatorApp(QMainWindow):
             QComboBox QAbstractItemView { background-color: #4a4d50; selection-background-color: #7289da; }
             QFrame#imageFrame { background-color: #23272a; border: 1px solid #4a4d50; border-radius: 8px; }
             QScrollArea { border: none; }
-            QTextEdit, QSpinBox { background-color: #4a4d50; border-radius: 5px; padding: 5px; }
+            QTextEdit, QSpinBox, QDoubleSpinBox { background-color: #4a4d50; border-radius: 5px; padding: 5px; }
             QListWidget { background-color: #4a4d50; border-radius: 5px; padding: 5px; font-family: 'Malgun Gothic', 'Arial'; }
             QListWidget::item { border-radius: 4px; padding: 2px; color: #b0b3b8;}
             QListWidget::item:selected { background-color: rgba(114, 137, 218, 0.8); border: 2px solid #7289da; color: white;}
@@ -531,18 +604,7 @@ class ManhwaTranslatorApp(QMainWindow):
         """
 
     def load_fonts(self, fonts_dir):
-        loaded_font_families = []
-        if not os.path.isdir(fonts_dir):
-            print(f"Папку зі шрифтами не знайдено: {fonts_dir}")
-            return []
-        for font_file in os.listdir(fonts_dir):
-            if font_file.lower().endswith(('.ttf', '.otf')):
-                font_path = os.path.join(fonts_dir, font_file)
-                font_id = QFontDatabase.addApplicationFont(font_path)
-                if font_id != -1:
-                    family = QFontDatabase.applicationFontFamilies(font_id)[0]
-                    loaded_font_families.append(family)
-        return loaded_font_families
+        return load_fonts(fonts_dir)
 
     def update_image_display_sizes(self, *_):
         if self.current_pixmap.isNull():
@@ -561,7 +623,7 @@ class ManhwaTranslatorApp(QMainWindow):
         self.original_image_label.setFixedSize(display_width, display_height)
         self.translated_image_label.setFixedSize(display_width, display_height)
         self.original_image_label.update_scaled_display()
-        self.display_translated_image()
+        self.translated_image_label.update_scaled_display()
         QApplication.processEvents()
         self.minimap.update_viewport()
 
@@ -569,36 +631,21 @@ class ManhwaTranslatorApp(QMainWindow):
         if self.current_pixmap.isNull(): return
         self.status_bar.showMessage("Виконується відтворення...")
         QApplication.processEvents()
-        self.translated_pixmap = self.current_pixmap.copy()
-        painter = QPainter(self.translated_pixmap)
-        comic_fonts_with_spacing = ["Badaboom", "CCShoutOut", "Anime Ace"]
-        for item in self.found_rects:
-            if not item.get('translated', ''): continue
-            rect, text = item['rect'], item['translated']
-            font_name = item['font']
-            font_size = item['font_size']
-            font = QFont(font_name, font_size)
-            if any(comic_font in font_name for comic_font in comic_fonts_with_spacing):
-                font.setLetterSpacing(QFont.SpacingType.AbsoluteSpacing, 2)
-            painter.setFont(font)
-            painter.fillRect(rect, Qt.GlobalColor.white)
-            painter.setPen(Qt.GlobalColor.black)
-            painter.drawText(rect, int(Qt.AlignmentFlag.AlignCenter | Qt.TextFlag.TextWordWrap), text)
-        painter.end()
+        rendered_image = render_translated_image(self.current_pixmap.toImage(), self.found_rects)
+        self.translated_pixmap = QPixmap.fromImage(rendered_image)
         self.display_translated_image()
+        self._store_page_state()
         self.status_bar.showMessage("Відтворення завершено.")
         self.update_button_states()
 
     def display_translated_image(self):
-        if self.translated_pixmap.isNull() or self.translated_image_label.size().width() <= 0:
-            self.translated_image_label.setPixmap(QPixmap())
+        if self.translated_pixmap.isNull():
+            self.translated_image_label.set_pixmap(QPixmap())
             return
-        scaled_pixmap = self.translated_pixmap.scaled(
-            self.translated_image_label.size(),
-            Qt.AspectRatioMode.KeepAspectRatio,
-            Qt.TransformationMode.SmoothTransformation
-        )
-        self.translated_image_label.setPixmap(scaled_pixmap)
+        # Поза перекладеними блоками сторінка збігається з оригіналом — плитки беруться зі спільного кешу
+        changed_rects = [item.rect for item in self.found_rects if item.translated]
+        self.translated_image_label.set_pixmap(self.translated_pixmap, shared_key=self.current_pixmap.cacheKey(),
+                                               changed_rects=changed_rects)
 
     def save_translated_image(self):
         if self.translated_pixmap.isNull(): return
@@ -642,6 +689,17 @@ class ManhwaTranslatorApp(QMainWindow):
             self._distribute_text_to_group(group_index, new_translated_text)
             self.update_button_states()
 
+    def on_region_clicked(self, region_index):
+        group_index = self.region_groups.get(region_index)
+        if group_index is not None and group_index < self.text_list.count():
+            self.text_list.setCurrentRow(group_index)
+            self.text_list.scrollToItem(self.text_list.currentItem())
+
+    def on_region_hovered(self, region_index):
+        group_index = self.region_groups.get(region_index)
+        self.original_image_label.set_hover_indices(
+            self.translation_groups[group_index] if group_index is not None else [])
+
     def update_edit_panel(self, current_row):
         if 0 <= current_row < len(self.translation_groups):
             group_index = current_row
@@ -664,27 +722,11 @@ class ManhwaTranslatorApp(QMainWindow):
         self.progress_bar.hide()
         self.set_buttons_enabled(True)
 
-    def _preprocess_with_opencv(self, image_path):
-        try:
-            with open(image_path, "rb") as f:
-                image_bytes = np.frombuffer(f.read(), np.uint8)
-            img = cv2.imdecode(image_bytes, cv2.IMREAD_COLOR)
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            processed_img = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                                                  cv2.THRESH_BINARY, 11, 2)
-            return processed_img
-        except Exception as e:
-            print(f"Помилка під час обробки OpenCV: {e}")
-            return None
-
     def _ocr_task(self, image_path, mode):
-        if mode == "opencv":
-            processed_image = self._preprocess_with_opencv(image_path)
-            if processed_image is None:
-                return self.ocr_reader.readtext(image_path)
-            return self.ocr_reader.readtext(processed_image)
-        else: # standard
-            return self.ocr_reader.readtext(image_path)
+        page = self.ocr_pipeline.run(PageJob(image_path, ocr_mode=mode))
+        if page.failed:
+            raise page.error
+        return page.ocr_results
 
     def start_full_process(self):
         if not self.image_path or not self.ocr_reader: return
@@ -702,65 +744,119 @@ class ManhwaTranslatorApp(QMainWindow):
         self.thread.finished.connect(self.thread.deleteLater)
         self.thread.start()
 
-    def _group_text_bubbles(self, ocr_results, max_distance=70):
-        if not ocr_results: return []
-        sorted_blocks = sorted(
-            [{
-                'id': i,
-                'rect': QRect(int(bbox[0][0]), int(bbox[0][1]), int(bbox[1][0] - bbox[0][0]), int(bbox[2][1] - bbox[1][1])),
-                'text': text
-            } for i, (bbox, text, prob) in enumerate(ocr_results)],
-            key=lambda b: (b['rect'].center().y(), b['rect'].center().x())
-        )
-        if not sorted_blocks: return []
-        groups = []
-        current_group = [sorted_blocks[0]['id']]
-        for i in range(1, len(sorted_blocks)):
-            prev_box = sorted_blocks[i-1]
-            current_box = sorted_blocks[i]
-            vertical_distance = current_box['rect'].top() - prev_box['rect'].bottom()
-            if 0 <= vertical_distance < max_distance:
-                current_group.append(current_box['id'])
-            else:
-                groups.append(current_group)
-                current_group = [current_box['id']]
-        groups.append(current_group)
-        return groups
+    def _group_text_bubbles(self, ocr_results, max_distance=None):
+        return group_text_bubbles(ocr_results, max_distance)
 
     def on_detection_finished_and_start_translation(self, results):
-        self.found_rects = []
-        for (bbox, text, prob) in results:
-            top_left, _, bottom_right, _ = bbox
-            rect = QRect(int(top_left[0]), int(top_left[1]), int(bottom_right[0] - top_left[0]), int(bottom_right[1] - top_left[1]))
-            default_font = self.loaded_fonts[0] if self.loaded_fonts else "Arial"
-            self.found_rects.append({'rect': rect, 'text': text, 'translated': '', 'font': default_font, 'font_size': 14})
+        default_font = self.loaded_fonts[0] if self.loaded_fonts else "Arial"
+        self.found_rects = RegionStore.from_ocr_results(results, default_font, 14)
         self.translation_groups = self._group_text_bubbles(results)
-        self.sentences_to_translate = []
-        for group_idx, group in enumerate(self.translation_groups):
-            combined_text = " ".join(self.found_rects[i]['text'] for i in group)
-            self.sentences_to_translate.append(combined_text)
+        self.sentences_to_translate = combine_group_texts(self.found_rects, self.translation_groups)
         self.original_image_label.set_rects(self.found_rects)
-        self.text_list.clear()
-        for i, sentence in enumerate(self.sentences_to_translate):
-            item = QListWidgetItem(f"{i+1}. {sentence[:60]}...")
-            item.setData(Qt.ItemDataRole.UserRole, i)
-            self.text_list.addItem(item)
+        self._fill_text_list()
         self.status_bar.showMessage(f"Розпізнано {len(self.found_rects)} блоків, згруповано в {len(self.translation_groups)} речень. Переклад...")
         self.progress_bar.setFormat("Переклад речень...")
         QApplication.processEvents()
         self.translate_all_blocks()
 
-    def _translation_task(self, items, src_lang, dest_lang, service, api_key=""):
+    def _text_list_label(self, group_index):
+        label = f"{group_index+1}. {self.sentences_to_translate[group_index][:60]}..."
+        group_indices = self.translation_groups[group_index] if group_index < len(self.translation_groups) else []
+        translated = " ".join(self.found_rects[i].get('translated', '') for i in group_indices).strip()
+        if translated:
+            label += f" → {translated[:40]}"
+        return label
+
+    def _fill_text_list(self):
+        self.text_list.clear()
+        # Блок -> речення, щоб клік по зображенню обирав групу без перебору
+        self.region_groups = {idx: group_index for group_index, group in enumerate(self.translation_groups)
+                              for idx in group}
+        for i in range(len(self.sentences_to_translate)):
+            item = QListWidgetItem(self._text_list_label(i))
+            item.setData(Qt.ItemDataRole.UserRole, i)
+            self.text_list.addItem(item)
+
+    def _start_progress(self, total, label):
+        """Прогрес із реальною кількістю виконаного та оцінкою часу, що залишився."""
+        self._progress_label = label
+        self._progress_started = time.monotonic()
+        self.progress_bar.setRange(0, total); self.progress_bar.setValue(0)
+        self.progress_bar.setFormat(f"{label}: %v / %m"); self.progress_bar.show()
+
+    def _advance_progress(self, done):
+        self.progress_bar.setValue(done)
+        total = self.progress_bar.maximum()
+        if 0 < done < total:
+            eta = (time.monotonic() - self._progress_started) / done * (total - done)
+            self.progress_bar.setFormat(f"{self._progress_label}: %v / %m, залишилось ≈ {eta:.0f} с")
+        else:
+            self.progress_bar.setFormat(f"{self._progress_label}: %v / %m")
+
+    def _update_hedge_controls(self):
+        hedged = self.hedge_service_combo.currentData() is not None
+        self.hedge_delay_spin.setEnabled(hedged)
+        # Перцентиль не діє, поки задано фіксовану затримку
+        self.hedge_percentile_spin.setEnabled(hedged and self.hedge_delay_spin.value() == 0)
+
+    def _get_hedge(self, service):
+        """(резервний сервіс, ключ, перцентиль, фіксована затримка або None) або None,
+        якщо резерв не обрано, він збігається з основним чи не має ключа."""
+        hedge_service = self.hedge_service_combo.currentData()
+        if not hedge_service or hedge_service == service:
+            return None
+        hedge_key = self.key_manager.get_active_key(hedge_service) if hedge_service != 'google' else None
+        if hedge_service != 'google' and not hedge_key:
+            self.status_bar.showMessage(f"Резерв '{hedge_service.capitalize()}' вимкнено: немає активного API ключа.")
+            return None
+        return (hedge_service, hedge_key, self.hedge_percentile_spin.value() / 100,
+                self.hedge_delay_spin.value() or None)
+
+    def _create_translator(self, service, api_key, hedge=None, key_scheduler=None):
+        if hedge is None:
+            return create_translator(service, api_key, memory=self.translation_memory, pool=self.translator_pool,
+                                     key_scheduler=key_scheduler)
+        hedge_service, hedge_key, percentile, fixed_delay = hedge
+        # Резерв обгортає самі сервіси, а пам'ять перекладів — зовні: затримки рахуються лише для справжніх запитів
+        translator = create_translator(service, api_key, pool=self.translator_pool, key_scheduler=key_scheduler)
+        secondary = create_translator(hedge_service, hedge_key, pool=self.translator_pool)
+        hedged = self.hedged_translators.get((service, hedge_service))
+        if hedged is None:
+            hedged = self.hedged_translators[(service, hedge_service)] = HedgedTranslator(
+                translator, secondary, percentile=percentile, fixed_delay=fixed_delay)
+        else:
+            # Ключі й налаштування могли змінитися; історія затримок основного сервісу зберігається
+            hedged.primary, hedged.secondary = translator, secondary
+            hedged.percentile, hedged.fixed_delay = percentile, fixed_delay
+        if self.translation_memory is None:
+            return hedged
+        return MemoryTranslator(hedged, self.translation_memory)
+
+    def _translation_task(self, items, src_lang, dest_lang, service, api_key="", hedge=None, progress_callback=None):
         try:
-            translator = None
-            if service == 'deepl':
-                translator = DeepLTranslator(api_key)
-            else:
-                translator = GoogleTranslator()
-            return translator.translate_batch(items, src_lang, dest_lang)
+            translator = self._create_translator(service, api_key, hedge)
+            # Кожне перекладене речення одразу йде в GUI-потік через сигнал progress
+            on_item = None
+            if progress_callback:
+                on_item = lambda index: progress_callback((index, items[index].get('translated', '')))
+            return translator.translate_batch(items, src_lang, dest_lang, on_item)
         except Exception as e:
             return e # Повертаємо виняток, а не викликаємо raise
 
+    def _get_active_api_key(self, service):
+        """Повертає активний ключ сервісу; якщо його немає — попереджає і відкриває налаштування."""
+        if service == 'google':
+            return None
+        self.key_manager.reload_if_changed()
+        api_key = self.key_manager.get_active_key(service)
+        if not api_key:
+            QMessageBox.warning(self, f"Немає API ключа",
+                                f"Для сервісу '{service.capitalize()}' не обрано активний API ключ.")
+            self.progress_bar.hide()
+            self.set_buttons_enabled(True)
+            self.open_settings_dialog()
+        return api_key
+
     def translate_all_blocks(self):
         if not self.sentences_to_translate:
             self.progress_bar.hide()
@@ -769,17 +865,9 @@ class ManhwaTranslatorApp(QMainWindow):
         service = self.translator_service_combo.currentData()
         source_lang_code = self.source_lang_combo.currentData()
         target_lang_code = self.target_lang_combo.currentData()
-        api_key = None
-        if service != 'google':
-            key_manager = ApiKeyManager()
-            api_key = key_manager.get_active_key(service)
-            if not api_key:
-                QMessageBox.warning(self, f"Немає API ключа",
-                                    f"Для сервісу '{service.capitalize()}' не обрано активний API ключ.")
-                self.progress_bar.hide()
-                self.set_buttons_enabled(True)
-                self.open_settings_dialog()
-                return
+        api_key = self._get_active_api_key(service)
+        if service != 'google' and not api_key:
+            return
         items_to_translate = [{'text': sentence} for sentence in self.sentences_to_translate]
         self.thread = QThread()
         self.worker = Worker(self._translation_task,
@@ -787,9 +875,14 @@ class ManhwaTranslatorApp(QMainWindow):
                              source_lang_code,
                              target_lang_code,
                              service,
-                             api_key=api_key)
+                             api_key=api_key,
+                             hedge=self._get_hedge(service),
+                             with_progress=True)
+        self._translated_indices = set()
+        self._start_progress(len(items_to_translate), "Переклад")
         self.worker.moveToThread(self.thread)
         self.thread.started.connect(self.worker.run)
+        self.worker.progress.connect(self.on_translation_progress)
         self.worker.finished.connect(self.on_translation_finished)
         self.worker.error.connect(self.on_task_error)
         self.worker.finished.connect(self.thread.quit)
@@ -797,6 +890,19 @@ class ManhwaTranslatorApp(QMainWindow):
         self.thread.finished.connect(self.thread.deleteLater)
         self.thread.start()
 
+    def on_translation_progress(self, update):
+        group_index, translated = update
+        if group_index in self._translated_indices or not 0 <= group_index < len(self.translation_groups):
+            return
+        self._translated_indices.add(group_index)
+        self._distribute_text_to_group(group_index, translated)
+        list_item = self.text_list.item(group_index)
+        if list_item is not None:
+            list_item.setText(self._text_list_label(group_index))
+        if self.text_list.currentRow() == group_index:
+            self.update_edit_panel(group_index)
+        self._advance_progress(len(self._translated_indices))
+
     def on_translation_finished(self, result):
         if isinstance(result, Exception):
             self.on_task_error((type(result), result, traceback.format_exc()))
@@ -807,7 +913,15 @@ class ManhwaTranslatorApp(QMainWindow):
         for i, group_indices in enumerate(self.translation_groups):
              if i < len(translated_sentences):
                 self._distribute_text_to_group(i, translated_sentences[i])
-        self.status_bar.showMessage("Розпізнавання та переклад завершено.")
+        self._store_page_state()
+        from_memory = sum(1 for item in translated_sentences_items if item.get('from_memory'))
+        message = f"Розпізнавання та переклад завершено. З пам'яті перекладів: {from_memory} з {len(translated_sentences_items)}."
+        hedge_winner = next((item['translated_by'] for item in translated_sentences_items
+                             if item.get('translated_by') not in (None, self.translator_service_combo.currentData())), None)
+        if hedge_winner:
+            message += f" Перекладено резервним сервісом ({hedge_winner.capitalize()})."
+        self.status_bar.showMessage(message)
+        self._fill_text_list()
         if self.text_list.count() > 0:
             self.text_list.setCurrentRow(0)
             self.update_edit_panel(0)
@@ -815,6 +929,172 @@ class ManhwaTranslatorApp(QMainWindow):
         self.set_buttons_enabled(True)
         self.update_button_states()
 
+    def _store_page_state(self):
+        if not self.image_path: return
+        self.page_states[self.image_path] = {
+            'found_rects': self.found_rects,
+            'translation_groups': self.translation_groups,
+            'sentences_to_translate': self.sentences_to_translate,
+            'rendered': not self.translated_pixmap.isNull(),
+        }
+
+    def _restore_page_state(self, path):
+        state = self.page_states[path]
+        self.found_rects = state['found_rects']
+        self.translation_groups = state['translation_groups']
+        self.sentences_to_translate = state['sentences_to_translate']
+        # Повнорозмірний рендер кожної сторінки зайняв би сотні МБ — відтворюємо лише відкриту
+        self.translated_pixmap = QPixmap()
+        if state['rendered'] and not self.current_pixmap.isNull():
+            self.translated_pixmap = QPixmap.fromImage(render_translated_image(self.current_pixmap.toImage(), self.found_rects))
+        self.original_image_label.set_rects(self.found_rects)
+        self._fill_text_list()
+        self.display_translated_image()
+
+    # ------------------------------------------------------------------
+    # Обробка всіх сторінок конвеєром
+    # ------------------------------------------------------------------
+    def start_process_all_pages(self):
+        paths = [self.page_list_widget.item(i).data(Qt.ItemDataRole.UserRole)
+                 for i in range(self.page_list_widget.count())]
+        if not paths or not self.ocr_reader: return
+        service = self.translator_service_combo.currentData()
+        api_key = self._get_active_api_key(service)
+        if service != 'google' and not api_key:
+            return
+        default_font = self.loaded_fonts[0] if self.loaded_fonts else "Arial"
+        self.set_buttons_enabled(False)
+        self.status_bar.showMessage(f"Обробка {len(paths)} сторінок...")
+        self._start_progress(len(paths), "Сторінки")
+        self.thread = QThread()
+        self.worker = Worker(self._process_all_task,
+                             paths,
+                             self.ocr_mode_combo.currentData(),
+                             self.source_lang_combo.currentData(),
+                             self.target_lang_combo.currentData(),
+                             service,
+                             api_key,
+                             default_font,
+                             self._get_hedge(service),
+                             with_progress=True)
+        self.worker.moveToThread(self.thread)
+        self.thread.started.connect(self.worker.run)
+        self.worker.progress.connect(self.on_page_processed)
+        self.worker.finished.connect(self.on_all_pages_processed)
+        self.worker.error.connect(self.on_task_error)
+        self.worker.finished.connect(self.thread.quit)
+        self.worker.finished.connect(self.worker.deleteLater)
+        self.thread.finished.connect(self.thread.deleteLater)
+        self.thread.start()
+
+    def _process_all_task(self, paths, ocr_mode, src_lang, dest_lang, service, api_key, font, hedge=None,
+                          progress_callback=None):
+        # Пакетна обробка розподіляє запити між усіма ключами сервісу
+        key_scheduler = self.key_manager.create_scheduler(service) if service != 'google' else None
+        translator = self._create_translator(service, api_key, hedge, key_scheduler)
+        # Тайли та сторінки однакового розміру розпізнаються пакетами, а речення кількох сторінок
+        # перекладаються спільними запитами
+        with BatchingReader(self.ocr_reader) as batching_reader, CoalescingTranslator(translator) as coalescer:
+            with Pipeline(build_ocr_stages(batching_reader, self.ocr_cache, self.ocr_reader_settings, DEFAULT_TILE_HEIGHT) + [
+                GroupStage(font, 14),
+                TranslateStage(coalescer, src_lang, dest_lang),
+                DistributeStage(),
+            ]) as pipeline:
+                pages = pipeline.run_pipelined([PageJob(path, ocr_mode=ocr_mode) for path in paths],
+                                               on_page_done=progress_callback)
+        return len(pages), [page.image_path for page in pages if page.failed]
+
+    def on_page_processed(self, page):
+        self._advance_progress(self.progress_bar.value() + 1)
+        if page.failed:
+            print(f"Помилка обробки {page.image_path} ({page.failed_stage}): {page.error}")
+            page.image_bytes = page.image = None
+            return
+        # Сторінка відтворюється при відкритті (_restore_page_state), тож зображення не зберігаються
+        self.page_states[page.image_path] = {
+            'found_rects': RegionStore.from_dicts(page.regions),
+            'translation_groups': page.groups,
+            'sentences_to_translate': page.sentences,
+            'rendered': True,
+        }
+        # Результат вже в page_states; run_pipelined тримає всі PageJob до кінця, тож звільняємо важкі поля
+        page.image_bytes = page.image = None
+        if page.image_path == self.image_path:
+            self._restore_page_state(page.image_path)
+
+    def on_all_pages_processed(self, result):
+        total, failed = result
+        message = f"Оброблено сторінок: {total - len(failed)} з {total}."
+        if failed:
+            message += f" З помилками: {len(failed)} (деталі в консолі)."
+        self.status_bar.showMessage(message)
+        self.progress_bar.hide()
+        self.set_buttons_enabled(True)
+        self.update_button_states()
+
+    # ------------------------------------------------------------------
+    # Переклад кількома мовами з одного розпізнавання
+    # ------------------------------------------------------------------
+    def start_multi_language_export(self):
+        paths = [self.page_list_widget.item(i).data(Qt.ItemDataRole.UserRole)
+                 for i in range(self.page_list_widget.count())]
+        if not paths or not self.ocr_reader: return
+        service = self.translator_service_combo.currentData()
+        languages, ok = QInputDialog.getText(self, "Мови перекладу",
+                                             "Коди мов через кому (напр. uk, en, de):",
+                                             text=self.target_lang_combo.currentData() or "")
+        dest_langs = [lang.strip() for lang in languages.split(",") if lang.strip()] if ok else []
+        if not dest_langs: return
+        if service in ('google', 'deepl'):
+            # Як і в пакетному режимі: коди приймаються в будь-яких позначеннях (DeepL знає лише EN-US / EN-GB)
+            dest_langs = list(dict.fromkeys(convert_lang_code(lang, service, target=True) for lang in dest_langs))
+        output_dir = QFileDialog.getExistingDirectory(self, "Папка для перекладених сторінок")
+        if not output_dir: return
+        api_key = self._get_active_api_key(service)
+        if service != 'google' and not api_key:
+            return
+        default_font = self.loaded_fonts[0] if self.loaded_fonts else "Arial"
+        self.set_buttons_enabled(False)
+        self.status_bar.showMessage(f"Обробка {len(paths)} сторінок мовами: {', '.join(dest_langs)}...")
+        self._start_progress(len(paths), "Сторінки")
+        self.thread = QThread()
+        self.worker = Worker(self._multi_language_task,
+                             paths,
+                             output_dir,
+                             self.ocr_mode_combo.currentData(),
+                             self.source_lang_combo.currentData(),
+                             dest_langs,
+                             service,
+                             api_key,
+                             default_font,
+                             self._get_hedge(service),
+                             with_progress=True)
+        self.worker.moveToThread(self.thread)
+        self.thread.started.connect(self.worker.run)
+        self.worker.progress.connect(lambda message: self._advance_progress(self.progress_bar.value() + 1))
+        self.worker.finished.connect(self.on_all_pages_processed)
+        self.worker.error.connect(self.on_task_error)
+        self.worker.finished.connect(self.thread.quit)
+        self.worker.finished.connect(self.worker.deleteLater)
+        self.thread.finished.connect(self.thread.deleteLater)
+        self.thread.start()
+
+    def _multi_language_task(self, paths, output_dir, ocr_mode, src_lang, dest_langs, service, api_key, font,
+                             hedge=None, progress_callback=None):
+        from .core.batch import run_batch
+        key_scheduler = self.key_manager.create_scheduler(service) if service != 'google' else None
+        translator = self._create_translator(service, api_key, hedge, key_scheduler)
+        # Кожен рядок журналу run_batch — одна оброблена або пропущена сторінка
+        def log(message):
+            print(message)
+            if progress_callback: progress_callback(message)
+        with BatchingReader(self.ocr_reader) as batching_reader, CoalescingTranslator(translator) as coalescer:
+            # Кожна мова зберігається в підпапку output_dir/<мова>
+            failed = run_batch(paths, output_dir, batching_reader, coalescer, src_lang, dest_langs,
+                               ocr_mode=ocr_mode, font=font, jobs=2, ocr_cache=self.ocr_cache,
+                               reader_settings=self.ocr_reader_settings, tile_height=DEFAULT_TILE_HEIGHT, log=log)
+        return len(paths), failed
+
     def clear_edit_panel(self):
         self.original_text.clear(); self.translated_text.clear()
         default_font = self.loaded_fonts[0] if self.loaded_fonts else "Arial"
@@ -826,6 +1106,8 @@ class ManhwaTranslatorApp(QMainWindow):
         is_ocr_ready = self.ocr_reader is not None
         master_enabled = enabled and is_ocr_ready
         self.btn_process.setEnabled(master_enabled)
+        self.btn_process_all.setEnabled(master_enabled)
+        self.btn_export_languages.setEnabled(master_enabled)
         self.btn_render.setEnabled(master_enabled)
         self.btn_save.setEnabled(master_enabled)
         self.page_list_widget.setEnabled(master_enabled)
@@ -835,6 +1117,8 @@ class ManhwaTranslatorApp(QMainWindow):
             self.update_button_states()
         else:
             self.btn_process.setEnabled(False)
+            self.btn_process_all.setEnabled(False)
+            self.btn_export_languages.setEnabled(False)
             self.btn_render.setEnabled(False)
             self.btn_save.setEnabled(False)
             self.btn_delete_page.setEnabled(False)
@@ -850,6 +1134,8 @@ class ManhwaTranslatorApp(QMainWindow):
         has_translations = has_rects and any(item.get('translated') for item in self.found_rects)
         has_rendered_image = not self.translated_pixmap.isNull()
         self.btn_process.setEnabled(has_image)
+        self.btn_process_all.setEnabled(self.page_list_widget.count() > 0)
+        self.btn_export_languages.setEnabled(self.page_list_widget.count() > 0)
         self.btn_render.setEnabled(has_translations)
         self.btn_save.setEnabled(has_rendered_image)
         self.update_page_control_buttons()
@@ -5,16 +5,17 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import QThread, pyqtSlot, QEvent, Qt
 
 from ..core.api_manager import ApiKeyManager
-from ..core.translators import GoogleTranslator, DeepLTranslator
+from ..core.translators import create_translator
 from ..core.worker import Worker
 
 class ServiceCheckDialog(QDialog):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, translator_pool=None):
         super().__init__(parent)
         self.setWindowTitle("Перевірка доступності сервісів")
         self.setMinimumSize(500, 450)
 
         self.key_manager = ApiKeyManager()
+        self.translator_pool = translator_pool
         self.thread = None
         self.worker = None
 
@@ -107,11 +108,7 @@ class ServiceCheckDialog(QDialog):
     def _translation_task(self, text, service, api_key):
         """Ця функція виконується в окремому потоці."""
         try:
-            translator = None
-            if service == 'deepl':
-                translator = DeepLTranslator(api_key)
-            else: # google
-                translator = GoogleTranslator()
+            translator = create_translator(service, api_key, pool=self.translator_pool)
 
             # Перекладаємо один елемент
             result_batch = translator.translate_batch(
@@ -1,67 +1,139 @@
 # app/ui_components/image_label.py
-from PyQt6.QtWidgets import QLabel
-from PyQt6.QtGui import QPixmap, QPainter, QPen
-from PyQt6.QtCore import Qt, QRect
+from PyQt6.QtGui import QPainter, QPen, QColor, QPicture
+from PyQt6.QtCore import Qt, QRect, pyqtSignal
+from ..core.region_store import RegionStore
+from .tiled_image import TiledImageLabel
+
+# Накладка з рамками блоків кешується смугами такої висоти (у пікселях віджета):
+# під час прокрутки довгої стрічки відтворюються лише смуги, що потрапили у видиму область
+OVERLAY_BAND_HEIGHT = 512
+# Запас на товщину пера, щоб рамка на межі смуги не обрізалась
+_PEN_MARGIN = 3
+
+class ImageLabel(TiledImageLabel):
+    # Індекс блоку в rects під курсором; -1 — курсор поза блоками
+    region_clicked = pyqtSignal(int)
+    region_hovered = pyqtSignal(int)
 
-class ImageLabel(QLabel):
     def __init__(self):
         super().__init__()
-        self.original_pixmap = QPixmap()
-        self.scaled_pixmap_display = QPixmap()
-        self.rects = []
-        self.selected_indices = []
-        self.setAlignment(Qt.AlignmentFlag.AlignCenter)
-
-    def set_pixmap(self, pixmap):
-        self.original_pixmap = pixmap if pixmap else QPixmap()
-        self.update_scaled_display()
-        self.update()
+        self.rects = RegionStore()
+        self.selected_indices = set()
+        self.hover_indices = set()
+        self.hovered_region = -1
+        # Кеш накладки: рамки в координатах віджета і записані QPicture по смугах
+        self._scaled_rects = None
+        self._overlay_bands = {}
+        self._overlay_geometry = None
+        self.setMouseTracking(True)
 
     def set_rects(self, rects):
-        self.rects = rects
-        self.update()
+        self.rects = rects if isinstance(rects, RegionStore) else RegionStore.from_dicts(rects)
+        self.hover_indices = set()
+        self._set_hovered_region(-1)
+        self._invalidate_overlay()
 
     def set_selected_indices(self, indices):
-        self.selected_indices = indices
+        indices = set(indices)
+        if indices != self.selected_indices:
+            self.selected_indices = indices
+            self._invalidate_overlay()
+
+    def set_hover_indices(self, indices):
+        indices = set(indices)
+        if indices != self.hover_indices:
+            self.hover_indices = indices
+            self._invalidate_overlay()
+
+    def _invalidate_overlay(self):
+        """Скидає кеш накладки; викликається лише при зміні блоків, виділення або масштабу."""
+        self._scaled_rects = None
+        self._overlay_bands.clear()
         self.update()
 
-    def update_scaled_display(self):
-        if self.original_pixmap.isNull() or self.size().width() <= 0 or self.size().height() <= 0:
-            self.scaled_pixmap_display = QPixmap()
+    def region_at(self, pos):
+        """Індекс найменшого блоку під точкою віджета або -1."""
+        geometry = self.display_geometry()
+        if geometry is None or not len(self.rects):
+            return -1
+        x_offset, y_offset, scale = geometry
+        # Одна векторна перевірка по масиву координат сховища — блоки, змінені після set_rects, теж враховуються
+        hits = self.rects.hit_test((pos.x() - x_offset) / scale, (pos.y() - y_offset) / scale)
+        return int(hits[0]) if len(hits) else -1
+
+    def _set_hovered_region(self, index):
+        if index == self.hovered_region:
             return
-        self.scaled_pixmap_display = self.original_pixmap.scaled(
-            self.size(),
-            Qt.AspectRatioMode.KeepAspectRatio,
-            Qt.TransformationMode.SmoothTransformation
-        )
-        self.update()
+        self.hovered_region = index
+        if index >= 0:
+            self.setCursor(Qt.CursorShape.PointingHandCursor)
+        else:
+            self.unsetCursor()
+        self.region_hovered.emit(index)
+
+    def mouseMoveEvent(self, event):
+        self._set_hovered_region(self.region_at(event.position().toPoint()))
+        super().mouseMoveEvent(event)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            index = self.region_at(event.position().toPoint())
+            if index >= 0:
+                self.region_clicked.emit(index)
+                return
+        super().mousePressEvent(event)
+
+    def leaveEvent(self, event):
+        self._set_hovered_region(-1)
+        super().leaveEvent(event)
+
+    def update_scaled_display(self):
+        super().update_scaled_display()
+        # Накладка залежить лише від геометрії, а не від режиму згладжування
+        geometry = self.display_geometry()
+        if geometry != self._overlay_geometry:
+            self._overlay_geometry = geometry
+            self._invalidate_overlay()
+
+    def _overlay_band(self, band):
+        picture = self._overlay_bands.get(band)
+        if picture is not None:
+            return picture
+        if self._scaled_rects is None:
+            x_offset, y_offset, scale = self.display_geometry()
+            self._scaled_rects = self.rects.scaled(scale, x_offset, y_offset)
+        rects = self._scaled_rects
+        top = band * OVERLAY_BAND_HEIGHT - _PEN_MARGIN
+        bottom = (band + 1) * OVERLAY_BAND_HEIGHT + _PEN_MARGIN
+        visible = ((rects[:, 1] < bottom) & (rects[:, 1] + rects[:, 3] > top)).nonzero()[0].tolist()
+        hovered = self.hover_indices - self.selected_indices
+        picture = QPicture()
+        painter = QPainter(picture)
+        for pen, keep in ((QPen(Qt.GlobalColor.red, 2), lambda i: i not in self.selected_indices and i not in hovered),
+                          (QPen(QColor(255, 170, 0), 3), lambda i: i in hovered),
+                          (QPen(Qt.GlobalColor.yellow, 3), lambda i: i in self.selected_indices)):
+            band_rects = [QRect(*rects[i].tolist()) for i in visible if keep(i)]
+            if band_rects:
+                painter.setPen(pen)
+                painter.drawRects(band_rects)
+        painter.end()
+        self._overlay_bands[band] = picture
+        return picture
 
     def paintEvent(self, event):
-        if self.scaled_pixmap_display.isNull():
+        geometry = self.display_geometry()
+        if geometry is None:
             return
 
         painter = QPainter(self)
-        x_offset = (self.width() - self.scaled_pixmap_display.width()) // 2
-        y_offset = (self.height() - self.scaled_pixmap_display.height()) // 2
-        painter.drawPixmap(x_offset, y_offset, self.scaled_pixmap_display)
+        # Малюємо лише відкриту частину: при прокрутці це смуга висотою в кілька рядків пікселів
+        exposed = event.rect()
+        self.paint_image(painter, exposed)
 
-        if not self.rects or self.original_pixmap.width() == 0 or self.scaled_pixmap_display.width() == 0:
+        if not self.rects:
             return
 
-        scale_factor = self.scaled_pixmap_display.width() / self.original_pixmap.width()
-
-        for i, rect_data in enumerate(self.rects):
-            original_rect = rect_data['rect']
-            scaled_rect = QRect(
-                x_offset + int(original_rect.x() * scale_factor),
-                y_offset + int(original_rect.y() * scale_factor),
-                int(original_rect.width() * scale_factor),
-                int(original_rect.height() * scale_factor)
-            )
-            pen = QPen(Qt.GlobalColor.yellow, 3) if i in self.selected_indices else QPen(Qt.GlobalColor.red, 2)
-            painter.setPen(pen)
-            painter.drawRect(scaled_rect)
-
-    def resizeEvent(self, event):
-        super().resizeEvent(event)
-        self.update_scaled_display()
\ No newline at end of file
+        first_band = max(0, exposed.top() // OVERLAY_BAND_HEIGHT)
+        last_band = max(0, exposed.bottom() // OVERLAY_BAND_HEIGHT)
+        for band in range(first_band, last_band + 1):
+            painter.drawPicture(0, 0, self._overlay_band(band))
@@ -0,0 +1,197 @@
+# app/ui_components/tiled_image.py
+# Показ великих сторінок (вебтун-стрічок) плитками з mip-піраміди.
+# Замість повної зменшеної копії при кожній зміні розміру малюються лише видимі плитки:
+# джерело — рівень піраміди, що не більш ніж удвічі більший за екран. Під час активної зміни
+# розміру плитки малюються швидким перетворенням без кешу, а щойно зміна припиняється —
+# згладжено, з кешу. Кеш плиток спільний для всіх переглядів: плитки перекладеної сторінки,
+# що не зачіпають перекладені блоки, збігаються з оригіналом і беруться за його ключем.
+
+import math
+from collections import OrderedDict
+from PyQt6.QtWidgets import QLabel
+from PyQt6.QtGui import QPixmap, QPainter
+from PyQt6.QtCore import Qt, QRect, QRectF, QSize, QTimer
+
+TILE_SIZE = 256
+DEFAULT_TILE_CACHE_BYTES = 192 * 1024 * 1024
+# Через скільки мс після останньої зміни розміру перемальовувати згладжено
+SMOOTH_DELAY_MS = 150
+
+
+class TileCache:
+    """LRU-кеш готових плиток QPixmap з обмеженням за обсягом пам'яті."""
+
+    def __init__(self, max_bytes=DEFAULT_TILE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes_used = 0
+        self._tiles = OrderedDict()
+
+    def get(self, key):
+        tile = self._tiles.get(key)
+        if tile is not None:
+            self._tiles.move_to_end(key)
+        return tile
+
+    def put(self, key, tile: QPixmap):
+        if key in self._tiles:
+            return
+        self._tiles[key] = tile
+        self.bytes_used += tile.width() * tile.height() * 4
+        while self.bytes_used > self.max_bytes and len(self._tiles) > 1:
+            _, evicted = self._tiles.popitem(last=False)
+            self.bytes_used -= evicted.width() * evicted.height() * 4
+
+
+_shared_cache = None
+
+
+def shared_tile_cache():
+    """Один кеш плиток на застосунок (оригінал і переклад користуються ним разом)."""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = TileCache()
+    return _shared_cache
+
+
+class ImagePyramid:
+    """Рівень 0 — саме зображення, кожен наступний удвічі менший; рівні будуються лише на вимогу."""
+
+    def __init__(self, pixmap: QPixmap):
+        self.levels = [pixmap]
+
+    def level_for_scale(self, scale):
+        """Найменший рівень, роздільність якого ще не нижча за екранну."""
+        if scale <= 0 or scale >= 1:
+            return 0
+        return int(math.floor(math.log2(1 / scale)))
+
+    def level(self, index):
+        while len(self.levels) <= index:
+            previous = self.levels[-1]
+            if previous.width() <= 1 and previous.height() <= 1:
+                return previous
+            self.levels.append(previous.scaled(max(1, previous.width() // 2), max(1, previous.height() // 2),
+                                               Qt.AspectRatioMode.IgnoreAspectRatio,
+                                               Qt.TransformationMode.SmoothTransformation))
+        return self.levels[index]
+
+
+class TiledImageLabel(QLabel):
+    """QLabel, що малює зображення, вписане у свій розмір, плитками з піраміди."""
+
+    def __init__(self, tile_cache: TileCache = None):
+        super().__init__()
+        self.original_pixmap = QPixmap()
+        self.pyramid = None
+        self.tile_cache = tile_cache or shared_tile_cache()
+        self._content_key = None
+        # Ключ зображення, з яким ця сторінка збігається поза changed_rects (напр. оригінал для перекладу)
+        self._shared_key = None
+        self._changed_rects = []
+        self._smooth = True
+        self._settle_timer = QTimer(self)
+        self._settle_timer.setSingleShot(True)
+        self._settle_timer.setInterval(SMOOTH_DELAY_MS)
+        self._settle_timer.timeout.connect(self._on_resize_settled)
+        self.setAlignment(Qt.AlignmentFlag.AlignCenter)
+
+    def set_pixmap(self, pixmap, shared_key=None, changed_rects=None):
+        """changed_rects — прямокутники (x, y, w, h) у координатах зображення, де воно відрізняється
+        від зображення з ключем shared_key."""
+        pixmap = pixmap if pixmap else QPixmap()
+        if pixmap.cacheKey() != self._content_key:
+            self.original_pixmap = pixmap
+            self.pyramid = ImagePyramid(pixmap) if not pixmap.isNull() else None
+            self._content_key = pixmap.cacheKey()
+        self._shared_key = shared_key
+        self._changed_rects = [tuple(rect) for rect in changed_rects or []]
+        self.update_scaled_display()
+
+    def display_geometry(self):
+        """(зсув x, зсув y, масштаб) зображення у віджеті або None, якщо показувати нічого."""
+        if self.original_pixmap.isNull() or self.width() <= 0 or self.height() <= 0:
+            return None
+        size = self.original_pixmap.size().scaled(self.size(), Qt.AspectRatioMode.KeepAspectRatio)
+        if size.width() <= 0 or size.height() <= 0:
+            return None
+        return ((self.width() - size.width()) // 2, (self.height() - size.height()) // 2,
+                size.width() / self.original_pixmap.width())
+
+    def update_scaled_display(self):
+        """Нічого не масштабує наперед: до завершення зміни розміру малюємо швидко, потім згладжено."""
+        self._smooth = False
+        self._settle_timer.start()
+        self.update()
+
+    def _on_resize_settled(self):
+        self._smooth = True
+        self.update()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_scaled_display()
+
+    def _tile_key(self, level, scale, col, row, source_rect):
+        key = self._content_key
+        if self._shared_key is not None:
+            # Запас: згладжування й зменшені рівні піраміди беруть і сусідні пікселі
+            margin = 2 << level
+            x, y = source_rect.x() - margin, source_rect.y() - margin
+            w, h = source_rect.width() + 2 * margin, source_rect.height() + 2 * margin
+            if not any(rx < x + w and x < rx + rw and ry < y + h and y < ry + rh
+                       for rx, ry, rw, rh in self._changed_rects):
+                key = self._shared_key
+        return key, level, round(scale, 6), col, row
+
+    def _make_tile(self, level_pixmap, source, size: QSize):
+        tile = QPixmap(size)
+        tile.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(tile)
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        painter.drawPixmap(QRectF(0, 0, size.width(), size.height()), level_pixmap, source)
+        painter.end()
+        return tile
+
+    def paint_image(self, painter, exposed: QRect):
+        """Малює частину зображення, що потрапила в exposed (координати віджета)."""
+        geometry = self.display_geometry()
+        if geometry is None:
+            return
+        x_offset, y_offset, scale = geometry
+        width = round(self.original_pixmap.width() * scale)
+        height = round(self.original_pixmap.height() * scale)
+        visible = exposed.translated(-x_offset, -y_offset).intersected(QRect(0, 0, width, height))
+        if visible.isEmpty():
+            return
+        level = self.pyramid.level_for_scale(scale)
+        level_pixmap = self.pyramid.level(level)
+        level_scale = level_pixmap.width() / self.original_pixmap.width()
+        # Коефіцієнт: пікселі відображення -> пікселі рівня піраміди
+        to_level = level_scale / scale
+
+        if not self._smooth:
+            source = QRectF(visible.x() * to_level, visible.y() * to_level,
+                            visible.width() * to_level, visible.height() * to_level)
+            painter.drawPixmap(QRectF(visible.translated(x_offset, y_offset)), level_pixmap, source)
+            return
+
+        for row in range(visible.top() // TILE_SIZE, visible.bottom() // TILE_SIZE + 1):
+            for col in range(visible.left() // TILE_SIZE, visible.right() // TILE_SIZE + 1):
+                tile_rect = QRect(col * TILE_SIZE, row * TILE_SIZE, TILE_SIZE, TILE_SIZE).intersected(
+                    QRect(0, 0, width, height))
+                source = QRectF(tile_rect.x() * to_level, tile_rect.y() * to_level,
+                                tile_rect.width() * to_level, tile_rect.height() * to_level)
+                image_rect = QRectF(tile_rect.x() / scale, tile_rect.y() / scale,
+                                    tile_rect.width() / scale, tile_rect.height() / scale).toAlignedRect()
+                key = self._tile_key(level, scale, col, row, image_rect)
+                tile = self.tile_cache.get(key)
+                if tile is None:
+                    tile = self._make_tile(level_pixmap, source, tile_rect.size())
+                    self.tile_cache.put(key, tile)
+                painter.drawPixmap(tile_rect.x() + x_offset, tile_rect.y() + y_offset, tile)
+
+    def paintEvent(self, event):
+        if self.original_pixmap.isNull():
+            return
+        painter = QPainter(self)
+        self.paint_image(painter, event.rect())
@@ -22,6 +22,10 @@ def main():
     sys.exit(app.exec())
 
 if __name__ == '__main__':
+    # Пакетний режим без вікна: python main.py batch <dir> --out <dir> ...
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        from app.core.batch import main as batch_main
+        sys.exit(batch_main(sys.argv[2:]))
     # Перевіряємо, чи існує папка 'app', перш ніж запускати
     if not os.path.isdir('app'):
         app_dummy = QApplication(sys.argv)
@@ -0,0 +1,108 @@
+# tests/test_coalescing_translator.py
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("deepl")
+pytest.importorskip("googletrans")
+pytest.importorskip("numpy")
+
+from app.core.translation_batching import CoalescingTranslator
+from app.core.translators import BaseTranslator
+
+
+class _Upstream(BaseTranslator):
+    service_name = "fake"
+
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def translate_batch(self, items, src_lang, dest_lang, on_item=None):
+        with self.lock:
+            self.calls.append(([item['text'] for item in items], src_lang, dest_lang))
+        if self.error is not None:
+            raise self.error
+        for index, item in enumerate(items):
+            item['translated'] = f"{dest_lang}:{item['text'].upper()}"
+            if on_item: on_item(index)
+        return items
+
+
+def _translate_concurrently(coalescer, requests):
+    """requests — [(texts, src, dest)]; повертає [(items, виняток)] у тому ж порядку."""
+    results = [None] * len(requests)
+
+    def run(index):
+        texts, src_lang, dest_lang = requests[index]
+        items = [{'text': text} for text in texts]
+        try:
+            results[index] = (coalescer.translate_batch(items, src_lang, dest_lang), None)
+        except Exception as e:
+            results[index] = (items, e)
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(len(requests))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    return results
+
+
+def test_requests_are_routed_by_language_pair():
+    upstream = _Upstream()
+    with CoalescingTranslator(upstream, max_wait=0.2) as coalescer:
+        results = _translate_concurrently(coalescer, [(["one", "two"], 'ko', 'uk'), (["three"], 'ko', 'en'),
+                                                      (["four", ""], 'ko', 'uk')])
+    assert [item['translated'] for item in results[0][0]] == ["uk:ONE", "uk:TWO"]
+    assert [item['translated'] for item in results[1][0]] == ["en:THREE"]
+    assert [item['translated'] for item in results[2][0]] == ["uk:FOUR", ""]
+    # Сторінки з однаковою парою мов об'єднані в один запит, інша пара — окремим
+    assert sorted((src, dest, sorted(texts)) for texts, src, dest in upstream.calls) == [
+        ('ko', 'en', ["three"]), ('ko', 'uk', ["four", "one", "two"])]
+    assert coalescer.batches_run == 2
+
+
+def test_duplicates_are_sent_once():
+    upstream = _Upstream()
+    with CoalescingTranslator(upstream, max_wait=0.2) as coalescer:
+        results = _translate_concurrently(coalescer, [(["Hello", "bye"], 'ko', 'uk'), (["Hello  ", "Hello"], 'ko', 'uk')])
+    # Рядки, що збігаються після нормалізації пробілів, надсилаються один раз
+    assert len(upstream.calls) == 1
+    assert sorted(upstream.calls[0][0]) == ["Hello", "bye"]
+    assert [item['translated'] for item in results[0][0]] == ["uk:HELLO", "uk:BYE"]
+    assert [item['translated'] for item in results[1][0]] == ["uk:HELLO", "uk:HELLO"]
+    assert coalescer.items_requested == 4 and coalescer.items_sent == 2
+
+
+def test_error_reaches_every_waiting_page():
+    upstream = _Upstream(error=RuntimeError("сервіс недоступний"))
+    with CoalescingTranslator(upstream, max_wait=0.2) as coalescer:
+        results = _translate_concurrently(coalescer, [(["one"], 'ko', 'uk'), (["two"], 'ko', 'uk'), (["three"], 'ko', 'uk')])
+    assert len(upstream.calls) == 1
+    errors = [error for _, error in results]
+    assert all(isinstance(error, RuntimeError) for error in errors)
+    assert errors[0] is errors[1] is errors[2]
+    assert coalescer.batches_run == 0
+
+
+def test_flushes_after_max_wait():
+    upstream = _Upstream()
+    with CoalescingTranslator(upstream, max_wait=0.3) as coalescer:
+        started = time.monotonic()
+        items = coalescer.translate_batch([{'text': "alone"}], 'ko', 'uk')
+        elapsed = time.monotonic() - started
+    assert items[0]['translated'] == "uk:ALONE"
+    # Неповний пакет чекає max_wait на інші сторінки, але не довше
+    assert 0.25 <= elapsed < 2
+
+
+def test_full_batch_does_not_wait():
+    upstream = _Upstream()
+    with CoalescingTranslator(upstream, max_items=3, max_wait=30) as coalescer:
+        started = time.monotonic()
+        items = coalescer.translate_batch([{'text': text} for text in ("a", "b", "c")], 'ko', 'uk')
+        assert time.monotonic() - started < 2
+    assert [item['translated'] for item in items] == ["uk:A", "uk:B", "uk:C"]
@@ -0,0 +1,121 @@
+# tests/test_deepl_translator.py
+# DeepLTranslator проти локальної заглушки DeepL API (server_url), без справжнього ключа.
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+
+deepl = pytest.importorskip("deepl")
+pytest.importorskip("googletrans")
+
+from app.core import rate_limiter
+from app.core.api_manager import KeyScheduler
+from app.core.translators import DeepLTranslator, MultiKeyTranslator, TranslatorPool, key_fingerprint
+
+
+class _FakeDeepL(BaseHTTPRequestHandler):
+    # Скільки перших запитів /v2/translate відповісти 429
+    throttle_first = 0
+    translate_calls = 0
+    # Ключі, які завжди отримують 429
+    throttled_keys = ()
+    calls_by_key = {}
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _key(self):
+        return self.headers.get("Authorization", "").split(" ")[-1]
+
+    def _texts(self):
+        raw = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            return json.loads(raw)["text"]
+        return parse_qs(raw)["text"]
+
+    def do_GET(self):
+        self._reply(200, {"character_count": 0, "character_limit": 500000})
+
+    def do_POST(self):
+        if self.path.startswith("/v2/usage"):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            return self._reply(200, {"character_count": 0, "character_limit": 500000})
+        texts = self._texts()
+        cls = type(self)
+        cls.translate_calls += 1
+        cls.calls_by_key[self._key()] = cls.calls_by_key.get(self._key(), 0) + 1
+        if cls.translate_calls <= cls.throttle_first or self._key() in cls.throttled_keys:
+            return self._reply(429, {"message": "Too many requests"})
+        self._reply(200, {"translations": [{"detected_source_language": "KO", "text": f"<{t}>",
+                                                        "billed_characters": len(t)} for t in texts]})
+
+
+@pytest.fixture
+def fake_deepl(monkeypatch):
+    handler = type("Handler", (_FakeDeepL,), {"throttle_first": 0, "translate_calls": 0, "calls_by_key": {}})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(DeepLTranslator, "BACKOFF_BASE", 0.01)
+    # Обмежувач спільний на процес — кожен тест починає з чистого
+    monkeypatch.setattr(rate_limiter, "_limiters", {})
+    yield handler, f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_translate_batch(fake_deepl):
+    handler, url = fake_deepl
+    translator = DeepLTranslator("test-key", server_url=url)
+    items = translator.translate_batch([{'text': "안녕"}, {'text': " "}, {'text': "세계"}], 'ko', 'en-us')
+    assert [item['translated'] for item in items] == ["<안녕>", "", "<세계>"]
+    assert handler.translate_calls == 1
+
+
+def test_429_is_retried_by_translator_only(fake_deepl):
+    handler, url = fake_deepl
+    handler.throttle_first = 2
+    translator = DeepLTranslator("test-key", server_url=url)
+    items = translator.translate_batch([{'text': "안녕"}], 'ko', 'en-us')
+    assert items[0]['translated'] == "<안녕>"
+    # Два 429 і один успіх: бібліотека сама не повторює, повтори — лише з _translate_chunk
+    assert handler.translate_calls == 3
+    assert deepl.http_client.max_network_retries == 0
+
+
+def test_retries_are_bounded(fake_deepl):
+    handler, url = fake_deepl
+    handler.throttle_first = 1000
+    translator = DeepLTranslator("test-key", server_url=url)
+    items = translator.translate_batch([{'text': "안녕"}], 'ko', 'en-us')
+    assert items[0]['translated'].startswith("ПОМИЛКА")
+    assert handler.translate_calls == DeepLTranslator.MAX_RETRIES + 1
+
+
+def test_each_key_has_its_own_limiter(fake_deepl, monkeypatch):
+    handler, url = fake_deepl
+    handler.throttled_keys = ("key-b",)
+    monkeypatch.setattr(MultiKeyTranslator, "MAX_ATTEMPTS", 4)
+    pool = TranslatorPool()
+    translator = MultiKeyTranslator(KeyScheduler(["key-a", "key-b", "key-c"]), pool, server_url=url)
+    # 120 текстів — три шматки по 50 і менше, тож працюють усі ключі
+    items = translator.translate_batch([{'text': f"텍스트 {i}"} for i in range(120)], 'ko', 'en-us')
+    pool.close()
+
+    assert all(item['translated'] == f"<텍스트 {i}>" for i, item in enumerate(items))
+    states = rate_limiter.limiter_states()
+    assert set(states) == {f"deepl:{key_fingerprint(key)}" for key in ("key-a", "key-b", "key-c")}
+    # 429 на одному ключі зменшує ліміт лише його обмежувача
+    assert states[f"deepl:{key_fingerprint('key-b')}"]['throttled'] >= 1
+    for key in ("key-a", "key-c"):
+        assert states[f"deepl:{key_fingerprint(key)}"]['throttled'] == 0
+        assert states[f"deepl:{key_fingerprint(key)}"]['limit'] >= 4
@@ -0,0 +1,91 @@
+# tests/test_fuzzy_index.py
+import random
+import time
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from app.core.fuzzy_index import FuzzyIndex, bounded_levenshtein
+
+# Часті англійські слова: їхні n-грами ("the", "ing", " an") трапляються в більшості записів
+WORDS = (
+    "the be to of and a in that have I it for not on with he as you do at this but his by from they we say her "
+    "she or an will my one all would there their what so up out if about who get which go me when make can like "
+    "time no just him know take people into year your good some could them see other than then now look only "
+    "come its over think also back after use two how our work first well way even new want because any these give "
+    "day most us is are was were been has had did said going really right please sorry thank thanks wait stop "
+    "never always again here where why something nothing everything someone everyone anything maybe still long "
+    "little great old young same different small large next early important few public bad able last own other"
+).split()
+
+
+def _levenshtein(a, b):
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i] + [0] * len(b)
+        for j, char_b in enumerate(b, start=1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+        previous = current
+    return previous[-1]
+
+
+def _typo(text, rng):
+    position = rng.randrange(len(text))
+    return text[:position] + "x" + text[position + 1:]
+
+
+def _sentences(rng, count):
+    weights = [1 / (rank + 1) for rank in range(len(WORDS))]
+    sentences = set()
+    while len(sentences) < count:
+        sentences.add(" ".join(rng.choices(WORDS, weights, k=rng.randint(4, 12))))
+    return sorted(sentences)
+
+
+def test_bounded_levenshtein_matches_full_matrix():
+    rng = random.Random(1)
+    for _ in range(2000):
+        a = "".join(rng.choice("ab c") for _ in range(rng.randint(0, 12)))
+        b = "".join(rng.choice("ab c") for _ in range(rng.randint(0, 12)))
+        max_distance = rng.randint(0, 6)
+        expected = _levenshtein(a, b)
+        assert bounded_levenshtein(a, b, max_distance) == (expected if expected <= max_distance else max_distance + 1)
+
+
+@pytest.mark.parametrize("alphabet", ["abcde fgh", "가나다라마바 "])
+def test_search_finds_best_match(alphabet):
+    rng = random.Random(2)
+    keys = sorted({"".join(rng.choice(alphabet) for _ in range(rng.randint(12, 24))) for _ in range(300)})
+    index = FuzzyIndex()
+    for key in keys:
+        index.add(key, key.upper())
+    for _ in range(40):
+        query = _typo(rng.choice(keys), rng)
+        best = max(1 - _levenshtein(query, key) / max(len(query), len(key)) for key in keys)
+        match = index.search(query, 0.9)
+        if best < 0.9:
+            assert match is None
+            continue
+        key, value, score = match
+        assert value == key.upper()
+        assert score == pytest.approx(best)
+
+
+def test_english_lookup_is_sub_millisecond():
+    rng = random.Random(3)
+    keys = _sentences(rng, 200_000)
+    index = FuzzyIndex()
+    for key in keys:
+        index.add(key, key)
+    queries = [_typo(key, rng) for key in rng.sample(keys, 300)]
+    queries += [" ".join(rng.choices(WORDS, k=8)) for _ in range(300)]
+
+    # Найкращий із кількох проходів — щоб не міряти випадкове навантаження машини
+    best = float("inf")
+    for _ in range(3):
+        started = time.perf_counter()
+        found = [index.search(query, 0.9) for query in queries]
+        best = min(best, (time.perf_counter() - started) / len(queries))
+    assert all(match is not None for match in found[:300])
+    assert best < 0.001
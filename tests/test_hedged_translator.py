@@ -0,0 +1,120 @@
+# tests/test_hedged_translator.py
+import time
+
+import pytest
+
+pytest.importorskip("deepl")
+pytest.importorskip("googletrans")
+pytest.importorskip("numpy")
+
+from app.core.translation_memory import TranslationMemory
+from app.core.translators import BaseTranslator, HedgedTranslator, MemoryTranslator
+
+
+class _FakeService(BaseTranslator):
+    def __init__(self, service_name, delay=0.0, error=None, error_items=False):
+        self.service_name = service_name
+        self.delay = delay
+        self.error = error
+        self.error_items = error_items
+        self.calls = []
+
+    def translate_batch(self, items, src_lang, dest_lang, on_item=None):
+        self.calls.append((src_lang, dest_lang))
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        for index, item in enumerate(items):
+            if not item['text'].strip():
+                item['translated'] = ""
+            else:
+                item['translated'] = "ПОМИЛКА: сервіс" if self.error_items else f"{self.service_name}:{item['text']}"
+            if on_item: on_item(index)
+        return items
+
+
+@pytest.fixture
+def hedged_factory():
+    created = []
+
+    def make(primary, secondary, **kwargs):
+        hedged = HedgedTranslator(primary, secondary, **kwargs)
+        created.append(hedged)
+        return hedged
+
+    yield make
+    for hedged in created:
+        hedged.close()
+
+
+def _items(*texts):
+    return [{'text': text} for text in texts]
+
+
+def test_fast_primary_is_not_hedged(hedged_factory):
+    primary, secondary = _FakeService("deepl"), _FakeService("google")
+    hedged = hedged_factory(primary, secondary, fixed_delay=1.0)
+    items = hedged.translate_batch(_items("안녕", ""), 'KO', 'EN-US')
+    assert [item['translated'] for item in items] == ["deepl:안녕", ""]
+    assert items[0]['translated_by'] == "deepl"
+    assert secondary.calls == []
+    assert hedged.hedges == 0 and hedged.wins == {"deepl": 1, "google": 0}
+
+
+def test_slow_primary_is_hedged_with_converted_codes(hedged_factory):
+    primary, secondary = _FakeService("deepl", delay=1.0), _FakeService("google")
+    hedged = hedged_factory(primary, secondary, fixed_delay=0.05)
+    done = []
+    started = time.monotonic()
+    items = hedged.translate_batch(_items("안녕"), 'KO', 'EN-US', on_item=done.append)
+    assert time.monotonic() - started < 0.9
+    assert items[0]['translated'] == "google:안녕" and items[0]['translated_by'] == "google"
+    assert done == [0]
+    # Резервний сервіс отримує коди мов у своїх позначеннях
+    assert secondary.calls == [('ko', 'en')]
+    assert hedged.hedges == 1 and hedged.wins["google"] == 1
+
+
+def test_error_items_from_primary_trigger_hedge_immediately(hedged_factory):
+    primary, secondary = _FakeService("deepl", error_items=True), _FakeService("google")
+    hedged = hedged_factory(primary, secondary, fixed_delay=5.0)
+    items = hedged.translate_batch(_items("안녕"), 'KO', 'EN-US')
+    assert items[0]['translated'] == "google:안녕"
+
+
+def test_both_services_failing_marks_items(hedged_factory):
+    primary = _FakeService("deepl", error=RuntimeError("deepl down"))
+    secondary = _FakeService("google", error=RuntimeError("google down"))
+    hedged = hedged_factory(primary, secondary, fixed_delay=0.01)
+    done = []
+    items = hedged.translate_batch(_items("안녕", " ", "세계"), 'KO', 'EN-US', on_item=done.append)
+    assert items[0]['translated'].startswith("ПОМИЛКА") and items[2]['translated'].startswith("ПОМИЛКА")
+    assert items[1]['translated'] == ""
+    assert sorted(done) == [0, 1, 2]
+
+
+def test_hedge_delay_follows_percentile(hedged_factory):
+    hedged = hedged_factory(_FakeService("deepl"), _FakeService("google"), percentile=0.9)
+    assert hedged.hedge_delay() == HedgedTranslator.DEFAULT_DELAY
+    for latency in range(1, 21):
+        hedged._latencies.append(latency / 10)
+    assert hedged.hedge_delay() == pytest.approx(1.9)
+    hedged.fixed_delay = 0.7
+    assert hedged.hedge_delay() == 0.7
+
+
+def test_memory_stores_secondary_result_under_its_own_service(hedged_factory):
+    memory = TranslationMemory(":memory:")
+    primary, secondary = _FakeService("deepl", delay=0.5), _FakeService("google")
+    translator = MemoryTranslator(hedged_factory(primary, secondary, fixed_delay=0.01), memory)
+    translator.translate_batch(_items("안녕"), 'KO', 'EN-US')
+
+    assert memory.lookup_many("deepl", 'KO', 'EN-US', ["안녕"]) == {}
+    assert memory.lookup_many("google", 'ko', 'en', ["안녕"]) == {"안녕": ("google:안녕", 1.0)}
+
+    # Наступний запуск DeepL не отримує з пам'яті переклад Google
+    primary.delay = 0
+    items = translator.translate_batch(_items("안녕"), 'KO', 'EN-US')
+    assert items[0]['translated'] == "deepl:안녕" and not items[0].get('from_memory')
+    assert memory.lookup_many("deepl", 'KO', 'EN-US', ["안녕"]) == {"안녕": ("deepl:안녕", 1.0)}
+    memory.close()
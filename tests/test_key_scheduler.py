@@ -0,0 +1,70 @@
+# tests/test_key_scheduler.py
+import threading
+import time
+
+from app.core.api_manager import KeyScheduler
+
+
+def test_requests_are_spread_over_keys():
+    scheduler = KeyScheduler(["key-a", "", "key-b"], per_key_concurrency=2)
+    assert scheduler.keys == ["key-a", "key-b"]
+    assert scheduler.concurrency == 4
+    first, second = scheduler.acquire(), scheduler.acquire()
+    assert {first, second} == {"key-a", "key-b"}
+
+
+def test_busy_key_blocks_until_release():
+    scheduler = KeyScheduler(["key-a"], per_key_concurrency=1)
+    assert scheduler.acquire() == "key-a"
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(scheduler.acquire()), daemon=True)
+    waiter.start()
+    waiter.join(timeout=0.2)
+    assert result == []
+    scheduler.release("key-a")
+    waiter.join(timeout=5)
+    assert result == ["key-a"]
+
+
+def test_remaining_characters_pick_and_exhaust_keys():
+    scheduler = KeyScheduler(["small", "large"])
+    scheduler.set_remaining("small", 100)
+    scheduler.set_remaining("large", 10_000)
+    # Ключ, якому не вистачить залишку на шматок, пропускається
+    assert scheduler.acquire(chars=500) == "large"
+    scheduler.release("large", chars=500)
+    assert scheduler.stats()["large"] == {'remaining': 9500, 'used': 500, 'in_flight': 0, 'exhausted': False}
+
+    key = scheduler.acquire(chars=100)
+    assert key == "large"   # обидва ключі вільні, тож перемагає більший залишок
+    scheduler.release(key, outcome="exhausted")
+    assert scheduler.acquire(chars=100) == "small"
+    scheduler.release("small", chars=100)
+    assert scheduler.stats()["small"]['exhausted']
+    # Усі ключі вичерпано — acquire не блокує
+    assert scheduler.acquire() is None
+
+
+def test_rate_limited_key_rests(monkeypatch):
+    monkeypatch.setattr(KeyScheduler, "COOLDOWN_BASE", 0.3)
+    scheduler = KeyScheduler(["key-a", "key-b"])
+    key = scheduler.acquire()
+    scheduler.release(key, outcome="rate_limited")
+    other = scheduler.acquire()
+    assert other != key
+    # Навіть зайнятий інший ключ кращий за той, що відпочиває
+    assert scheduler.acquire() == other
+
+
+def test_only_key_is_reused_after_cooldown(monkeypatch):
+    monkeypatch.setattr(KeyScheduler, "COOLDOWN_BASE", 0.2)
+    scheduler = KeyScheduler(["key-a"])
+    key = scheduler.acquire()
+    for expected_delay in (0.2, 0.4):
+        scheduler.release(key, outcome="rate_limited")
+        started = time.monotonic()
+        assert scheduler.acquire() == key
+        # Кожен наступний 429 поспіль подвоює відпочинок
+        assert expected_delay * 0.8 <= time.monotonic() - started < expected_delay + 1
+    scheduler.release("key-a")
+    assert scheduler.stats()["key-a"]['in_flight'] == 0
@@ -0,0 +1,114 @@
+# tests/test_llm_translator.py
+# GPTTranslator і GeminiTranslator проти локальної заглушки API (base_url): звичайна й потокова (SSE)
+# відповідь та повторний запит сегментів, яких модель не повернула.
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("deepl")
+pytest.importorskip("googletrans")
+
+from app.core import rate_limiter
+from app.core.translators import GeminiTranslator, GPTTranslator
+
+SEGMENT_RE = re.compile(r"^\[(\d+)\] (.*)$", re.MULTILINE)
+
+
+class _FakeLLM(BaseHTTPRequestHandler):
+    # Номер сегмента, який «модель» пропускає в першій відповіді (None — не пропускати)
+    drop_first = None
+    calls = 0
+    prompts = []
+
+    def log_message(self, *args):
+        pass
+
+    def _wrap(self, text, gemini, delta):
+        if gemini:
+            return {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+        if delta:
+            return {"choices": [{"delta": {"content": text}}]}
+        return {"choices": [{"message": {"content": text}}]}
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        cls = type(self)
+        cls.calls += 1
+        gemini = "messages" not in body
+        if gemini:
+            prompt, stream = body["contents"][0]["parts"][0]["text"], "stream" in self.path
+        else:
+            prompt, stream = body["messages"][1]["content"], body.get("stream")
+        cls.prompts.append(prompt)
+
+        segments = SEGMENT_RE.findall(prompt)
+        if cls.calls == 1 and cls.drop_first is not None:
+            segments = [(number, text) for number, text in segments if number != str(cls.drop_first)]
+        answer = "\n".join(f"[{number}] {text.upper()}" for number, text in segments)
+
+        self.send_response(200)
+        if stream:
+            # Без Content-Length: HTTP/1.0, кінець потоку — закриття з'єднання
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for i in range(0, len(answer), 7):
+                chunk = self._wrap(answer[i:i + 7], gemini, delta=True)
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.write(b"data: [DONE]\n\n")
+        else:
+            data = json.dumps(self._wrap(answer, gemini, delta=False)).encode("utf-8")
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    handler = type("Handler", (_FakeLLM,), {"drop_first": None, "calls": 0, "prompts": []})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    # Обмежувач спільний на процес — кожен тест починає з чистого
+    monkeypatch.setattr(rate_limiter, "_limiters", {})
+    yield handler, f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+ITEMS = ["hello", "", "big world", "good night"]
+
+
+@pytest.mark.parametrize("translator_cls", [GPTTranslator, GeminiTranslator])
+@pytest.mark.parametrize("stream", [False, True])
+def test_translate_batch(fake_llm, translator_cls, stream):
+    handler, url = fake_llm
+    translator = translator_cls("test-key", base_url=url, stream=stream)
+    done = []
+    items = translator.translate_batch([{'text': text} for text in ITEMS], 'en', 'uk', on_item=done.append)
+    assert [item['translated'] for item in items] == ["HELLO", "", "BIG WORLD", "GOOD NIGHT"]
+    assert sorted(done) == [0, 1, 2, 3]
+    assert handler.calls == translator.requests_sent == 1
+    assert translator.segments_retried == 0
+    translator.close()
+
+
+@pytest.mark.parametrize("translator_cls", [GPTTranslator, GeminiTranslator])
+@pytest.mark.parametrize("stream", [False, True])
+def test_missing_segment_is_requested_again(fake_llm, translator_cls, stream):
+    handler, url = fake_llm
+    handler.drop_first = 2
+    translator = translator_cls("test-key", base_url=url, stream=stream)
+    done = []
+    items = translator.translate_batch([{'text': text} for text in ITEMS], 'en', 'uk', on_item=done.append)
+    assert [item['translated'] for item in items] == ["HELLO", "", "BIG WORLD", "GOOD NIGHT"]
+    # Кожен елемент повідомляється рівно один раз, навіть якщо потік уже показав сусідні сегменти
+    assert sorted(done) == [0, 1, 2, 3]
+    # Другий запит містить лише пропущений сегмент
+    assert handler.calls == translator.requests_sent == 2
+    assert SEGMENT_RE.findall(handler.prompts[1]) == [("2", "big world")]
+    assert translator.segments_retried == 1
+    translator.close()
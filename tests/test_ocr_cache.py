@@ -0,0 +1,76 @@
+# tests/test_ocr_cache.py
+import os
+
+from app.core.ocr_cache import OcrCache
+
+
+def _results(text):
+    return [([[0, 0], [10, 0], [10, 10], [0, 10]], text, 0.9)]
+
+
+def _entry_size(tmp_path):
+    probe = OcrCache(str(tmp_path / "probe"))
+    probe.put("probe", _results("a"))
+    return probe.stats()['bytes']
+
+
+def test_key_depends_on_image_mode_and_settings():
+    key = OcrCache.make_key(b"image", "standard", {'langs': ['ko', 'en']})
+    assert key == OcrCache.make_key(b"image", "standard", {'langs': ['ko', 'en']})
+    assert key != OcrCache.make_key(b"image", "opencv", {'langs': ['ko', 'en']})
+    assert key != OcrCache.make_key(b"image", "standard", {'langs': ['ko']})
+    assert key != OcrCache.make_key(b"other", "standard", {'langs': ['ko', 'en']})
+
+
+def test_round_trip(tmp_path):
+    cache = OcrCache(str(tmp_path))
+    assert cache.get("missing") is None
+    cache.put("page", _results("안녕"))
+    assert cache.get("page") == [([[0.0, 0.0], [10.0, 0.0], [10.0, 10.0], [0.0, 10.0]], "안녕", 0.9)]
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    size = _entry_size(tmp_path)
+    cache = OcrCache(str(tmp_path / "cache"), max_bytes=size * 2)
+    cache.put("a", _results("a"))
+    cache.put("b", _results("b"))
+    # Читання робить "a" найнещодавніше використаним — витіснено буде "b"
+    assert cache.get("a") is not None
+    cache.put("c", _results("c"))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert not os.path.exists(os.path.join(cache.cache_dir, "b.json"))
+    assert cache.stats()['entries'] == 2 and cache.stats()['bytes'] == size * 2
+
+
+def test_single_oversized_entry_is_kept(tmp_path):
+    cache = OcrCache(str(tmp_path), max_bytes=1)
+    cache.put("a", _results("a"))
+    cache.put("b", _results("b"))
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+
+
+def test_index_is_restored_from_disk_in_lru_order(tmp_path):
+    size = _entry_size(tmp_path)
+    directory = str(tmp_path / "cache")
+    cache = OcrCache(directory)
+    for index, key in enumerate(("old", "middle", "new")):
+        cache.put(key, _results("a"))
+        os.utime(os.path.join(directory, f"{key}.json"), (1000 + index, 1000 + index))
+
+    reopened = OcrCache(directory, max_bytes=size * 3)
+    assert reopened.stats()['entries'] == 3
+    reopened.put("newest", _results("a"))
+    assert reopened.get("old") is None
+    assert reopened.get("middle") is not None
+
+
+def test_corrupt_entry_counts_as_miss(tmp_path):
+    cache = OcrCache(str(tmp_path))
+    cache.put("page", _results("a"))
+    with open(os.path.join(str(tmp_path), "page.json"), "w", encoding="utf-8") as f:
+        f.write("{not json")
+    assert cache.get("page") is None
+    assert cache.stats()['entries'] == 0 and cache.stats()['bytes'] == 0
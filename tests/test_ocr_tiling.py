@@ -0,0 +1,69 @@
+# tests/test_ocr_tiling.py
+import pytest
+
+from app.core.ocr_tiling import EDGE_MARGIN, merge_tile_results, readtext_tiled, split_into_tiles
+
+
+def _box(x0, y0, x1, y1):
+    return [[x0, y0], [x1, y0], [x1, y1], [x0, y1]]
+
+
+def test_split_covers_page_with_overlap():
+    assert split_into_tiles(2400, tile_height=2048) == [(0, 2400)]
+    tiles = split_into_tiles(9000, tile_height=2048, overlap=256)
+    assert tiles[0][0] == 0 and tiles[-1][1] == 9000
+    for (_, end), (start, _) in zip(tiles, tiles[1:]):
+        assert end - start == 256
+
+
+def test_seam_duplicate_keeps_the_more_confident_box():
+    tiles = [(0, 1000), (800, 1800)]
+    # Той самий рядок на шві: у першому тайлі y 900-940, у другому — 100-140 (відносно y0=800)
+    merged = merge_tile_results(tiles, [
+        [(_box(10, 100, 200, 140), "top", 0.9), (_box(10, 900, 200, 940), "seam line", 0.6)],
+        [(_box(10, 100, 200, 140), "seam line", 0.95), (_box(10, 700, 200, 740), "bottom", 0.8)],
+    ])
+    assert [(text, prob) for _, text, prob in merged] == [("top", 0.9), ("seam line", 0.95), ("bottom", 0.8)]
+    # Бокси переведені в координати сторінки
+    assert merged[1][0][0] == [10.0, 900.0]
+
+
+def test_seam_duplicate_prefers_box_not_cut_by_tile_edge():
+    tiles = [(0, 1000), (800, 1800)]
+    # У першому тайлі рядок упирається в нижній край і обрізаний, хоч і впевненіший
+    merged = merge_tile_results(tiles, [
+        [(_box(10, 960, 200, 1000 - EDGE_MARGIN + 1), "cut", 0.99)],
+        [(_box(10, 160, 200, 230), "whole line", 0.7)],
+    ])
+    assert [text for _, text, _ in merged] == ["whole line"]
+
+
+def test_side_by_side_boxes_in_seam_are_not_merged():
+    tiles = [(0, 1000), (800, 1800)]
+    merged = merge_tile_results(tiles, [
+        [(_box(10, 900, 200, 940), "left", 0.9)],
+        [(_box(10, 100, 200, 140), "left", 0.9), (_box(400, 100, 600, 140), "right", 0.9)],
+    ])
+    assert sorted(text for _, text, _ in merged) == ["left", "right"]
+
+
+def test_readtext_tiled_finds_every_line_once():
+    np = pytest.importorskip("numpy")
+    height = 6000
+    lines = [(y, f"line {y}") for y in range(100, height - 100, 450)]
+    # Перший стовпчик — номер рядка пікселів, тож заглушка знає, яку частину сторінки отримала
+    image = np.zeros((height, 4), dtype=np.int32)
+    image[:, 0] = np.arange(height)
+
+    class _Reader:
+        calls = 0
+
+        def readtext(self, tile):
+            _Reader.calls += 1
+            y0, y1 = int(tile[0, 0]), int(tile[-1, 0]) + 1
+            return [(_box(10, y - y0, 300, y + 40 - y0), text, 0.9)
+                    for y, text in lines if y0 <= y and y + 40 <= y1]
+
+    merged = readtext_tiled(_Reader(), image, tile_height=2048, overlap=256)
+    assert _Reader.calls == len(split_into_tiles(height, 2048, 256)) > 1
+    assert [text for _, text, _ in merged] == [text for _, text in lines]
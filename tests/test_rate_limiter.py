@@ -0,0 +1,30 @@
+# tests/test_rate_limiter.py
+import threading
+
+import pytest
+
+from app.core.rate_limiter import AdaptiveLimiter
+
+
+class _Throttled(Exception):
+    http_status_code = 429
+
+
+def _raise_throttled():
+    raise _Throttled()
+
+
+def test_burst_of_429_does_not_block_forever():
+    limiter = AdaptiveLimiter("test", initial_rate=10.0, min_rate=0.5)
+    for _ in range(4):
+        with pytest.raises(_Throttled):
+            limiter.call(_raise_throttled)
+    assert limiter.rate < 1
+
+    result = []
+    worker = threading.Thread(target=lambda: result.append(limiter.call(lambda: 1)), daemon=True)
+    worker.start()
+    # Після 10 → 5 → 2.5 → 1.25 → 0.625 запит/с наступний токен з'являється приблизно за 1.2 с
+    worker.join(timeout=5)
+    assert result == [1]
+    assert limiter.throttled == 4
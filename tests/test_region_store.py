@@ -0,0 +1,38 @@
+# tests/test_region_store.py
+import pytest
+
+pytest.importorskip("numpy")
+
+from app.core.region_store import RegionStore
+
+
+@pytest.fixture
+def store():
+    return RegionStore.from_dicts([
+        {'rect': (0, 0, 100, 100), 'text': "big"},
+        {'rect': (10, 10, 20, 20), 'text': "small"},
+        {'rect': (200, 0, 50, 50), 'text': "apart"},
+    ])
+
+
+def test_hit_test_returns_smallest_region_first(store):
+    assert store.hit_test(15, 15).tolist() == [1, 0]
+    assert store.hit_test(50, 50).tolist() == [0]
+    # Права й нижня межі не входять у блок
+    assert store.hit_test(100, 50).tolist() == []
+    assert store.hit_test(225, 25).tolist() == [2]
+
+
+def test_hit_test_sees_moved_regions(store):
+    store[1]['rect'] = (60, 60, 10, 10)
+    assert store.hit_test(15, 15).tolist() == [0]
+    assert store.hit_test(65, 65).tolist() == [1, 0]
+
+
+def test_store_grows_past_capacity():
+    store = RegionStore(capacity=1)
+    for i in range(40):
+        store.append((i * 10, 0, 10, 10), text=str(i))
+    assert len(store) == 40
+    assert store.hit_test(395, 5).tolist() == [39]
+    assert store[39]['text'] == "39" and store[39].get('translated') == ''
@@ -0,0 +1,60 @@
+# tests/test_text_layout.py
+import random
+
+from app.core.text_layout import _should_link, cluster_rects, default_max_distance
+
+
+def _brute_force_groups(rects, max_distance):
+    parent = list(range(len(rects)))
+
+    def find(i):
+        while parent[i] != i:
+            i = parent[i]
+        return i
+
+    for i in range(len(rects)):
+        for j in range(i + 1, len(rects)):
+            if _should_link(rects[i], rects[j], max_distance):
+                parent[find(j)] = find(i)
+    groups = {}
+    for i in range(len(rects)):
+        groups.setdefault(find(i), set()).add(i)
+    return sorted(sorted(group) for group in groups.values())
+
+
+def test_empty_page():
+    assert cluster_rects([]) == []
+
+
+def test_bubbles_in_reading_order():
+    rects = [
+        (400, 600, 120, 28),   # друга бульбашка, нижче
+        (110, 140, 90, 28),    # перша бульбашка, другий рядок
+        (100, 100, 60, 28),    # перша бульбашка, перший рядок, ліве слово
+        (170, 101, 50, 27),    # перша бульбашка, перший рядок, праве слово
+    ]
+    assert cluster_rects(rects) == [[2, 3, 1], [0]]
+
+
+def test_far_apart_lines_are_separate_bubbles():
+    rects = [(100, 100, 200, 28), (100, 400, 200, 28)]
+    assert cluster_rects(rects) == [[0], [1]]
+    # Явно задана відстань між рядками об'єднує їх
+    assert cluster_rects(rects, max_distance=300) == [[0, 1]]
+
+
+def test_distance_scales_with_line_height():
+    rects = [(100, 100, 200, 28), (100, 160, 200, 28), (100, 400, 200, 28)]
+    doubled = [(x * 2, y * 2, w * 2, h * 2) for x, y, w, h in rects]
+    assert default_max_distance(doubled) == 2 * default_max_distance(rects)
+    assert cluster_rects(rects) == cluster_rects(doubled) == [[0, 1], [2]]
+
+
+def test_grid_finds_the_same_groups_as_all_pairs():
+    rng = random.Random(4)
+    for _ in range(20):
+        rects = [(rng.randrange(0, 800), rng.randrange(0, 3000), rng.randrange(20, 200), rng.randrange(15, 40))
+                 for _ in range(150)]
+        max_distance = default_max_distance(rects)
+        groups = sorted(sorted(group) for group in cluster_rects(rects))
+        assert groups == _brute_force_groups(rects, max_distance)
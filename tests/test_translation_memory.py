@@ -0,0 +1,46 @@
+# tests/test_translation_memory.py
+import time
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from app.core.translation_memory import TranslationMemory
+
+
+@pytest.fixture
+def memory():
+    memory = TranslationMemory(":memory:", fuzzy_threshold=0.9)
+    yield memory
+    memory.close()
+
+
+def _fill(memory, count):
+    memory.store_many("deepl", "en", "uk", ((f"line number {i} of the chapter text", f"рядок {i}")
+                                           for i in range(count)))
+
+
+def test_fuzzy_lookup_after_index_is_built(memory):
+    _fill(memory, 100)
+    assert memory.wait_fuzzy_index("deepl", "EN", "uk", timeout=10)
+    found = memory.lookup_many("deepl", "en", "uk", ["line numbr 42 of the chapter text"])
+    translated, score = found["line numbr 42 of the chapter text"]
+    assert translated == "рядок 42"
+    assert 0.9 <= score < 1
+
+
+def test_build_does_not_block_lookups(memory):
+    _fill(memory, 60_000)
+    # Перший пошук лише запускає побудову: нечіткого збігу ще немає, але й чекати не доводиться
+    started = time.perf_counter()
+    found = memory.lookup_many("deepl", "en", "uk", ["line numbr 7 of the chapter text", "line number 8 of the chapter text"])
+    memory.store_many("deepl", "en", "uk", [("stored while the index is building", "нове")])
+    assert time.perf_counter() - started < 0.5
+    assert found == {"line number 8 of the chapter text": ("рядок 8", 1.0)}
+
+    assert memory.wait_fuzzy_index("deepl", "en", "uk", timeout=60)
+    found = memory.lookup_many("deepl", "en", "uk", ["line numbr 7 of the chapter text",
+                                                     "stored whle the index is building"])
+    assert found["line numbr 7 of the chapter text"][0] == "рядок 7"
+    # Рядок, збережений під час побудови, теж потрапив в індекс
+    assert found["stored whle the index is building"][0] == "нове"
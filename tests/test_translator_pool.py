@@ -0,0 +1,72 @@
+# tests/test_translator_pool.py
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("deepl")
+pytest.importorskip("googletrans")
+
+from app.core import translators
+from app.core.translators import TranslatorPool
+
+
+class _SlowBuild:
+    def __init__(self, delay=0.3, fail_keys=()):
+        self.delay = delay
+        self.fail_keys = fail_keys
+        self.built = []
+        self.lock = threading.Lock()
+
+    def __call__(self, service, api_key, *args):
+        with self.lock:
+            self.built.append(api_key)
+        time.sleep(self.delay)
+        if api_key in self.fail_keys:
+            raise RuntimeError(f"поганий ключ {api_key}")
+        return object()
+
+
+def _get_all(pool, keys):
+    results = [None] * len(keys)
+
+    def get(index):
+        results[index] = pool.get("deepl", keys[index])
+
+    threads = [threading.Thread(target=get, args=(index,)) for index in range(len(keys))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_keys_are_built_in_parallel_and_once(monkeypatch):
+    build = _SlowBuild()
+    monkeypatch.setattr(translators, "_build_translator", build)
+    pool = TranslatorPool()
+    started = time.monotonic()
+    results = _get_all(pool, ["key-a", "key-b", "key-c", "key-a", "key-b", "key-c"])
+    # Ініціалізація одного ключа не тримає пул: три ключі створюються одночасно
+    assert time.monotonic() - started < 0.3 * 2
+    assert sorted(build.built) == ["key-a", "key-b", "key-c"]
+    assert results[0] is results[3] and results[1] is results[4] and results[2] is results[5]
+    assert pool.get("deepl", "key-a") is results[0]
+
+
+def test_failed_init_is_cached_for_a_while(monkeypatch):
+    build = _SlowBuild(delay=0, fail_keys=("bad",))
+    monkeypatch.setattr(translators, "_build_translator", build)
+    pool = TranslatorPool()
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            pool.get("deepl", "bad")
+    assert build.built == ["bad"]
+
+    monkeypatch.setattr(TranslatorPool, "FAILED_INIT_TTL", 0)
+    with pytest.raises(RuntimeError):
+        pool.get("deepl", "bad")
+    assert build.built == ["bad", "bad"]
+    # Видалений у налаштуваннях ключ забувається разом із помилкою
+    pool.retain_keys({"deepl": []})
+    assert pool.get("deepl", "good") is not None